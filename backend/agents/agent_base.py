@@ -1,35 +1,59 @@
 # agents/agent_base.py
 
-import importlib
 import os
-import sys
+from functools import cached_property
 from typing import Any, Dict, List
 import uuid
 import logging
 from abc import ABC, abstractmethod
-import json
-import csv
-import pandas as pd
-from PyPDF2 import PdfReader
-import yaml
-from agents.specialized_agents.specialized_agent import SpecializedAgent
-from messaging.messaging import MessagingClient
-from database.database_setup import Database
+from config.settings import TOOLS
+from database.agent_memory import AgentMemory
+from knowledge.readers import UnsupportedFileType, read_file
+from tools.tool_runtime import call_with_timeout, get_tool_runtime
 
 class Agent(ABC):
-    def __init__(self, agent_name: str, system_message: str, model_name: str, tools: List[str] = None, memory: Dict[str, Any] = None, config: Dict[str, Any] = None):
-        self.agent_id = str(uuid.uuid4())
+    def __init__(self, agent_name: str, system_message: str, model_name: str, tools: List[str] = None, memory: Dict[str, Any] = None, config: Dict[str, Any] = None, agent_id: str = None):
+        self.agent_id = agent_id or str(uuid.uuid4())
         self.agent_name = agent_name
         self.system_message = system_message
         self.model_name = model_name
         self.tools = tools or []
-        self.memory = memory or {}
         self.config = config or {}
-        self.knowledge: Dict[str, Any] = self.load_knowledge()
         self.logger = logging.getLogger(self.agent_name)
-        self.messaging_client = MessagingClient()
-        self.db = Database()
-        self.persist_agent()
+        # The broker client, database, knowledge store and memory are created on first
+        # use, and the agent row is written on first use of its memory or tools or by an
+        # explicit persist_agent(), so constructing an agent does no I/O.
+        self._initial_memory = memory
+        # An agent rebuilt from its stored row (memory is that row's view) is already persisted
+        self._persisted = isinstance(memory, AgentMemory) and memory.agent_id == self.agent_id
+
+    @cached_property
+    def messaging_client(self):
+        from messaging.messaging import MessagingClient
+        return MessagingClient()
+
+    @cached_property
+    def db(self):
+        from database.database_setup import Database
+        return Database()
+
+    @cached_property
+    def knowledge(self):
+        return self.load_knowledge()
+
+    @cached_property
+    def memory(self) -> AgentMemory:
+        self.ensure_persisted()
+        memory = self.load_memory(self._initial_memory)
+        self._initial_memory = None
+        return memory
+
+    def ensure_persisted(self) -> None:
+        """
+        Writes the agent row if it has not been written by this instance yet.
+        """
+        if not self._persisted:
+            self.persist_agent()
 
     def persist_agent(self) -> None:
         agent_data = {
@@ -38,10 +62,11 @@ class Agent(ABC):
             'system_message': self.system_message,
             'model_name': self.model_name,
             'tools': self.tools,
-            'memory': self.memory,
-            'config': self.config
+            'config': self.config,
+            'capabilities': self.config.get('capabilities', [])
         }
         self.db.save_agent(agent_data)
+        self._persisted = True
         self.logger.debug(f"Agent {self.agent_id} persisted to database.")
 
     @abstractmethod
@@ -69,33 +94,34 @@ class Agent(ABC):
         return self.execute_tool(tool_id, *args, **kwargs)
 
     def create_tool(self, tool_name: str, tool_description: str, code: str) -> str:
-        tool_id = str(uuid.uuid4())
-        tool_data = {
-            'tool_id': tool_id,
-            'tool_name': tool_name,
-            'tool_description': tool_description,
-            'code': code,
-            'version': '1.0',
-        }
-        self.db.save_tool(tool_data)
-        self.tools.append(tool_id)
-        self.persist_agent()
+        # Identical code under the same name is stored once and shared between agents
+        tool_id = self.db.register_tool(tool_name, tool_description, code)
+        if tool_id not in self.tools:
+            self.tools.append(tool_id)
+            self.persist_agent()
         self.logger.info(f"New tool created: {tool_name} (ID: {tool_id})")
         return tool_id
 
     def execute_tool(self, tool_id: str, *args, **kwargs):
-        tool_data = self.db.get_tool(tool_id)
-        if not tool_data:
-            raise ValueError(f"Tool with ID {tool_id} not found")
-
-        code = tool_data['code']
-        spec = importlib.util.spec_from_loader("dynamic_tool", loader=None)
-        module = importlib.util.module_from_spec(spec)
-        exec(code, module.__dict__)
-        sys.modules["dynamic_tool"] = module
+        return self.run_tool(tool_id, args, kwargs)
 
+    def run_tool(self, tool_id: str, args=(), kwargs: Dict[str, Any] = None, timeout: float = None):
+        """
+        Runs a tool's main(*args, **kwargs) with the backend set in TOOLS['EXECUTION']:
+        'sandbox' runs it in a worker process, 'inprocess' calls the compiled module in
+        this thread. Both raise ToolTimeout after `timeout` seconds; in process, an
+        overrunning call is left running on a background thread.
+        """
+        kwargs = kwargs or {}
         try:
-            result = module.main(*args, **kwargs)
+            if TOOLS['EXECUTION'] == 'sandbox':
+                from tools.sandbox import get_tool_sandbox
+                tool_data = get_tool_runtime().get_tool_data(tool_id, self.db.get_tool)
+                result = get_tool_sandbox().run(tool_data, args, kwargs, timeout=timeout)
+            else:
+                # Compiled once per tool version and cached; the database is read only on a miss
+                main = get_tool_runtime().get(tool_id, self.db.get_tool).main
+                result = call_with_timeout(main, args, kwargs, timeout, name=tool_id)
             self.logger.info(f"Tool {tool_id} executed successfully")
             return result
         except Exception as e:
@@ -118,60 +144,73 @@ class Agent(ABC):
         pass
 
     def create_sub_agent(self, agent_name, system_message, model_name, tools=None):
+        # Imported here because specialized_agent imports this module
+        from agents.specialized_agents.specialized_agent import SpecializedAgent
         sub_agent = SpecializedAgent(agent_name, system_message, model_name, tools)
         self.logger.debug(f"Sub-agent created: {sub_agent.agent_id}")
         return sub_agent
 
+    def load_memory(self, memory: Dict[str, Any] = None) -> AgentMemory:
+        """
+        Returns a lazily loaded view of this agent's stored memory, after writing any
+        initial `memory` values into it.
+        """
+        if isinstance(memory, AgentMemory) and memory.agent_id == self.agent_id:
+            return memory
+        agent_memory = AgentMemory(self.db, self.agent_id)
+        if memory:
+            self.db.update_agent_memory(self.agent_id, dict(memory))
+        return agent_memory
+
     def save_to_memory(self, key, value):
         self.memory[key] = value
-        self.db.update_agent_memory(self.agent_id, self.memory)
         self.logger.debug(f"Memory updated for {self.agent_id}: {key} = {value}")
         
-    def load_knowledge(self) -> Dict[str, Any]:
-        knowledge = {}
-        knowledge_dir = "/app/knowledge"
-        for root, _, files in os.walk(knowledge_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, knowledge_dir)
-                knowledge[relative_path] = self.read_file(file_path)
-        return knowledge
+    def load_knowledge(self):
+        """
+        Returns the process-wide knowledge store. Files are parsed on first access and
+        shared by every agent, so this does no I/O.
+        """
+        from knowledge.knowledge_store import get_knowledge_store
+        return get_knowledge_store()
+
+    def retrieve_knowledge(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Returns the `k` knowledge chunks most relevant to `query`, each with its source,
+        position, content and similarity score.
+        """
+        from knowledge.retriever import get_knowledge_retriever
+        return [dict(metadata, score=score) for score, metadata in get_knowledge_retriever().search(query, k)]
 
     def read_file(self, file_path: str) -> Any:
-        file_extension = os.path.splitext(file_path)[1].lower()
-    
         try:
-            if file_extension in ['.txt', '.md', '.log']:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            
-            elif file_extension == '.json':
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            
-            elif file_extension == '.csv':
-                return pd.read_csv(file_path).to_dict(orient='records')
-            
-            elif file_extension in ['.xlsx', '.xls']:
-                return pd.read_excel(file_path).to_dict(orient='records')
-            
-            elif file_extension == '.pdf':
-                with open(file_path, 'rb') as f:
-                    reader = PdfReader(f)
-                    return ' '.join(page.extract_text() for page in reader.pages)
-            
-            elif file_extension in ['.yaml', '.yml']:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return yaml.safe_load(f)
-            
-            else:
-                self.logger.warning(f"Unsupported file type: {file_extension}")
-                return f"Unsupported file type: {file_extension}"
-        
+            return read_file(file_path)
+        except UnsupportedFileType as e:
+            self.logger.warning(str(e))
+            return str(e)
         except Exception as e:
             self.logger.error(f"Error reading file {file_path}: {str(e)}")
             return f"Error reading file: {str(e)}"
         
+    def health_check(self) -> bool:
+        """
+        Returns True if the agent's database connection is usable. Called by the
+        orchestrator's agent pool before reusing an agent.
+        """
+        self.db.conn.execute('SELECT 1').fetchone()
+        return True
+
+    def close(self) -> None:
+        """
+        Flushes pending database writes and drops the agent's broker client and
+        database handle. Called by the agent pool when the agent is evicted; both are
+        recreated on next use if the agent is still referenced elsewhere.
+        """
+        db = self.__dict__.pop('db', None)
+        if db is not None:
+            db.close()
+        self.__dict__.pop('messaging_client', None)
+
     def report_status(self, task_id: str, status: str) -> None:
         """
         Reports task status to the TaskScheduler agent or logs it appropriately.
@@ -0,0 +1,187 @@
+# agents/agent_pool.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from config.settings import AGENT_POOL
+
+
+class _PooledAgent:
+    __slots__ = ('agent', 'last_used', 'last_checked', 'uses')
+
+    def __init__(self, agent: Any):
+        now = time.monotonic()
+        self.agent = agent
+        self.last_used = now
+        self.last_checked = now
+        self.uses = 0
+
+
+class AgentPool:
+    """
+    Keeps constructed agents warm, keyed by agent identity, so repeated tasks for
+    the same agent reuse one instance instead of rebuilding it.
+
+    At most `max_size` agents are kept; the least recently used is evicted first.
+    Agents idle for more than `idle_timeout` seconds are evicted on the next pool
+    access. Before an agent is reused, if it has not been checked for
+    `health_check_interval` seconds, its health_check() is called; an agent that
+    fails or raises is discarded and rebuilt. Agents that leave the pool for any
+    of these reasons are closed.
+    """
+    def __init__(self, max_size: int = None, idle_timeout: float = None, health_check_interval: float = None):
+        self.logger = logging.getLogger('AgentPool')
+        self.max_size = max_size or AGENT_POOL['MAX_SIZE']
+        self.idle_timeout = idle_timeout if idle_timeout is not None else AGENT_POOL['IDLE_TIMEOUT']
+        self.health_check_interval = (
+            health_check_interval if health_check_interval is not None else AGENT_POOL['HEALTH_CHECK_INTERVAL']
+        )
+        self._agents: "OrderedDict[str, _PooledAgent]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._creating: Dict[str, threading.Lock] = {}
+        self._stats = {'created': 0, 'reused': 0, 'evicted_idle': 0, 'evicted_capacity': 0, 'unhealthy': 0}
+
+    def acquire(self, key: str, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the pooled agent for `key`, building it with `factory()` if there is
+        no healthy one. Concurrent calls for the same key build it once. A factory
+        returning None is passed through and nothing is pooled.
+        """
+        self.evict_idle()
+        agent = self._reuse(key)
+        if agent is not None:
+            return agent
+        with self._lock:
+            creating = self._creating.setdefault(key, threading.Lock())
+        with creating:
+            try:
+                agent = self._reuse(key)
+                if agent is not None:
+                    return agent
+                agent = factory()
+                if agent is not None:
+                    self.add(key, agent)
+                return agent
+            finally:
+                # Cleared even when the factory raises, so waiters retry with a fresh lock
+                with self._lock:
+                    if self._creating.get(key) is creating:
+                        del self._creating[key]
+
+    def add(self, key: str, agent: Any) -> None:
+        """
+        Adds a newly built agent to the pool.
+        """
+        evicted = []
+        with self._lock:
+            self._stats['created'] += 1
+            replaced = self._agents.get(key)
+            if replaced is not None and replaced.agent is not agent:
+                evicted.append(replaced.agent)
+            self._agents[key] = _PooledAgent(agent)
+            self._agents.move_to_end(key)
+            while len(self._agents) > self.max_size:
+                evicted_key, entry = self._agents.popitem(last=False)
+                evicted.append(entry.agent)
+                self._stats['evicted_capacity'] += 1
+                self.logger.debug(f"Evicted agent {evicted_key} to stay within {self.max_size} pooled agents.")
+        self._close_all(evicted)
+
+    def _reuse(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._agents.get(key)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            needs_check = now - entry.last_checked >= self.health_check_interval
+        if needs_check and not self._healthy(entry.agent):
+            with self._lock:
+                if self._agents.get(key) is entry:
+                    del self._agents[key]
+                self._stats['unhealthy'] += 1
+            self.logger.warning(f"Discarding unhealthy pooled agent {key}.")
+            self._close(entry.agent)
+            return None
+        with self._lock:
+            if needs_check:
+                entry.last_checked = now
+            entry.last_used = now
+            entry.uses += 1
+            if key in self._agents:
+                self._agents.move_to_end(key)
+            self._stats['reused'] += 1
+        return entry.agent
+
+    def _healthy(self, agent: Any) -> bool:
+        health_check = getattr(agent, 'health_check', None)
+        if health_check is None:
+            return True
+        try:
+            return bool(health_check())
+        except Exception as e:
+            self.logger.warning(f"Health check raised: {e}")
+            return False
+
+    def _close(self, agent: Any) -> None:
+        """
+        Releases the resources of an agent that has left the pool.
+        """
+        close = getattr(agent, 'close', None)
+        if close is None:
+            return
+        try:
+            close()
+        except Exception as e:
+            self.logger.warning(f"Closing pooled agent raised: {e}")
+
+    def _close_all(self, agents) -> None:
+        # Called outside the pool lock: closing flushes pending database writes
+        for agent in agents:
+            self._close(agent)
+
+    def evict_idle(self) -> int:
+        if not self.idle_timeout:
+            return 0
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            # Entries are in least recently used order, so stop at the first fresh one
+            while self._agents:
+                key, entry = next(iter(self._agents.items()))
+                if entry.last_used > cutoff:
+                    break
+                del self._agents[key]
+                evicted.append(entry.agent)
+            self._stats['evicted_idle'] += len(evicted)
+        self._close_all(evicted)
+        return len(evicted)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            entry = self._agents.pop(key, None)
+        if entry is not None:
+            self._close(entry.agent)
+
+    def clear(self) -> None:
+        """
+        Closes and drops every pooled agent.
+        """
+        with self._lock:
+            entries = list(self._agents.values())
+            self._agents.clear()
+        self._close_all(entry.agent for entry in entries)
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, key) -> bool:
+        return key in self._agents
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._agents), max_size=self.max_size)
+        requests = stats['created'] + stats['reused']
+        stats['reuse_rate'] = stats['reused'] / requests if requests else 0.0
+        return stats
@@ -1,7 +1,21 @@
 # agents/core_agents/__init__.py
 
-from .monitoring_agent.monitoring_agent import MonitoringAgent
-from .notification_agent import NotificationAgent
-from .chat_agent import ChatAgent
-from .security_agent import SecurityAgent
-from .prompt_agent import PromptAgent
+import importlib
+
+# Agents are imported on first attribute access, so importing one core agent module
+# does not import (and require the dependencies of) all of them.
+_EXPORTS = {
+    'MonitoringAgent': '.monitoring_agent.monitoring_agent',
+    'NotificationAgent': '.notification_agent.notification_agent',
+    'ChatAgent': '.chat_agent.chat_agent',
+    'SecurityAgent': '.security_agent.security_agent',
+    'PromptAgent': '.prompt_agent.prompt_agent',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,12 +1,12 @@
 # agents/core_agents/chat_agent.py
 
-import json
 import logging
 import uuid
 from agents.agent_base import Agent
 from agents.process_request import ProcessRequest
 from agents.task import Task
-from messaging.messaging import MessagingClient
+from messaging.consumer import header_key
+from messaging.serialization import encode_message
 
 class ChatAgent(Agent):
     def __init__(self):
@@ -18,9 +18,8 @@ class ChatAgent(Agent):
             config={'superior_agent_id': None}
         )
         self.logger = logging.getLogger(self.agent_name)
-        self.messaging_client = MessagingClient()
         # Start listening for chat messages
-        self.messaging_client.receive_messages('ChatAgent', self.on_chat_message)
+        self.messaging_client.receive_messages('ChatAgent', self.on_chat_message, ordering_key=header_key('user_id'))
 
     def on_chat_message(self, ch, method, properties, body):
         message = body.decode()
@@ -79,7 +78,7 @@ class ChatAgent(Agent):
             process_request = ProcessRequest(process_id=process_id, tasks=tasks)
 
             # Send ProcessRequest to OrchestratorAgent
-            message = json.dumps(process_request, default=lambda o: o.__dict__)
+            message = encode_message(process_request)
             self.messaging_client.send_message('process_requests', message)
             response = "Your report request is being processed. You will receive it shortly."
         else:
@@ -3,7 +3,6 @@
 import logging
 import json
 from agents.agent_base import Agent
-from messaging.messaging import MessagingClient
 
 class NotificationAgent(Agent):
     def __init__(self):
@@ -15,7 +14,6 @@ class NotificationAgent(Agent):
             config={'superior_agent_id': None}
         )
         self.logger = logging.getLogger(self.agent_name)
-        self.messaging_client = MessagingClient()
         # Start listening for notifications
         self.messaging_client.receive_messages('NotificationAgent', self.on_notification_message)
 
@@ -32,9 +32,8 @@ def main():
 
     # Define a callback function for incoming messages
     def on_message(ch, method, properties, body):
-        message = body.decode()
-        logger.debug(f"Received message: {message}")
-        orchestrator.receive_message(message)
+        logger.debug(f"Received message of {len(body)} bytes")
+        orchestrator.receive_message(body)
 
     # Start listening to the 'process_requests' queue
     logger.info("Orchestrator is now listening for process requests.")
@@ -1,12 +1,14 @@
 # agents/orchestrator/orchestrator.py
 
-import json
 import logging
 from config.settings import DATABASE, MESSAGE_BROKER, AGENT_DEFAULTS
 from agents.agent_base import Agent
+from agents.agent_pool import AgentPool
 from agents.core_agents.prompt_agent.prompt_agent import PromptAgent
 from agents.specialized_agents.specialized_agent import SpecializedAgent
 from agents.task import Task
+from database.capability_index import normalize_capabilities
+from messaging.serialization import decode_message, encode_message
 
 class OrchestratorAgent(Agent):
     def __init__(self):
@@ -18,34 +20,34 @@ class OrchestratorAgent(Agent):
         )
         self.logger = logging.getLogger(self.agent_name)
         self.prompt_agent = PromptAgent()
+        self.agent_pool = AgentPool()
 
     def receive_message(self, message):
         self.logger.debug(f"Process request received: {message}")
-        process_request = json.loads(message)
+        process_request = decode_message(message)
         self.handle_process_request(process_request)
 
+    def perform_task(self, task):
+        # The orchestrator's unit of work is a whole process request
+        self.handle_process_request(task)
+
     def handle_process_request(self, process_request):
         tasks = process_request.get('tasks', [])
         for task_data in tasks:
-            task = Task(**task_data)
+            task = Task.from_dict(task_data)
             self.assign_task(task, process_request['process_id'])
 
     def assign_task(self, task, process_id):
         # Find agent with the required capabilities
-        agent_data = self.db.find_agent_by_capabilities(task.capabilities)
-        if not agent_data:
-            # Create a new agent or handle as appropriate
-            agent = self.create_agent_for_task(task)
-        else:
-            agent = self.load_agent_from_data(agent_data)
+        agent = self.get_agent_for_task(task)
 
         # Prepare task message
         task_message = {
             'process_id': process_id,
-            'task': task.__dict__
+            'task': task
         }
         # Send task to the TaskScheduler
-        self.messaging_client.send_message('task_scheduler', json.dumps(task_message))
+        self.messaging_client.send_message('task_scheduler', encode_message(task_message), properties={'headers': {'process_id': process_id}})
         self.logger.info(f"Task {task.task_id} assigned to TaskScheduler.")
 
     def generate_system_prompt(self, task):
@@ -53,6 +55,37 @@ class OrchestratorAgent(Agent):
         self.logger.debug(f"System prompt generated: {system_prompt}")
         return system_prompt
 
+    def get_agent_for_task(self, task):
+        """
+        Returns a warm agent for the task's capabilities from the agent pool, loading
+        the best-ranked registered agent or creating one on a pool miss.
+        """
+        for agent_id, _ in self.db.find_agents_by_capabilities(task.capabilities, limit=1):
+            agent = self.agent_pool.acquire(agent_id, lambda: self.load_agent_by_id(agent_id))
+            if agent is not None:
+                return agent
+        agent = self.create_agent_for_task(task)
+        self.agent_pool.add(agent.agent_id, agent)
+        return agent
+
+    def load_agent_by_id(self, agent_id):
+        agent_data = self.db.get_agent(agent_id)
+        return self.load_agent_from_data(agent_data) if agent_data else None
+
+    def create_agent_for_task(self, task):
+        capabilities = normalize_capabilities(task.capabilities)
+        agent = SpecializedAgent(
+            agent_name='_'.join(capabilities) or task.task_name,
+            system_message=self.generate_system_prompt(task),
+            model_name=AGENT_DEFAULTS['MODEL_NAME'],
+            tools=list(task.tools),
+            config={'capabilities': capabilities}
+        )
+        # Registered right away so later tasks with these capabilities find it
+        agent.persist_agent()
+        self.logger.info(f"Created agent {agent.agent_id} for capabilities {capabilities}.")
+        return agent
+
     def load_agent_from_data(self, agent_data):
         agent = SpecializedAgent(
             agent_name=agent_data['agent_name'],
@@ -60,6 +93,7 @@ class OrchestratorAgent(Agent):
             model_name=agent_data['model_name'],
             tools=agent_data['tools'],
             memory=agent_data['memory'],
-            config=agent_data['config']
+            config=agent_data['config'],
+            agent_id=agent_data['agent_id']
         )
         return agent
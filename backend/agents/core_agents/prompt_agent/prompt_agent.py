@@ -23,3 +23,6 @@ Consider delegating subtasks when appropriate.
 """
         self.logger.debug(f"Prompt generated for task {task.task_id}")
         return prompt
+
+    def perform_task(self, task):
+        return self.generate_prompt(task)
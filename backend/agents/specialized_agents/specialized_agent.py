@@ -2,8 +2,8 @@ from agents.agent_base import Agent
 from typing import Any, Dict, List
 
 class SpecializedAgent(Agent):
-    def __init__(self, agent_name: str, system_message: str, model_name: str, tools: List[str] = None, memory: Dict[str, Any] = None, config: Dict[str, Any] = None):
-        super().__init__(agent_name, system_message, model_name, tools, memory, config)
+    def __init__(self, agent_name: str, system_message: str, model_name: str, tools: List[str] = None, memory: Dict[str, Any] = None, config: Dict[str, Any] = None, agent_id: str = None):
+        super().__init__(agent_name, system_message, model_name, tools, memory, config, agent_id)
 
     def perform_task(self, task: Any) -> Any:
         self.logger.info(f"Starting task {task.task_id}: {task.task_name}")
@@ -19,7 +19,7 @@ class SpecializedAgent(Agent):
                     task.tool_description,
                     task.tool_code
                 )
-                result = self.execute_tool(tool_id, *task.args, **task.kwargs)
+                result = self.run_tool(tool_id, task.args, task.kwargs, timeout=task.timeout)
             else:
                 # Execute the task function
                 result = task.function()
@@ -1,12 +1,11 @@
 # agents/specialized_agents/sql_agent.py
 
-import json
 import logging
 from agents.agent_base import Agent
+from messaging.serialization import encode_message
 from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, func
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import SQLAlchemyError
-from messaging.messaging import MessagingClient
 from datetime import datetime, timedelta
 
 Base = declarative_base()
@@ -34,7 +33,6 @@ class SQLAgent(Agent):
         self.engine = create_engine(self.database_url)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
-        self.messaging_client = MessagingClient()
     
     def perform_task(self, task):
         try:
@@ -55,7 +53,7 @@ class SQLAgent(Agent):
             'status': task.status,
             'result': task.context.get('result')
         }
-        self.messaging_client.send_message('task_scheduler', json.dumps(message))
+        self.messaging_client.send_message('task_scheduler', encode_message(message))
         self.logger.debug(f"Reported completion of task {task.task_id} to TaskScheduler.")
     
     def create_record(self, context):
@@ -9,6 +9,14 @@ class TaskStatus(Enum):
     PAUSED = "PAUSED"
 
 class Task:
+    # Wire schema: field names in encoding order
+    FIELDS = (
+        'task_id', 'task_name', 'task_description', 'capabilities', 'function',
+        'dependencies', 'tools', 'retry_count', 'timeout', 'context', 'status',
+        'version', 'requires_tool', 'tool_name', 'tool_description', 'tool_code',
+        'args', 'kwargs'
+    )
+
     def __init__(self, 
                  task_id: str,
                  task_name: str,
@@ -48,6 +56,29 @@ class Task:
         self.args = args or []
         self.kwargs = kwargs or {}
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Task':
+        """
+        Builds a Task from its wire representation. Unknown keys are ignored and the
+        status is restored to a TaskStatus.
+        """
+        fields = {key: data[key] for key in cls.FIELDS if key in data}
+        status = fields.get('status')
+        if status is not None and not isinstance(status, TaskStatus):
+            fields['status'] = TaskStatus(status)
+        return cls(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the wire representation of the task. Enums are stored by value and a
+        callable function by its dotted name.
+        """
+        data = {key: getattr(self, key) for key in self.FIELDS}
+        data['status'] = self.status.value if isinstance(self.status, TaskStatus) else self.status
+        if callable(self.function):
+            data['function'] = f"{self.function.__module__}.{self.function.__qualname__}"
+        return data
+
     def update_status(self, new_status: TaskStatus) -> None:
         self.status = new_status
 
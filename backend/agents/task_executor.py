@@ -0,0 +1,252 @@
+# agents/task_executor.py
+
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+DEFAULT_CAPABILITY = '*'
+
+
+class ExecutorQueueFull(Exception):
+    """
+    Raised when a non-blocking submit finds the executor queue at capacity.
+    """
+    pass
+
+
+class TaskExecutor(ABC):
+    """
+    Bounded executor used by the TaskScheduler. Work items are queued per capability
+    and only handed to the backend when both the global worker limit and the
+    capability limit allow it, so the backend never holds more than `max_workers`
+    items. When the queue reaches `max_queue_size`, submit blocks (or raises
+    ExecutorQueueFull) to push back on the producer.
+    """
+    mode = None
+
+    def __init__(self, max_workers: int = 16, capability_limits: Dict[str, int] = None, max_queue_size: int = 1000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_workers = max_workers
+        self.capability_limits = capability_limits or {}
+        self.max_queue_size = max_queue_size
+        self._condition = threading.Condition()
+        self._pending: Dict[str, Deque] = {}
+        self._pending_count = 0
+        self._active = 0
+        self._active_by_capability: Dict[str, int] = {}
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._shutdown = False
+
+    def submit(self, capability: Optional[str], fn: Callable, *args, block: bool = True, timeout: float = None, **kwargs) -> Future:
+        """
+        Queues `fn(*args, **kwargs)` under `capability` and returns a Future for its result.
+        """
+        capability = capability or DEFAULT_CAPABILITY
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Executor has been shut down")
+            if self._pending_count >= self.max_queue_size:
+                if not block:
+                    self._rejected += 1
+                    raise ExecutorQueueFull(f"Executor queue is full ({self.max_queue_size} pending)")
+                if not self._condition.wait_for(lambda: self._pending_count < self.max_queue_size or self._shutdown, timeout):
+                    self._rejected += 1
+                    raise ExecutorQueueFull(f"Timed out waiting for executor queue ({self.max_queue_size} pending)")
+                if self._shutdown:
+                    raise RuntimeError("Executor has been shut down")
+            self._pending.setdefault(capability, deque()).append((future, fn, args, kwargs))
+            self._pending_count += 1
+            items = self._take_runnable()
+        self._start_all(items)
+        return future
+
+    def _take_runnable(self):
+        # Must be called with the condition held. Round-robins over capabilities so a
+        # saturated capability does not block the others.
+        items = []
+        while self._active < self.max_workers and self._pending_count:
+            progressed = False
+            for capability in list(self._pending):
+                if self._active >= self.max_workers:
+                    break
+                queue = self._pending[capability]
+                limit = self.capability_limits.get(capability)
+                if limit is not None and self._active_by_capability.get(capability, 0) >= limit:
+                    continue
+                item = queue.popleft()
+                if not queue:
+                    del self._pending[capability]
+                self._pending_count -= 1
+                self._active += 1
+                self._active_by_capability[capability] = self._active_by_capability.get(capability, 0) + 1
+                items.append((capability, item))
+                progressed = True
+            if not progressed:
+                break
+        if items:
+            self._condition.notify_all()
+        return items
+
+    def _start_all(self, items):
+        for capability, (future, fn, args, kwargs) in items:
+            if not future.set_running_or_notify_cancel():
+                self._on_done(capability)
+                continue
+            try:
+                backend_future = self._start(fn, args, kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                self._on_done(capability, failed=True)
+                continue
+            backend_future.add_done_callback(
+                lambda f, future=future, capability=capability: self._finish(future, f, capability)
+            )
+
+    def _finish(self, future: Future, backend_future, capability: str):
+        error = backend_future.exception()
+        if error is not None:
+            self.logger.error(f"Work item for capability '{capability}' failed: {error}")
+            future.set_exception(error)
+        else:
+            future.set_result(backend_future.result())
+        self._on_done(capability, failed=error is not None)
+
+    def _on_done(self, capability: str, failed: bool = False):
+        with self._condition:
+            self._active -= 1
+            self._active_by_capability[capability] -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            items = self._take_runnable()
+            self._condition.notify_all()
+        self._start_all(items)
+
+    @abstractmethod
+    def _start(self, fn: Callable, args, kwargs):
+        """
+        Hands a work item to the backend and returns a concurrent.futures.Future.
+        """
+        pass
+
+    def queue_depth(self) -> int:
+        with self._condition:
+            return self._pending_count
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns queue depth and pool usage for monitoring.
+        """
+        with self._condition:
+            return {
+                'mode': self.mode,
+                'max_workers': self.max_workers,
+                'active': self._active,
+                'utilization': self._active / self.max_workers if self.max_workers else 0.0,
+                'queue_depth': self._pending_count,
+                'queue_capacity': self.max_queue_size,
+                'active_by_capability': {k: v for k, v in self._active_by_capability.items() if v},
+                'pending_by_capability': {k: len(v) for k, v in self._pending.items()},
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            with self._condition:
+                self._condition.wait_for(lambda: self._active == 0 and self._pending_count == 0)
+        self._shutdown_backend(wait)
+
+    @abstractmethod
+    def _shutdown_backend(self, wait: bool) -> None:
+        pass
+
+
+class ThreadPoolTaskExecutor(TaskExecutor):
+    mode = 'thread'
+
+    def __init__(self, max_workers: int = 16, capability_limits: Dict[str, int] = None, max_queue_size: int = 1000):
+        super().__init__(max_workers, capability_limits, max_queue_size)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='task-worker')
+
+    def _start(self, fn, args, kwargs):
+        return self.pool.submit(fn, *args, **kwargs)
+
+    def _shutdown_backend(self, wait):
+        self.pool.shutdown(wait=wait)
+
+
+class ProcessPoolTaskExecutor(TaskExecutor):
+    """
+    Runs work items in worker processes. Submitted callables and their arguments
+    must be picklable, so this mode suits CPU-bound functions rather than bound
+    methods holding connections or locks.
+    """
+    mode = 'process'
+
+    def __init__(self, max_workers: int = 4, capability_limits: Dict[str, int] = None, max_queue_size: int = 1000):
+        super().__init__(max_workers, capability_limits, max_queue_size)
+        self.pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def _start(self, fn, args, kwargs):
+        return self.pool.submit(fn, *args, **kwargs)
+
+    def _shutdown_backend(self, wait):
+        self.pool.shutdown(wait=wait)
+
+
+class AsyncioTaskExecutor(TaskExecutor):
+    """
+    Runs work items on an event loop in a background thread. Coroutine functions are
+    awaited on the loop; plain callables run in the loop's default thread pool.
+    """
+    mode = 'asyncio'
+
+    def __init__(self, max_workers: int = 64, capability_limits: Dict[str, int] = None, max_queue_size: int = 1000):
+        super().__init__(max_workers, capability_limits, max_queue_size)
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name='task-executor-loop', daemon=True)
+        self.loop_thread.start()
+
+    def _start(self, fn, args, kwargs):
+        return asyncio.run_coroutine_threadsafe(self._run(fn, args, kwargs), self.loop)
+
+    async def _run(self, fn, args, kwargs):
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args, **kwargs)
+        return await self.loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    def _shutdown_backend(self, wait):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if wait:
+            self.loop_thread.join()
+
+
+EXECUTOR_MODES = {
+    'thread': ThreadPoolTaskExecutor,
+    'asyncio': AsyncioTaskExecutor,
+    'process': ProcessPoolTaskExecutor,
+}
+
+
+def create_executor(mode: str = 'thread', **kwargs) -> TaskExecutor:
+    """
+    Builds a TaskExecutor for the given mode ('thread', 'asyncio' or 'process').
+    """
+    try:
+        executor_class = EXECUTOR_MODES[mode]
+    except KeyError:
+        raise ValueError(f"Unknown executor mode: {mode}")
+    return executor_class(**kwargs)
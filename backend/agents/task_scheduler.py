@@ -1,58 +1,175 @@
 import threading
-import json
 import logging
-from typing import Any, Dict, List
+from collections import deque
+from typing import Any, Deque, Dict, List, Set
+from config.settings import TASK_EXECUTOR
+from database.database_setup import Database
+from messaging.consumer import header_key
 from messaging.messaging import MessagingClient
+from messaging.serialization import decode_message, encode_message
 from agents.task import Task, TaskStatus
+from agents.task_executor import TaskExecutor, create_executor
 
 class TaskScheduler:
-    def __init__(self):
+    """
+    Schedules the task DAGs of processes onto the executor.
+
+    Every status change is recorded with Database.save_task, which batches the
+    writes. On start the scheduler reloads unfinished tasks and resumes their DAGs:
+    tasks that were in progress are queued again, since their outcome was not
+    recorded, so a task may run more than once after a crash.
+    """
+    def __init__(self, messaging_client: MessagingClient = None, executor: TaskExecutor = None, listen: bool = True,
+                 db: Database = None, recover: bool = True):
         self.logger = logging.getLogger('TaskScheduler')
-        self.messaging_client = MessagingClient()
+        self.messaging_client = messaging_client or MessagingClient()
+        self.db = db or Database()
         self.tasks: Dict[str, Task] = {}  # Stores tasks by task_id
         self.processes: Dict[str, List[Task]] = {}  # Stores tasks grouped by process_id
+        # DAG indexes: owning process, reverse dependencies and unmet dependency counters
+        self.task_process: Dict[str, str] = {}
+        self.dependents: Dict[str, List[str]] = {}
+        self.unmet_dependencies: Dict[str, int] = {}
+        self.ready: Dict[str, Deque[str]] = {}  # Ready queue per process_id
+        self.failed: Set[str] = set()
+        self.completed_before_restart: Set[str] = set()  # completed dependencies of recovered tasks
         self.lock = threading.Lock()
-        self.max_parallel_tasks = 5  # Configurable parameter for parallel execution
+        # Bounded worker pool; enforces the global and per-capability concurrency limits
+        self.executor = executor or create_executor(
+            TASK_EXECUTOR['MODE'],
+            max_workers=TASK_EXECUTOR['MAX_WORKERS'],
+            capability_limits=TASK_EXECUTOR['CAPABILITY_LIMITS'],
+            max_queue_size=TASK_EXECUTOR['MAX_QUEUE_SIZE']
+        )
+        if self.executor.mode == 'process':
+            # execute_task is bound to the scheduler's locks, database and broker client, which cannot be pickled
+            raise ValueError("TaskScheduler cannot use the 'process' executor mode; use 'thread' or 'asyncio'")
+        if recover:
+            self.recover()
         # Start listening for tasks
-        threading.Thread(target=self.listen_for_tasks, daemon=True).start()
+        if listen:
+            threading.Thread(target=self.listen_for_tasks, daemon=True).start()
 
     def listen_for_tasks(self):
-        self.messaging_client.receive_messages('task_scheduler', self.on_task_message)
+        # Tasks of one process are handled in delivery order; different processes run concurrently
+        self.messaging_client.receive_messages('task_scheduler', self.on_task_message, ordering_key=header_key('process_id'))
 
     def on_task_message(self, ch, method, properties, body):
-        message = json.loads(body.decode())
+        message = decode_message(body)
         process_id = message['process_id']
         task_data = message['task']
-        task = Task(**task_data)
-        with self.lock:
-            self.tasks[task.task_id] = task
-            if process_id not in self.processes:
-                self.processes[process_id] = []
-            self.processes[process_id].append(task)
+        task = Task.from_dict(task_data)
+        self.add_task(process_id, task, persist=True)
         self.logger.debug(f"Received task {task.task_id} for process {process_id}.")
         self.schedule_tasks(process_id)
 
+    def add_task(self, process_id: str, task: Task, persist: bool = False) -> None:
+        """
+        Registers a task in the DAG indexes. Dependencies that are unknown or not yet
+        completed count as unmet; the task becomes ready once the counter reaches zero.
+        With `persist`, the task is also recorded in the task store.
+        """
+        if persist:
+            self.db.save_task(process_id, task)
+        with self.lock:
+            self.tasks[task.task_id] = task
+            self.processes.setdefault(process_id, []).append(task)
+            self.task_process[task.task_id] = process_id
+            unmet = 0
+            for dep_id in task.dependencies:
+                self.dependents.setdefault(dep_id, []).append(task.task_id)
+                dependency = self.tasks.get(dep_id)
+                if dependency is None and dep_id in self.completed_before_restart:
+                    continue
+                if dependency is None or dependency.status != TaskStatus.COMPLETED:
+                    unmet += 1
+            self.unmet_dependencies[task.task_id] = unmet
+            if unmet == 0 and task.status == TaskStatus.PENDING:
+                self.ready.setdefault(process_id, deque()).append(task.task_id)
+
     def schedule_tasks(self, process_id):
         with self.lock:
-            tasks = self.processes.get(process_id, [])
-            executable_tasks = [
-                task for task in tasks 
-                if task.status == TaskStatus.PENDING and self.dependencies_satisfied(task)
-            ]
-            
-            # Execute tasks in parallel up to max_parallel_tasks
-            for task in executable_tasks[:self.max_parallel_tasks]:
-                threading.Thread(target=self.execute_task, args=(task,), daemon=True).start()
+            ready = self.ready.get(process_id)
+            executable_tasks = []
+            # Hand every ready task to the executor; it bounds concurrency and applies backpressure
+            while ready:
+                task = self.tasks[ready.popleft()]
+                if task.status != TaskStatus.PENDING:
+                    continue
+                task.update_status(TaskStatus.IN_PROGRESS)
+                executable_tasks.append(task)
+
+        for task in executable_tasks:
+            self.record(task)
+            self.dispatch(task)
+
+    def record(self, task: Task) -> None:
+        """
+        Persists the task's current status.
+        """
+        self.db.save_task(self.task_process.get(task.task_id), task)
+
+    def recover(self) -> int:
+        """
+        Reloads unfinished tasks from the task store and resumes their processes.
+        Returns the number of tasks recovered.
+        """
+        unfinished = [(process_id, Task.from_dict(data)) for process_id, data in self.db.load_unfinished_tasks()]
+        if not unfinished:
+            return 0
+        live = {task.task_id for _, task in unfinished}
+        dependencies = {dep_id for _, task in unfinished for dep_id in task.dependencies if dep_id not in live}
+        self.completed_before_restart.update(self.db.get_completed_task_ids(dependencies))
+        for process_id, task in unfinished:
+            if task.status == TaskStatus.IN_PROGRESS:
+                # The outcome was never recorded, so the task runs again
+                task.update_status(TaskStatus.PENDING)
+            self.add_task(process_id, task)
+            if task.status == TaskStatus.FAILED:
+                with self.lock:
+                    self.failed.add(task.task_id)
+        processes = {process_id for process_id, _ in unfinished}
+        self.logger.info(f"Recovered {len(unfinished)} unfinished tasks in {len(processes)} processes.")
+        for process_id in processes:
+            self.schedule_tasks(process_id)
+        return len(unfinished)
+
+    def dispatch(self, task: Task):
+        future = self.executor.submit(self.get_capability_key(task), self.execute_task, task)
+        future.add_done_callback(lambda done: self._on_dispatch_done(task, done))
+
+    def _on_dispatch_done(self, task: Task, future) -> None:
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Dispatching task {task.task_id} failed: {error}")
+            self.report_failure(task, f"Dispatch failed: {error}")
+
+    def get_capability_key(self, task: Task) -> str:
+        capabilities = task.capabilities
+        if isinstance(capabilities, str):
+            return capabilities
+        return capabilities[0] if capabilities else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns scheduler and worker pool metrics for monitoring.
+        """
+        with self.lock:
+            ready_depth = sum(len(queue) for queue in self.ready.values())
+            tracked = len(self.tasks)
+        stats = self.executor.stats()
+        stats.update({'ready_depth': ready_depth, 'tracked_tasks': tracked})
+        return stats
 
     def dependencies_satisfied(self, task: Task) -> bool:
-        return all(self.tasks[dep_id].status == TaskStatus.COMPLETED for dep_id in task.dependencies)
+        return self.unmet_dependencies.get(task.task_id, 0) == 0
 
     def execute_task(self, task: Task):
         task.update_status(TaskStatus.IN_PROGRESS)
         self.logger.info(f"Executing task {task.task_id}.")
         agent_queue = self.get_agent_queue(task.capabilities)
         if agent_queue:
-            task_message = json.dumps(task.__dict__)
+            task_message = encode_message(task)
             self.messaging_client.send_message(agent_queue, task_message)
         else:
             self.logger.error(f"No agent available for capabilities: {task.capabilities}")
@@ -74,30 +191,51 @@ class TaskScheduler:
 
     def report_failure(self, task: Task, error_message: str):
         task.update_status(TaskStatus.FAILED)
+        self.record(task)
+        with self.lock:
+            self.failed.add(task.task_id)
         failure_message = {
             'task_id': task.task_id,
             'error': error_message
         }
-        self.messaging_client.send_message('orchestrator_failures', json.dumps(failure_message))
+        self.messaging_client.send_message('orchestrator_failures', encode_message(failure_message))
         self.logger.debug(f"Reported failure for task {task.task_id}: {error_message}")
 
     def on_task_completion(self, task_id: str, result: Any):
         with self.lock:
             task = self.tasks.get(task_id)
-            if task:
-                task.update_status(TaskStatus.COMPLETED)
-                self.logger.info(f"Task {task_id} completed successfully.")
-                # Reschedule tasks that might now be ready
-                for process_id, tasks in self.processes.items():
-                    if task in tasks:
-                        self.schedule_tasks(process_id)
-                        break
+            if not task or task.status == TaskStatus.COMPLETED:
+                return
+            task.update_status(TaskStatus.COMPLETED)
+            self.failed.discard(task_id)
+            self.logger.info(f"Task {task_id} completed successfully.")
+            # Release only the direct dependents of the completed task
+            for dependent_id in self.dependents.get(task_id, []):
+                self.unmet_dependencies[dependent_id] -= 1
+                dependent = self.tasks.get(dependent_id)
+                if self.unmet_dependencies[dependent_id] == 0 and dependent and dependent.status == TaskStatus.PENDING:
+                    self.ready.setdefault(self.task_process[dependent_id], deque()).append(dependent_id)
+            process_id = self.task_process.get(task_id)
+        self.record(task)
+        if process_id is not None:
+            self.schedule_tasks(process_id)
 
     def retry_failed_tasks(self):
+        to_schedule = set()
+        retried = []
         with self.lock:
-            for task in self.tasks.values():
+            for task_id in list(self.failed):
+                task = self.tasks[task_id]
                 if task.status == TaskStatus.FAILED and task.retry_count > 0:
                     task.retry_count -= 1
                     task.update_status(TaskStatus.PENDING)
+                    retried.append(task)
+                    self.failed.discard(task_id)
+                    process_id = self.task_process[task_id]
+                    self.ready.setdefault(process_id, deque()).append(task_id)
+                    to_schedule.add(process_id)
                     self.logger.info(f"Retrying task {task.task_id}. Attempts left: {task.retry_count}")
-                    self.schedule_tasks(task.process_id)
\ No newline at end of file
+        for task in retried:
+            self.record(task)
+        for process_id in to_schedule:
+            self.schedule_tasks(process_id)
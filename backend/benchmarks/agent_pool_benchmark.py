@@ -0,0 +1,50 @@
+# benchmarks/agent_pool_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-task agent lookup overhead in the orchestrator, with and without the agent pool")
+    parser.add_argument("--tasks", type=int, default=2_000)
+    parser.add_argument("--capabilities", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Database() and the knowledge store use paths relative to the working directory
+        os.chdir(directory)
+        os.environ.setdefault('KNOWLEDGE_DIR', directory)
+        from agents.core_agents.orchestration_agent.orchestrator import OrchestratorAgent
+        from agents.task import Task
+
+        orchestrator = OrchestratorAgent()
+        tasks = [
+            Task(f"task-{i}", f"task_{i}", "benchmark task", [f"capability_{i % args.capabilities}"], None)
+            for i in range(args.tasks)
+        ]
+
+        started = time.perf_counter()
+        for task in tasks:
+            orchestrator.load_agent_by_id(orchestrator.get_agent_for_task(task).agent_id)
+        unpooled = (time.perf_counter() - started) / len(tasks)
+
+        orchestrator.agent_pool = type(orchestrator.agent_pool)()
+        started = time.perf_counter()
+        for task in tasks:
+            orchestrator.get_agent_for_task(task)
+        pooled = (time.perf_counter() - started) / len(tasks)
+
+        stats = orchestrator.agent_pool.stats()
+        print(f"{args.tasks} tasks over {args.capabilities} capabilities")
+        print(f"rebuild per task: {unpooled * 1e6:>9.1f} us/task")
+        print(f"agent pool:       {pooled * 1e6:>9.1f} us/task "
+              f"(created {stats['created']}, reused {stats['reused']}, reuse rate {stats['reuse_rate']:.1%})")
+
+
+if __name__ == '__main__':
+    main()
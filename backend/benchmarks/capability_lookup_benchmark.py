@@ -0,0 +1,55 @@
+# benchmarks/capability_lookup_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database_setup import Database
+
+CAPABILITIES = ['nlp_to_sql', 'database_operations', 'template_management', 'report_generation', 'notification']
+
+
+def populate(database, agents):
+    for index in range(agents):
+        database.save_agent({
+            'agent_id': f"agent-{index}", 'agent_name': f"agent_{index}", 'system_message': '', 'model_name': 'gpt-4',
+            'tools': [], 'memory': {}, 'config': {}, 'capabilities': [CAPABILITIES[index % len(CAPABILITIES)], f"skill_{index}"],
+        })
+    database.flush()
+
+
+def time_lookups(lookup, lookups):
+    started = time.perf_counter()
+    for index in range(lookups):
+        lookup(CAPABILITIES[index % len(CAPABILITIES)])
+    return (time.perf_counter() - started) / lookups * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent capability lookup cost as the number of agents grows")
+    parser.add_argument("--agents", type=int, nargs='+', default=[100, 1_000, 10_000, 50_000])
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'agents':>7} {'LIKE scan (us)':>15} {'index (us)':>11}")
+    for agents in args.agents:
+        with tempfile.TemporaryDirectory() as directory:
+            database = Database(os.path.join(directory, 'bench.db'))
+            populate(database, agents)
+
+            def like_scan(capability):
+                # The previous lookup: an unindexed scan of agent names
+                return database.conn.execute('SELECT * FROM agents WHERE agent_name LIKE ?', ('%' + capability + '%',)).fetchone()
+
+            scan = time_lookups(like_scan, args.lookups)
+            indexed = time_lookups(database.find_agent_by_capabilities, args.lookups)
+            print(f"{agents:>7} {scan:>15.1f} {indexed:>11.1f}")
+            database.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/constrained_decoding_benchmark.py
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from inference_engine_benchmark import load_tiny_model
+from modes.constrained_decoding import JsonSchemaLogitsProcessor, JsonSchemaMatcher
+from modes.inference_engine import InferenceEngine
+from prefix_cache_benchmark import SCHEMA
+
+
+def is_valid(text):
+    matcher = JsonSchemaMatcher(SCHEMA)
+    return matcher.advance(text.strip()) and matcher.complete
+
+
+def retry_mode(engine, prompt, max_depth, max_new_tokens):
+    """
+    Generates freely and re-prompts with the failure until the answer validates,
+    like generate_json_completion's repair loop.
+    """
+    tokens = 0
+    for depth in range(max_depth):
+        request = engine.submit(prompt, max_new_tokens=max_new_tokens, do_sample=False, reuse_prefix=True)
+        request.result()
+        tokens += len(request.generated_ids)
+        if is_valid(request.text):
+            return tokens, depth + 1, True
+        prompt += request.text + "\nTool: Json schema validation failed. Please return correct json object\nAssistant:"
+    return tokens, max_depth, False
+
+
+def constrained_mode(engine, tokenizer, prompt, max_new_tokens, max_string_length):
+    processor = JsonSchemaLogitsProcessor(tokenizer, SCHEMA, engine.eos_token_ids, max_string_length=max_string_length)
+    request = engine.submit(prompt, max_new_tokens=max_new_tokens, do_sample=False, logits_processor=processor)
+    request.result()
+    return len(request.generated_ids), 1, is_valid(request.text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON mode: validate-and-retry versus schema-constrained decoding")
+    parser.add_argument("--model_path", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--max_depth", type=int, default=5)
+    parser.add_argument("--max_new_tokens", type=int, default=160)
+    # An untrained model never closes a string on its own; real models do not need this
+    parser.add_argument("--max_string_length", type=int, default=12)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model, tokenizer = load_tiny_model(args.model_path)
+    system = (
+        "You are a helpful assistant that answers in JSON. Here's the json schema you must adhere to:\n"
+        f"<schema>\n{json.dumps(SCHEMA, indent=2)}\n</schema>\n"
+    )
+    prompts = [system + f"User: Describe character {i} as a JSON object.\nAssistant:" for i in range(args.queries)]
+
+    for label in ("retry", "constrained"):
+        engine = InferenceEngine(model, tokenizer, max_new_tokens=args.max_new_tokens)
+        tokens = generations = valid = 0
+        started = time.perf_counter()
+        for prompt in prompts:
+            if label == "retry":
+                result = retry_mode(engine, prompt, args.max_depth, args.max_new_tokens)
+            else:
+                result = constrained_mode(engine, tokenizer, prompt, args.max_new_tokens, args.max_string_length)
+            tokens += result[0]
+            generations += result[1]
+            valid += result[2]
+        elapsed = time.perf_counter() - started
+        engine.stop()
+        print(f"{label:>11}: {valid}/{args.queries} valid, {tokens / args.queries:.0f} tokens and "
+              f"{generations / args.queries:.1f} generations per query, {elapsed / args.queries * 1e3:.0f} ms per query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/database_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.database_setup import Database
+
+
+def run(db_file, write_behind, agents, writes):
+    database = Database(db_file, write_behind=write_behind)
+    for index in range(agents):
+        agent_id = f"agent-{index}"
+        database.save_agent({
+            'agent_id': agent_id, 'agent_name': f"agent_{index}", 'system_message': '', 'model_name': 'gpt-4',
+            'tools': [], 'memory': {}, 'config': {},
+        })
+    database.flush()
+    started = time.perf_counter()
+    for write in range(writes):
+        # The same call Agent.save_to_memory makes
+        database.set_agent_memory(f"agent-{write % agents}", f"key_{write % 50}", write)
+    database.close()
+    elapsed = time.perf_counter() - started
+    return elapsed, database.rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent memory write throughput with and without write-behind")
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"{args.writes} memory writes across {args.agents} agents")
+    print(f"{'mode':<14} {'writes/s':>10} {'rows written':>13}")
+    for label, write_behind in (('synchronous', False), ('write-behind', True)):
+        with tempfile.TemporaryDirectory() as directory:
+            elapsed, rows = run(os.path.join(directory, 'bench.db'), write_behind, args.agents, args.writes)
+            rows = rows if write_behind else args.writes
+            print(f"{label:<14} {args.writes / elapsed:>10.0f} {rows:>13}")
+
+
+if __name__ == '__main__':
+    main()
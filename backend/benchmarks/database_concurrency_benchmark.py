@@ -0,0 +1,96 @@
+# benchmarks/database_concurrency_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite3
+from database import connection_pool
+from database.database_setup import Database
+
+
+class SharedConnectionPool(connection_pool.SQLiteConnectionPool):
+    """
+    The previous setup: one connection in rollback-journal mode shared by every
+    thread, with access serialized by a lock.
+    """
+    def __init__(self, db_file):
+        super().__init__(db_file, pragmas={})
+        self._shared = sqlite3.connect(db_file, check_same_thread=False)
+        self.guard = threading.Lock()
+
+    def connection(self):
+        return self._shared
+
+
+def run(database, threads, operations, agents, write_ratio):
+    errors = []
+
+    def worker(worker_id):
+        try:
+            for index in range(operations):
+                agent_id = f"agent-{(worker_id * operations + index) % agents}"
+                if index % 100 < write_ratio * 100:
+                    database.set_agent_memory(agent_id, f"key_{index % 20}", {'value': index})
+                else:
+                    database.get_agent_memory(agent_id, f"key_{index % 20}")
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return threads * operations / elapsed
+
+
+class LockedDatabase(Database):
+    """
+    Serializes every call, as sharing one connection across threads requires.
+    """
+    def set_agent_memory(self, *args):
+        with self.pool.guard:
+            return super().set_agent_memory(*args)
+
+    def get_agent_memory(self, *args):
+        with self.pool.guard:
+            return super().get_agent_memory(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite read/write throughput across threads")
+    parser.add_argument("--threads", type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument("--operations", type=int, default=2_000, help="Operations per thread")
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{args.write_ratio:.0%} writes, synchronous commits (write-behind off)")
+    print(f"{'threads':>7} {'shared conn ops/s':>18} {'pooled WAL ops/s':>17}")
+    for threads in args.threads:
+        results = []
+        for pooled in (False, True):
+            with tempfile.TemporaryDirectory() as directory:
+                db_file = os.path.join(directory, 'bench.db')
+                if pooled:
+                    database = Database(db_file, write_behind=False)
+                else:
+                    connection_pool._pools[os.path.abspath(db_file)] = SharedConnectionPool(db_file)
+                    database = LockedDatabase(db_file, write_behind=False)
+                results.append(run(database, threads, args.operations, args.agents, args.write_ratio))
+                database.pool.close_all()
+        print(f"{threads:>7} {results[0]:>18.0f} {results[1]:>17.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/embedding_service_benchmark.py
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.vector_index import HashEmbedding
+from models.embedding_service import EmbeddingCache, EmbeddingService
+
+
+class SlowBackend(HashEmbedding):
+    """
+    Hash embedding with the latency profile of a remote embedding API: a fixed cost
+    per call plus a small cost per text.
+    """
+    def __init__(self, call_latency: float, text_latency: float):
+        super().__init__(384)
+        self.call_latency = call_latency
+        self.text_latency = text_latency
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.call_latency + self.text_latency * len(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def run(embedder, workload, threads):
+    def worker(queries):
+        for query in queries:
+            embedder.embed_query(query)
+    shards = [workload[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding cache, coalescing and batching benchmark")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--distinct", type=int, default=300, help="Distinct texts in the workload")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--call-latency", type=float, default=0.02)
+    parser.add_argument("--text-latency", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [f"quarterly report {i} for region {i % 12}" for i in range(args.distinct)]
+    # Skewed popularity, as with repeated queries and shared knowledge chunks
+    workload = [texts[min(int(rng.paretovariate(1.2)) - 1, args.distinct - 1)] for _ in range(args.requests)]
+
+    direct = SlowBackend(args.call_latency, args.text_latency)
+    elapsed = run(direct, workload, args.threads)
+    print(f"{'direct':<10} {elapsed:>7.2f}s {args.requests / elapsed:>9.0f} req/s {direct.calls:>6} backend calls")
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SlowBackend(args.call_latency, args.text_latency)
+        service = EmbeddingService(backend, 'bench', cache=EmbeddingCache(path=os.path.join(directory, 'cache.sqlite')))
+        elapsed = run(service, workload, args.threads)
+        stats = service.stats()
+        print(f"{'service':<10} {elapsed:>7.2f}s {args.requests / elapsed:>9.0f} req/s {backend.calls:>6} backend calls")
+        print(f"hit rate {stats['hit_rate']:.1%}, coalesced {stats['coalesced']}, "
+              f"avg batch {stats['avg_batch_size']:.1f}, avg request {stats['avg_request_ms']:.2f} ms")
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/inference_engine_benchmark.py
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from modes.inference_engine import InferenceEngine
+
+
+def load_tiny_model(model_path):
+    # CPU-only and small enough to run anywhere
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    return model, tokenizer
+
+
+def run_clients(engine, prompts, max_new_tokens):
+    requests, threads = [], []
+
+    def client(prompt):
+        request = engine.submit(prompt, max_new_tokens=max_new_tokens, do_sample=False)
+        requests.append(request)
+        for _ in request.stream():
+            pass
+
+    started = time.perf_counter()
+    for prompt in prompts:
+        thread = threading.Thread(target=client, args=(prompt,))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent generation with and without dynamic batching")
+    parser.add_argument("--model_path", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--max_new_tokens", type=int, default=64)
+    parser.add_argument("--max_batch_size", type=int, default=8)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model, tokenizer = load_tiny_model(args.model_path)
+    prompts = [f"Describe character number {i} as a JSON object with a name and a role." for i in range(args.clients)]
+
+    for label, batch_size in (("one at a time", 1), ("dynamic batching", args.max_batch_size)):
+        engine = InferenceEngine(model, tokenizer, max_batch_size=batch_size, max_wait=0.02)
+        elapsed = run_clients(engine, prompts, args.max_new_tokens)
+        stats = engine.stats()
+        engine.stop()
+        print(f"{label:>17}: {elapsed:.2f}s wall, {stats['tokens_per_second']:.0f} tokens/s, "
+              f"avg batch {stats['avg_batch_size']:.1f}, avg TTFT {stats['avg_ttft_ms']:.0f} ms, "
+              f"p95 TTFT {stats['p95_ttft_ms']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/ingestion_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.chunking import iter_chunks
+
+
+def write_text(path, size_mb):
+    line = "The quarterly report covers revenue, churn and regional growth figures.\n"
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(size_mb * 1024 * 1024 // len(line)):
+            f.write(line)
+
+
+def write_csv(path, size_mb):
+    row = "1234,region_7,2024-03-31,98765.43,quarterly revenue figure\n"
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("id,region,date,revenue,description\n")
+        for _ in range(size_mb * 1024 * 1024 // len(row)):
+            f.write(row)
+
+
+def write_text_one_line(path, size_mb):
+    words = "quarterly revenue churn regional growth figures "
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(size_mb * 1024 * 1024 // len(words)):
+            f.write(words)
+
+
+def write_json(path, size_mb, key=None):
+    item = '{"id": 1234, "region": "region_7", "revenue": 98765.43, "description": "quarterly revenue figure"}'
+    count = size_mb * 1024 * 1024 // (len(item) + 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[' if key is None else f'{{"{key}": [')
+        for i in range(count):
+            f.write(item if i == 0 else ',' + item)
+        f.write(']' if key is None else ']}')
+
+
+def write_json_nested(path, size_mb):
+    # One top-level key over a large array, the shape of most API exports
+    write_json(path, size_mb, key='data')
+
+
+WRITERS = [
+    ('txt', '.txt', write_text),
+    ('txt-1ln', '.txt', write_text_one_line),
+    ('csv', '.csv', write_csv),
+    ('json', '.json', write_json),
+    ('json-key', '.json', write_json_nested),
+]
+
+
+def measure(path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = 0
+    for _ in iter_chunks(path):
+        chunks += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ingestion peak-memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[8, 32, 128], help="File sizes in MB")
+    args = parser.parse_args()
+
+    print(f"{'format':<9} {'size (MB)':>10} {'chunks':>9} {'time (s)':>9} {'peak traced (MB)':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, extension, writer in WRITERS:
+            for size_mb in args.sizes:
+                path = os.path.join(directory, f"knowledge_{size_mb}{extension}")
+                writer(path, size_mb)
+                chunks, elapsed, peak = measure(path)
+                print(f"{label:<9} {size_mb:>10} {chunks:>9} {elapsed:>9.2f} {peak / 1024 / 1024:>17.2f}")
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/json_stream_benchmark.py
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from inference_engine_benchmark import load_tiny_model
+from modes.constrained_decoding import JsonStreamValidator
+from modes.inference_engine import InferenceEngine
+from prefix_cache_benchmark import SCHEMA
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON mode turns validated after generation versus while streaming")
+    parser.add_argument("--model_path", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--max_new_tokens", type=int, default=256)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model, tokenizer = load_tiny_model(args.model_path)
+    prompts = [
+        "You are a helpful assistant that answers in JSON. Here's the json schema you must adhere to:\n"
+        f"<schema>\n{json.dumps(SCHEMA)}\n</schema>\nUser: Describe character {i}.\nAssistant:"
+        for i in range(args.queries)
+    ]
+
+    for label, streaming in (("validate after", False), ("validate streaming", True)):
+        engine = InferenceEngine(model, tokenizer, max_new_tokens=args.max_new_tokens)
+        tokens = valid = 0
+        started = time.perf_counter()
+        for prompt in prompts:
+            validator = JsonStreamValidator(SCHEMA)
+            request = engine.submit(prompt, do_sample=False, on_token=validator if streaming else None)
+            request.result()
+            if not streaming:
+                # The whole answer is validated once generation has finished
+                validator(None, request.text)
+            tokens += len(request.generated_ids)
+            valid += validator.status == 'complete'
+        elapsed = time.perf_counter() - started
+        engine.stop()
+        print(f"{label:>18}: {valid}/{args.queries} valid, {tokens / args.queries:.0f} tokens and "
+              f"{elapsed / args.queries * 1e3:.0f} ms per turn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/knowledge_preload_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.knowledge_store import KnowledgeStore
+
+
+def build_tree(root, files, records):
+    """
+    Writes YAML files, whose parsing is CPU-bound, to stand in for a knowledge tree.
+    """
+    record = "- id: {i}\n  region: region_{r}\n  revenue: {i}.5\n  tags: [quarterly, revenue, report]\n"
+    for index in range(files):
+        directory = os.path.join(root, f"group_{index % 8}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"doc_{index}.yaml"), 'w', encoding='utf-8') as f:
+            for i in range(records):
+                f.write(record.format(i=i, r=i % 12))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel knowledge preload benchmark")
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--records", type=int, default=2_000, help="Records per file")
+    parser.add_argument("--workers", type=int, nargs='+', default=None)
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+    with tempfile.TemporaryDirectory() as root:
+        build_tree(root, args.files, args.records)
+        print(f"{args.files} files, {cpus} cores")
+        print(f"{'workers':>8} {'time (s)':>9} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                store = KnowledgeStore(root, cache_dir, watch_interval=0)
+                summary = store.preload(workers=workers)
+                assert summary['failed'] == 0, summary
+                baseline = baseline or summary['elapsed']
+                print(f"{workers:>8} {summary['elapsed']:>9.2f} {baseline / summary['elapsed']:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
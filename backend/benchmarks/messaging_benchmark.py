@@ -0,0 +1,120 @@
+# benchmarks/messaging_benchmark.py
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from messaging.async_messaging import AsyncMessagingClient
+from messaging.memory_broker import InMemoryBroker
+from messaging.messaging import MessagingClient
+
+PAYLOAD = '{"process_id": "process_1", "task": {"task_id": "task_1", "context": {"user_message": "%s"}}}' % ('x' * 200)
+
+
+def report(name, count, elapsed):
+    print(f"{name:<32} {count:>8} msgs {elapsed * 1000:>10.1f} ms {count / elapsed:>12,.0f} msgs/sec")
+
+
+def bench_send_message(client, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        client.send_message('bench_single', PAYLOAD)
+    return time.perf_counter() - start
+
+
+def bench_send_batch(client, count, batch_size):
+    start = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        client.send_batch(('bench_batch', PAYLOAD) for _ in range(min(batch_size, count - offset)))
+    return time.perf_counter() - start
+
+
+def bench_round_trip(client, broker, count):
+    queue_name = 'bench_round_trip'
+    received = threading.Event()
+    seen = [0]
+
+    def on_message(ch, method, properties, body):
+        seen[0] += 1
+        if seen[0] == count:
+            ch.stop_consuming()
+            received.set()
+
+    start = time.perf_counter()
+    consumer = threading.Thread(target=MessagingClient(broker=broker).receive_messages, args=(queue_name, on_message), daemon=True)
+    consumer.start()
+    client.send_batch((queue_name, PAYLOAD) for _ in range(count))
+    received.wait()
+    return time.perf_counter() - start
+
+
+def bench_concurrent_consume(broker, count, workers, handler_ms=1.0):
+    """
+    Consumes `count` messages whose handler sleeps `handler_ms`, acking after each
+    handler returns, and reports how throughput scales with worker count.
+    """
+    queue_name = f'bench_workers_{workers}'
+    done = threading.Event()
+    lock = threading.Lock()
+    seen = [0]
+
+    def on_message(ch, method, properties, body):
+        time.sleep(handler_ms / 1000)
+        with lock:
+            seen[0] += 1
+            if seen[0] == count:
+                done.set()
+
+    client = MessagingClient(broker=broker)
+    client.send_batch(((queue_name, PAYLOAD) for _ in range(count)))
+    start = time.perf_counter()
+    consumer = threading.Thread(
+        target=client.receive_messages,
+        args=(queue_name, on_message),
+        kwargs={'prefetch_count': workers * 4, 'workers': workers},
+        daemon=True
+    )
+    consumer.start()
+    done.wait()
+    return time.perf_counter() - start
+
+
+async def bench_async_publish(broker, count, batch_size):
+    client = AsyncMessagingClient(broker=broker, batch_size=batch_size)
+    start = time.perf_counter()
+    futures = [await client.publish('bench_async', PAYLOAD) for _ in range(count)]
+    await client.flush()
+    await asyncio.gather(*futures)
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Messaging throughput benchmark")
+    parser.add_argument("--count", type=int, default=50_000, help="Messages per scenario")
+    parser.add_argument("--batch_size", type=int, default=100, help="Messages per batch")
+    parser.add_argument("--rabbitmq", action="store_true", help="Use the configured RabbitMQ broker instead of the in-memory one")
+    args = parser.parse_args()
+
+    broker = None if args.rabbitmq else InMemoryBroker()
+    client = MessagingClient(broker=broker)
+
+    report("send_message", args.count, bench_send_message(client, args.count))
+    report(f"send_batch ({args.batch_size})", args.count, bench_send_batch(client, args.count, args.batch_size))
+    if broker is not None:
+        report("publish + consume", args.count, bench_round_trip(client, broker, args.count))
+        consume_count = min(args.count, 2_000)
+        for workers in (1, 2, 4, 8, 16):
+            report(f"consume, 1ms handler, {workers} workers", consume_count, bench_concurrent_consume(broker, consume_count, workers))
+    report(f"async publish ({args.batch_size})", args.count, asyncio.run(bench_async_publish(broker, args.count, args.batch_size)))
+    print(f"pool: {client.pool.stats()}")
+
+
+if __name__ == '__main__':
+    main()
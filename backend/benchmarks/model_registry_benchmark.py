@@ -0,0 +1,69 @@
+# benchmarks/model_registry_benchmark.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from models import models
+from models.model_registry import get_model_registry
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import models.models
+print(time.perf_counter() - started)
+"""
+
+
+def time_import(runs):
+    # Each run is a fresh interpreter so no provider SDK is already in sys.modules
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def time_factory(factory, calls, cached):
+    registry = get_model_registry()
+    started = time.perf_counter()
+    for _ in range(calls):
+        if not cached:
+            registry.clear()
+        factory()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model client factory cost with and without the registry cache")
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--factory", default="get_lmstudio_chat")
+    parser.add_argument("--model", default="local-model")
+    args = parser.parse_args()
+
+    timings = time_import(args.import_runs)
+    print(f"import models.models: median {statistics.median(timings) * 1e3:.1f} ms over {args.import_runs} fresh interpreters")
+
+    factory = getattr(models, args.factory)
+    try:
+        factory(args.model)
+    except ImportError as e:
+        print(f"{args.factory}: provider SDK not installed ({e}); skipping client timings")
+        return
+    uncached = time_factory(lambda: factory(args.model), args.calls, cached=False)
+    cached = time_factory(lambda: factory(args.model), args.calls, cached=True)
+    print(f"{args.factory}: new client {uncached * 1e6:.0f} us/call, cached {cached * 1e6:.1f} us/call")
+    print(f"registry: {get_model_registry().stats()}")
+
+
+if __name__ == '__main__':
+    main()
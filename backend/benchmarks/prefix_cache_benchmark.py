@@ -0,0 +1,75 @@
+# benchmarks/prefix_cache_benchmark.py
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from inference_engine_benchmark import load_tiny_model
+from modes.inference_engine import InferenceEngine
+
+SCHEMA = {
+    "title": "Character",
+    "type": "object",
+    "properties": {
+        "name": {"title": "Name", "type": "string"},
+        "species": {"title": "Species", "type": "string"},
+        "role": {"title": "Role", "type": "string"},
+        "personality_traits": {"anyOf": [{"items": {"type": "string"}, "type": "array"}, {"type": "null"}]},
+        "special_attacks": {"anyOf": [{"items": {"type": "string"}, "type": "array"}, {"type": "null"}]},
+    },
+    "required": ["name", "species", "role", "personality_traits", "special_attacks"],
+}
+
+
+def repair_session(engine, query, iterations, max_new_tokens, reuse_prefix):
+    """
+    Mimics generate_json_completion's repair loop: every failed answer and its
+    validation error are appended and the whole conversation is generated again.
+    """
+    conversation = (
+        "You are a helpful assistant that answers in JSON. Here's the json schema you must adhere to:\n"
+        f"<schema>\n{json.dumps(SCHEMA, indent=2)}\n</schema>\n" * 4 + f"User: {query}\nAssistant:"
+    )
+    latencies = []
+    for depth in range(iterations):
+        started = time.perf_counter()
+        request = engine.submit(conversation, max_new_tokens=max_new_tokens, do_sample=False, reuse_prefix=reuse_prefix)
+        request.result()
+        latencies.append(time.perf_counter() - started)
+        conversation += (
+            request.text + f"\nTool: Agent iteration {depth}. Json schema validation failed. "
+            "Please return correct json object\nAssistant:"
+        )
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON-mode repair iterations with and without prefix KV reuse")
+    parser.add_argument("--model_path", default="hf-internal-testing/tiny-random-LlamaForCausalLM")
+    parser.add_argument("--queries", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--max_new_tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model, tokenizer = load_tiny_model(args.model_path)
+    for label, reuse_prefix in (("re-encode", False), ("prefix cache", True)):
+        engine = InferenceEngine(model, tokenizer)
+        per_depth = [0.0] * args.iterations
+        for i in range(args.queries):
+            for depth, latency in enumerate(repair_session(engine, f"Describe character {i}", args.iterations, args.max_new_tokens, reuse_prefix)):
+                per_depth[depth] += latency / args.queries
+        stats = engine.stats()
+        engine.stop()
+        print(f"{label:>13}: " + ", ".join(f"turn {d + 1} {t * 1e3:.0f} ms" for d, t in enumerate(per_depth))
+              + f" | prompt tokens computed {stats['prompt_tokens']}, reused {stats['prefix_tokens_reused']}")
+
+
+if __name__ == '__main__':
+    main()
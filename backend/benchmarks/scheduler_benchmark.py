@@ -0,0 +1,80 @@
+# benchmarks/scheduler_benchmark.py
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.task import Task
+from agents.task_scheduler import TaskScheduler
+from database.database_setup import Database
+
+
+class NullMessagingClient:
+    def send_message(self, *args, **kwargs):
+        pass
+
+
+class BenchmarkScheduler(TaskScheduler):
+    """
+    Scheduler that records dispatched tasks instead of starting worker threads,
+    so only the dependency bookkeeping is measured.
+    """
+    def __init__(self, db):
+        super().__init__(messaging_client=NullMessagingClient(), listen=False, db=db)
+        self.dispatched = []
+
+    def dispatch(self, task):
+        self.dispatched.append(task)
+
+
+def build_process(process_id, size, fan_in=3):
+    """
+    Builds a layered DAG where each task depends on up to `fan_in` earlier tasks.
+    """
+    tasks = []
+    for i in range(size):
+        dependencies = [f"{process_id}_{j}" for j in range(max(0, i - fan_in), i)]
+        tasks.append(Task(
+            task_id=f"{process_id}_{i}",
+            task_name=f"task_{i}",
+            task_description="benchmark task",
+            capabilities=['nlp_to_sql'],
+            function=None,
+            dependencies=dependencies
+        ))
+    return tasks
+
+
+def run(size, directory):
+    scheduler = BenchmarkScheduler(Database(os.path.join(directory, f"scheduler_{size}.db")))
+    process_id = f"process_{size}"
+    tasks = build_process(process_id, size)
+
+    start = time.perf_counter()
+    for task in tasks:
+        scheduler.add_task(process_id, task)
+    scheduler.schedule_tasks(process_id)
+    completed = 0
+    while scheduler.dispatched:
+        task = scheduler.dispatched.pop()
+        scheduler.on_task_completion(task.task_id, None)
+        completed += 1
+    elapsed = time.perf_counter() - start
+
+    assert completed == size, f"Only {completed}/{size} tasks completed"
+    return elapsed
+
+
+def main():
+    print(f"{'tasks':>8} {'total (ms)':>12} {'per task (us)':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (100, 1_000, 10_000, 50_000):
+            elapsed = run(size, directory)
+            print(f"{size:>8} {elapsed * 1000:>12.2f} {elapsed / size * 1e6:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/serialization_benchmark.py
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.task import Task, TaskStatus
+from messaging.serialization import CODECS, COMPRESSORS, MessageSerializer
+
+
+def make_task(index, rows=0):
+    context = {"user_message": "Show me last quarter's revenue by region", "user_id": "user_42"}
+    if rows:
+        context["result"] = [
+            {"id": i, "region": f"region_{i % 12}", "revenue": i * 1.5, "description": "quarterly revenue figure"}
+            for i in range(rows)
+        ]
+    return Task(
+        task_id=f"task_{index}",
+        task_name="ExecuteSQLQuery",
+        task_description="Execute SQL query to fetch report data.",
+        capabilities=["database_operations"],
+        function=make_task,
+        dependencies=[f"task_{index - 1}"] if index else [],
+        context=context,
+        status=TaskStatus.PENDING
+    )
+
+
+PAYLOADS = {
+    "small task": {"process_id": "process_1", "task": make_task(1)},
+    "task, 1k result rows": {"process_id": "process_1", "task": make_task(1, rows=1_000)},
+    "process, 20 tasks": {"process_id": "process_1", "tasks": [make_task(i) for i in range(20)]},
+}
+
+
+def bench(serializer, payload, iterations):
+    body = serializer.encode(payload)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serializer.encode(payload)
+    encode = (time.perf_counter() - start) / iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serializer.decode(body)
+    decode = (time.perf_counter() - start) / iterations
+    return len(body), encode, decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Message codec benchmark")
+    parser.add_argument("--iterations", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'payload':<22} {'codec':<8} {'compression':<12} {'bytes':>9} {'encode (us)':>12} {'decode (us)':>12}")
+    for payload_name, payload in PAYLOADS.items():
+        for codec in CODECS:
+            for compression in [''] + list(COMPRESSORS):
+                serializer = MessageSerializer(codec=codec, compression=compression, compression_threshold=1024)
+                size, encode, decode = bench(serializer, payload, args.iterations)
+                print(f"{payload_name:<22} {codec:<8} {compression or 'none':<12} {size:>9} {encode * 1e6:>12.1f} {decode * 1e6:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
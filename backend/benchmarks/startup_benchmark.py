@@ -0,0 +1,66 @@
+# benchmarks/startup_benchmark.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import agents.agent_base
+print(time.perf_counter() - started)
+"""
+
+
+def time_import(runs):
+    # Each run is a fresh interpreter so nothing is already in sys.modules
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of importing agents.agent_base and of constructing an agent")
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--agents", type=int, default=1_000)
+    args = parser.parse_args()
+
+    timings = time_import(args.import_runs)
+    print(f"import agents.agent_base: median {statistics.median(timings) * 1e3:.1f} ms "
+          f"over {args.import_runs} fresh interpreters")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Database() uses a path relative to the working directory
+        os.chdir(directory)
+        from agents.agent_base import Agent
+
+        class BenchmarkAgent(Agent):
+            def perform_task(self, task):
+                return task
+
+        started = time.perf_counter()
+        agents = [BenchmarkAgent(f"agent_{i}", "benchmark agent", "GPT-4o") for i in range(args.agents)]
+        constructed = (time.perf_counter() - started) / args.agents
+        print(f"construct agent:          {constructed * 1e6:.1f} us/agent")
+
+        started = time.perf_counter()
+        for agent in agents:
+            agent.save_to_memory('last_task', 'benchmark')
+        first_use = (time.perf_counter() - started) / args.agents
+        print(f"first memory write:       {first_use * 1e6:.1f} us/agent (opens the database and persists the agent)")
+        agents[0].db.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/task_state_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.task import Task, TaskStatus
+from agents.task_scheduler import TaskScheduler
+from database.database_setup import Database
+from scheduler_benchmark import NullMessagingClient, build_process
+
+
+class RecordingScheduler(TaskScheduler):
+    def __init__(self, db, recover=True):
+        self.dispatched = []
+        super().__init__(messaging_client=NullMessagingClient(), listen=False, db=db, recover=recover)
+
+    def dispatch(self, task):
+        self.dispatched.append(task)
+
+
+def record_transitions(db, count):
+    task = Task("transition-task", "task", "benchmark task", ['nlp_to_sql'], None)
+    statuses = (TaskStatus.PENDING, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED)
+    started = time.perf_counter()
+    for i in range(count):
+        task.task_id = f"transition-{i // 3}"
+        task.update_status(statuses[i % 3])
+        db.save_task("transition-process", task)
+    db.flush()
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Task state persistence throughput and crash recovery time")
+    parser.add_argument("--transitions", type=int, default=30_000)
+    parser.add_argument("--live", type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        batched = record_transitions(Database(os.path.join(directory, 'batched.db'), write_behind=True), args.transitions)
+        immediate = record_transitions(Database(os.path.join(directory, 'immediate.db'), write_behind=False), args.transitions // 10)
+        print(f"transitions: batched {batched:,.0f}/s, one commit each {immediate:,.0f}/s")
+
+        print(f"{'finished history':>18} {'live tasks':>11} {'recovery (ms)':>14}")
+        for history in (0, 10_000, 100_000):
+            path = os.path.join(directory, f"recovery_{history}.db")
+            scheduler = RecordingScheduler(Database(path), recover=False)
+            # Finished processes that recovery should not have to read
+            for p in range(history // 100):
+                process_id = f"done_{p}"
+                for task in build_process(process_id, 100):
+                    scheduler.add_task(process_id, task, persist=True)
+                scheduler.schedule_tasks(process_id)
+                while scheduler.dispatched:
+                    scheduler.on_task_completion(scheduler.dispatched.pop().task_id, None)
+            # One live process, half completed when the process "crashes"
+            tasks = build_process("live", args.live)
+            for task in tasks:
+                scheduler.add_task("live", task, persist=True)
+            scheduler.schedule_tasks("live")
+            for _ in range(args.live // 2):
+                scheduler.on_task_completion(scheduler.dispatched.pop(0).task_id, None)
+            scheduler.db.flush()
+
+            started = time.perf_counter()
+            recovered = RecordingScheduler(Database(path))
+            elapsed = time.perf_counter() - started
+            assert len(recovered.tasks) == args.live - args.live // 2 and recovered.dispatched
+            print(f"{history:>18,} {len(recovered.tasks):>11,} {elapsed * 1e3:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
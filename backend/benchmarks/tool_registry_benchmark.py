@@ -0,0 +1,69 @@
+# benchmarks/tool_registry_benchmark.py
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOOL_CODE = '''
+def main(value):
+    return value * {factor}
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool registration dedup and lookup-by-name latency under tool churn")
+    parser.add_argument("--names", type=int, default=2_000)
+    parser.add_argument("--versions", type=int, default=5)
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        from database.database_setup import Database
+        db = Database(os.path.join(directory, 'tools.db'))
+
+        # Churn: every name gets several versions
+        started = time.perf_counter()
+        for version in range(args.versions):
+            for i in range(args.names):
+                db.register_tool(f"tool_{i}", "benchmark tool", TOOL_CODE.format(factor=f"{i} + {version}"))
+        registered = args.names * args.versions
+        print(f"register: {(time.perf_counter() - started) / registered * 1e6:.1f} us/version, {registered} versions")
+
+        # Many agents creating the same tool
+        shared = TOOL_CODE.format(factor="'shared'")
+        tool_ids = {db.register_tool("shared_tool", "benchmark tool", shared) for _ in range(args.agents)}
+        rows = db.conn.execute("SELECT count(*) FROM tools WHERE tool_name = 'shared_tool'").fetchone()[0]
+        print(f"dedup:    {args.agents} agents registering identical code -> {len(tool_ids)} tool id, {rows} row")
+
+        names = [f"tool_{random.randrange(args.names)}" for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for name in names:
+            db.find_tool_by_name(name)
+        cached = (time.perf_counter() - started) / args.lookups
+
+        started = time.perf_counter()
+        for name in names:
+            db.tool_registry.clear()
+            db.find_tool_by_name(name)
+        indexed = (time.perf_counter() - started) / args.lookups
+
+        db.conn.execute('DROP INDEX idx_tools_name_version')
+        db.conn.execute('DROP INDEX idx_tools_name_hash')
+        started = time.perf_counter()
+        for name in names[:1000]:
+            db.tool_registry.clear()
+            db.find_tool_by_name(name)
+        scan = (time.perf_counter() - started) / 1000
+
+        print(f"lookup:   registry {cached * 1e6:.1f} us, indexed query {indexed * 1e6:.1f} us, "
+              f"unindexed scan {scan * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/tool_runtime_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOOL_CODE = '''
+import json
+
+def _normalize(values):
+    return [value * 2 for value in values]
+
+def main(*values):
+    return json.dumps({"result": sum(_normalize(values))})
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot tool call latency with and without the compiled-tool cache")
+    parser.add_argument("--calls", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        from config.settings import TOOLS
+        from agents.agent_base import Agent
+
+        # Measures the compiled-tool cache itself, not the sandbox round trip
+        TOOLS['EXECUTION'] = 'inprocess'
+
+        class BenchmarkAgent(Agent):
+            def perform_task(self, task):
+                return task
+
+        agent = BenchmarkAgent("tool_benchmark", "benchmark agent", "GPT-4o")
+        tool_id = "benchmark-tool"
+        agent.db.save_tool({
+            'tool_id': tool_id,
+            'tool_name': 'sum_doubled',
+            'tool_description': 'benchmark tool',
+            'version': '1.0',
+            'function': TOOL_CODE,
+        })
+
+        # The previous execute_tool: read the row and exec the source on every call
+        started = time.perf_counter()
+        for i in range(args.calls):
+            tool_data = agent.db.get_tool(tool_id)
+            module = types.ModuleType("dynamic_tool")
+            exec(tool_data['code'], module.__dict__)
+            sys.modules["dynamic_tool"] = module
+            module.main(1, 2, i)
+        uncached = (time.perf_counter() - started) / args.calls
+
+        started = time.perf_counter()
+        for i in range(args.calls):
+            agent.execute_tool(tool_id, 1, 2, i)
+        cached = (time.perf_counter() - started) / args.calls
+
+        from tools.tool_runtime import get_tool_runtime
+        stats = get_tool_runtime().stats()
+        print(f"{args.calls} calls to one hot tool")
+        print(f"read + exec per call: {uncached * 1e6:>8.1f} us/call")
+        print(f"compiled-tool cache:  {cached * 1e6:>8.1f} us/call "
+              f"(compiled {stats['compiled']}, hit rate {stats['hit_rate']:.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/tool_sandbox_benchmark.py
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.sandbox import SandboxedToolExecutor, ToolTimeout
+from tools.tool_runtime import ToolRuntime
+
+CPU_TOOL = {
+    'tool_id': 'cpu-tool',
+    'tool_name': 'count_primes',
+    'version': '1.0',
+    'code': '''
+def main(limit):
+    return sum(1 for n in range(2, limit) if all(n % d for d in range(2, int(n ** 0.5) + 1)))
+''',
+}
+
+SLEEP_TOOL = {
+    'tool_id': 'sleep-tool',
+    'tool_name': 'sleep',
+    'version': '1.0',
+    'code': '''
+import time
+
+def main(seconds):
+    time.sleep(seconds)
+''',
+}
+
+LARGE_TOOL = {
+    'tool_id': 'large-tool',
+    'tool_name': 'large_result',
+    'version': '1.0',
+    'code': '''
+def main(size):
+    return b"x" * size
+''',
+}
+
+
+def stalls_while(work):
+    """
+    Runs `work` while a heartbeat thread ticks every millisecond, standing in for an
+    agent's message consumer, and returns (work seconds, worst heartbeat gap).
+    """
+    gaps, done = [0.0], threading.Event()
+
+    def heartbeat():
+        last = time.perf_counter()
+        while not done.is_set():
+            time.sleep(0.001)
+            now = time.perf_counter()
+            gaps[0] = max(gaps[0], now - last)
+            last = now
+
+    thread = threading.Thread(target=heartbeat)
+    thread.start()
+    started = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    thread.join()
+    return elapsed, gaps[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dynamic tools in-process versus in the sandboxed process pool")
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=60_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    runtime = ToolRuntime()
+    module = runtime.compile(CPU_TOOL)
+    elapsed, gap = stalls_while(lambda: [module.main(args.limit) for _ in range(args.calls)])
+    print(f"in-process: {elapsed:.2f}s for {args.calls} calls, worst heartbeat gap {gap * 1e3:.1f} ms")
+
+    started = time.perf_counter()
+    sandbox = SandboxedToolExecutor(workers=args.workers)
+    print(f"sandbox:    {args.workers} workers pre-warmed in {time.perf_counter() - started:.2f}s")
+
+    def run_sandboxed():
+        futures = [sandbox.submit(CPU_TOOL, (args.limit,)) for _ in range(args.calls)]
+        return [future.result() for future in futures]
+
+    elapsed, gap = stalls_while(run_sandboxed)
+    print(f"sandbox:    {elapsed:.2f}s for {args.calls} calls, worst heartbeat gap {gap * 1e3:.1f} ms")
+
+    started = time.perf_counter()
+    try:
+        sandbox.run(SLEEP_TOOL, (30,), timeout=0.5)
+    except ToolTimeout:
+        print(f"timeout:    30s tool stopped after {time.perf_counter() - started:.2f}s (limit 0.5s), worker replaced")
+
+    for size in (64 * 1024, 64 * 1024 * 1024):
+        started = time.perf_counter()
+        result = sandbox.run(LARGE_TOOL, (size,))
+        assert len(result) == size
+        print(f"result:     {size / 1024 / 1024:>6.2f} MiB returned in {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    print(f"stats:      {sandbox.stats()}")
+    sandbox.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/vector_index_benchmark.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from knowledge.vector_index import VectorIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index build and top-k query benchmark")
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Clustered data, closer to real embeddings than uniform noise
+    centers = rng.normal(size=(256, args.dimensions)).astype(np.float32)
+    data = centers[rng.integers(0, len(centers), args.vectors)] + 0.3 * rng.normal(size=(args.vectors, args.dimensions)).astype(np.float32)
+    queries = data[rng.integers(0, args.vectors, args.queries)] + 0.05 * rng.normal(size=(args.queries, args.dimensions)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(directory, args.dimensions, train_threshold=args.vectors + 1)
+        started = time.perf_counter()
+        for offset in range(0, args.vectors, 10_000):
+            batch = data[offset:offset + 10_000]
+            index.add(batch, [{'id': offset + i} for i in range(len(batch))])
+        added = time.perf_counter() - started
+
+        def run(label):
+            results = []
+            started = time.perf_counter()
+            for query in queries:
+                results.append([meta['id'] for _, meta in index.search(query, args.k)])
+            elapsed = (time.perf_counter() - started) / len(queries)
+            print(f"{label:<12} {elapsed * 1000:>8.2f} ms/query")
+            return results
+
+        print(f"{args.vectors} vectors x {args.dimensions} dims, added in {added:.2f}s")
+        exact = run('brute force')
+        started = time.perf_counter()
+        index.train()
+        print(f"IVF trained in {time.perf_counter() - started:.2f}s ({index.n_lists} lists, {index.n_probes} probes)")
+        approximate = run('IVF')
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)])
+        print(f"recall@{args.k}: {recall:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,20 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE = {
     'ENGINE': 'sqlite3',
     'NAME': os.path.join(BASE_DIR, 'database', 'aaas.db'),
+    'WRITE_BEHIND': os.environ.get('DATABASE_WRITE_BEHIND', 'true').lower() == 'true',
+    'FLUSH_INTERVAL': 0.5,  # seconds between write-behind flushes
+    'MAX_PENDING_WRITES': 500,  # pending writes that trigger an early flush
+    'BUSY_TIMEOUT': 30,  # seconds a connection waits for a write lock
+    'STATEMENT_CACHE_SIZE': 256,  # prepared statements cached per connection
+    'CAPABILITY_REFRESH_INTERVAL': 1.0,  # seconds between checks for capability changes made by other processes
+    'PRAGMAS': {
+        'journal_mode': 'WAL',  # readers no longer block on the writer
+        'synchronous': 'NORMAL',  # fsync at checkpoints only; safe with WAL
+        'cache_size': -64000,  # 64 MB page cache per connection
+        'mmap_size': 268435456,  # 256 MB of the file read through mmap
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    },
 }
 
 # Messaging Configuration
@@ -20,6 +34,20 @@ MESSAGE_BROKER = {
     'PASSWORD': 'guest',
     'HEARTBEAT': 600,
     'BLOCKED_CONNECTION_TIMEOUT': 300,
+    'CHANNEL_POOL_SIZE': 8,          # idle channels kept per pooled connection
+    'PUBLISHER_CONFIRMS': True,
+    'PREFETCH_COUNT': 10,            # basic_qos prefetch for consumers
+    'CONSUMER_WORKERS': 1,           # >1 hands deliveries to a worker pool
+    'MAX_DELIVERY_ATTEMPTS': 2,      # failed handler runs before a message is dropped or dead-lettered
+    'PUBLISH_BATCH_SIZE': 100,       # async client flushes after this many messages
+    'PUBLISH_FLUSH_INTERVAL': 0.05,  # seconds before a partial batch is flushed
+}
+
+# Message Serialization
+MESSAGE_SERIALIZATION = {
+    'CODEC': os.environ.get('MESSAGE_CODEC', 'auto'),  # auto, json, orjson or msgpack
+    'COMPRESSION': os.environ.get('MESSAGE_COMPRESSION', 'zlib'),  # zlib, zstd or '' to disable
+    'COMPRESSION_THRESHOLD': 4096,  # bytes; smaller payloads are sent uncompressed
 }
 
 # Logging Configuration
@@ -40,6 +68,71 @@ AGENT_DEFAULTS = {
     ],
 }
 
+# Agent Pool Configuration (warm agents kept by the orchestrator)
+AGENT_POOL = {
+    'MAX_SIZE': 64,
+    'IDLE_TIMEOUT': 600,  # seconds before an unused agent is evicted; 0 keeps agents until evicted by size
+    'HEALTH_CHECK_INTERVAL': 30,  # seconds between health checks of a reused agent
+}
+
+# Tool Configuration
+TOOLS = {
+    'RUNTIME_CACHE_SIZE': 256,  # compiled tool modules kept in memory
+    'REGISTRY_CACHE_SIZE': 1024,  # tool rows and sources cached per database; 0 is unbounded
+    'EXECUTION': os.environ.get('TOOL_EXECUTION', 'inprocess'),  # 'inprocess' or 'sandbox' (worker processes; results must be picklable)
+    'SANDBOX': {
+        'WORKERS': int(os.environ.get('TOOL_SANDBOX_WORKERS', 0)),  # 0 uses one worker per core
+        'MEMORY_LIMIT_MB': 512,  # address space per worker; 0 disables
+        'CPU_TIME_LIMIT': 60,  # CPU seconds per call; 0 disables
+        'SHM_THRESHOLD': 1024 * 1024,  # results larger than this many bytes are returned via shared memory
+        'START_METHOD': 'spawn',
+    },
+}
+
+# Knowledge Configuration
+KNOWLEDGE = {
+    'ROOT': os.environ.get('KNOWLEDGE_DIR', '/app/knowledge'),
+    'CACHE_DIR': os.environ.get('KNOWLEDGE_CACHE_DIR', os.path.join(BASE_DIR, '.knowledge_cache')),
+    'WATCH_INTERVAL': 5,  # seconds between change scans; 0 disables the watcher
+    'CHUNK_SIZE': 4000,  # max characters per streamed chunk
+    'TABLE_CHUNK_ROWS': 1000,  # rows read per batch from CSV files
+    'MAX_INLINE_BYTES': 50 * 1024 * 1024,  # larger files are exposed as streamed chunks only
+    'PRELOAD_ON_START': os.environ.get('KNOWLEDGE_PRELOAD', 'false').lower() == 'true',
+    'PRELOAD_WORKERS': 0,  # 0 uses every available core
+    'INDEX_DIR': os.environ.get('KNOWLEDGE_INDEX_DIR', os.path.join(BASE_DIR, '.knowledge_index')),
+    'INDEX_ON_START': os.environ.get('KNOWLEDGE_INDEX', 'true').lower() == 'true',  # sync the retrieval index in the background at startup
+    'EMBEDDING': os.environ.get('KNOWLEDGE_EMBEDDING', 'hash'),  # 'hash' or '<provider>:<model>'
+    'EMBEDDING_DIMENSIONS': 384,  # used by the hash embedding
+    'EMBED_BATCH_SIZE': 64,  # chunks embedded per call
+    'IVF_LISTS': 64,  # k-means clusters in the vector index
+    'IVF_PROBES': 8,  # clusters scanned per query
+}
+
+# Embedding Service Configuration
+EMBEDDING_SERVICE = {
+    'CACHE_SIZE': 10000,  # vectors kept in the in-memory LRU
+    'CACHE_PATH': os.environ.get('EMBEDDING_CACHE_PATH', os.path.join(BASE_DIR, '.embedding_cache.sqlite')),  # '' disables the disk cache
+    'BATCH_SIZE': 64,  # max texts per backend call
+    'BATCH_WAIT': 0.005,  # seconds to wait for more texts before calling the backend
+}
+
+# Model Registry Configuration (cached provider clients)
+MODEL_REGISTRY = {
+    'MAX_CLIENTS': 64,  # configured clients kept; least recently used are dropped first
+    'HTTP_MAX_CONNECTIONS': 100,  # shared httpx pool across HTTP-based providers
+    'HTTP_MAX_KEEPALIVE': 20,
+    'HTTP_KEEPALIVE_EXPIRY': 60,  # seconds an idle connection is kept open
+    'HTTP_TIMEOUT': 600,  # seconds; providers may pass a shorter per-request timeout
+}
+
+# Task Executor Configuration
+TASK_EXECUTOR = {
+    'MODE': os.environ.get('TASK_EXECUTOR_MODE', 'thread'),  # thread or asyncio; the scheduler rejects process
+    'MAX_WORKERS': int(os.environ.get('TASK_EXECUTOR_MAX_WORKERS', 16)),
+    'MAX_QUEUE_SIZE': int(os.environ.get('TASK_EXECUTOR_MAX_QUEUE_SIZE', 1000)),
+    'CAPABILITY_LIMITS': {},  # e.g. {'database_operations': 4}
+}
+
 # Security Configuration
 SECURITY_SETTINGS = {
     'AUTHENTICATION_ENABLED': True,
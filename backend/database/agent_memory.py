@@ -0,0 +1,79 @@
+# database/agent_memory.py
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional, Set
+
+_MISSING = object()
+
+
+class AgentMemory(MutableMapping):
+    """
+    Dict-like view of one agent's memory in the agent_memory table.
+
+    Nothing is read when the view is created: values are fetched one key at a time
+    on first access and kept, and the key list is fetched only when the memory is
+    iterated or sized. Assigning or deleting a key writes just that key.
+    """
+    def __init__(self, db, agent_id: str):
+        self.db = db
+        self.agent_id = agent_id
+        self._values: Dict[str, Any] = {}
+        self._keys: Optional[Set[str]] = None
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            if self._keys is not None and key not in self._keys:
+                raise KeyError(key)
+            value = self.db.get_agent_memory(self.agent_id, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            self._values[key] = value
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.db.set_agent_memory(self.agent_id, key, value)
+        self._values[key] = value
+        if self._keys is not None:
+            self._keys.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.db.delete_agent_memory(self.agent_id, key)
+        self._values.pop(key, None)
+        if self._keys is not None:
+            self._keys.discard(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self._values:
+            return True
+        if self._keys is not None:
+            return key in self._keys
+        return self.db.get_agent_memory(self.agent_id, key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._key_set()))
+
+    def __len__(self) -> int:
+        return len(self._key_set())
+
+    def __bool__(self) -> bool:
+        return bool(self._values) or len(self) > 0
+
+    def _key_set(self) -> Set[str]:
+        if self._keys is None:
+            self._keys = set(self.db.get_agent_memory_keys(self.agent_id))
+        return self._keys
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Loads the whole memory in one query.
+        """
+        values = self.db.load_agent_memory(self.agent_id)
+        self._values = dict(values)
+        self._keys = set(values)
+        return values
+
+    def __repr__(self) -> str:
+        return f"AgentMemory(agent_id={self.agent_id}, loaded={len(self._values)})"
@@ -0,0 +1,133 @@
+# database/capability_index.py
+
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+
+def normalize_capabilities(capabilities: Union[str, Iterable[str], None]) -> List[str]:
+    """
+    Accepts a single capability or a list of them, as Task.capabilities is used both
+    ways, and returns de-duplicated lowercase names in their original order.
+    """
+    if not capabilities:
+        return []
+    if isinstance(capabilities, str):
+        capabilities = [capabilities]
+    return list(dict.fromkeys(c.strip().lower() for c in capabilities if c and c.strip()))
+
+
+class CapabilityIndex:
+    """
+    In-memory inverted index from capability to the agents that provide it, mirroring
+    the agent_capabilities table.
+
+    Each capability maps to its agents and their scores; the ranked candidate list
+    for a capability is computed on first lookup and kept until that capability
+    changes, so a lookup is a dictionary access regardless of how many agents are
+    registered.
+
+    `version` is the agent_capabilities change counter the contents were loaded
+    at, and `checked_at` the monotonic time it was last compared with the database,
+    so Database can reload the index when another process changes the table.
+    """
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, float]] = {}  # capability -> agent_id -> score
+        self._capabilities: Dict[str, Set[str]] = {}  # agent_id -> capabilities
+        self._ranked: Dict[str, List[Tuple[str, float]]] = {}
+
+    def load(self, rows: Iterable[Tuple[str, str, float]], version: Optional[int] = None) -> None:
+        """
+        Replaces the index contents with (capability, agent_id, score) rows read at
+        change counter `version`.
+        """
+        agents: Dict[str, Dict[str, float]] = {}
+        agent_capabilities: Dict[str, Set[str]] = {}
+        for capability, agent_id, score in rows:
+            agents.setdefault(capability, {})[agent_id] = score
+            agent_capabilities.setdefault(agent_id, set()).add(capability)
+        with self._lock:
+            self._agents, self._capabilities, self._ranked = agents, agent_capabilities, {}
+            self.version = version
+
+    def advance(self, before: int, after: int) -> None:
+        """
+        Moves `version` from `before` to `after` for a committed change this index
+        already holds, so the process's own writes do not cause a reload. If the
+        index was not at `before`, another process changed the table and the next
+        refresh reloads it.
+        """
+        with self._lock:
+            if self.version == before:
+                self.version = after
+
+    def set_agent(self, agent_id: str, capabilities: Iterable[str], default_score: float = 1.0) -> None:
+        """
+        Sets the capabilities of an agent. Scores of capabilities it already had are kept.
+        """
+        capabilities = set(capabilities)
+        with self._lock:
+            previous = self._capabilities.get(agent_id, set())
+            for capability in previous - capabilities:
+                self._discard(capability, agent_id)
+            for capability in capabilities - previous:
+                self._agents.setdefault(capability, {})[agent_id] = default_score
+                self._ranked.pop(capability, None)
+            if capabilities:
+                self._capabilities[agent_id] = capabilities
+            else:
+                self._capabilities.pop(agent_id, None)
+
+    def remove_agent(self, agent_id: str) -> None:
+        self.set_agent(agent_id, ())
+
+    def set_score(self, agent_id: str, capability: str, score: float) -> None:
+        with self._lock:
+            agents = self._agents.get(capability)
+            if agents is not None and agent_id in agents:
+                agents[agent_id] = score
+                self._ranked.pop(capability, None)
+
+    def _discard(self, capability: str, agent_id: str) -> None:
+        agents = self._agents.get(capability)
+        if agents is not None:
+            agents.pop(agent_id, None)
+            if not agents:
+                del self._agents[capability]
+        self._ranked.pop(capability, None)
+
+    def candidates(self, capability: str) -> List[Tuple[str, float]]:
+        """
+        Returns (agent_id, score) pairs for one capability, best first.
+        """
+        ranked = self._ranked.get(capability)
+        if ranked is None:
+            with self._lock:
+                agents = self._agents.get(capability, {})
+                ranked = sorted(agents.items(), key=lambda item: (-item[1], item[0]))
+                self._ranked[capability] = ranked
+        return ranked
+
+    def rank(self, capabilities: List[str], limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Ranks agents for a set of required capabilities: agents providing more of them
+        come first, then higher total score.
+        """
+        if len(capabilities) == 1:
+            ranked = self.candidates(capabilities[0])
+            return ranked[:limit] if limit else list(ranked)
+        matches: Dict[str, List[float]] = {}
+        for capability in capabilities:
+            for agent_id, score in self.candidates(capability):
+                matches.setdefault(agent_id, []).append(score)
+        ranked = sorted(matches.items(), key=lambda item: (-len(item[1]), -sum(item[1]), item[0]))
+        ranked = [(agent_id, sum(scores)) for agent_id, scores in ranked]
+        return ranked[:limit] if limit else ranked
+
+    def capabilities_of(self, agent_id: str) -> Set[str]:
+        return set(self._capabilities.get(agent_id, ()))
+
+    def __len__(self) -> int:
+        return len(self._capabilities)
@@ -0,0 +1,133 @@
+# database/connection_pool.py
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+from config.settings import DATABASE
+
+
+class SQLiteConnectionPool:
+    """
+    Process-wide pool of SQLite connections for one database file.
+
+    sqlite3 connections must not be used from several threads at once, so the pool
+    keeps one connection per thread. Each connection is opened in WAL mode with the
+    pragmas from DATABASE['PRAGMAS'], which lets readers run alongside a writer, and
+    with a statement cache so repeated queries reuse their prepared statements.
+    Every Database on the same file shares the pool, and the schema is set up once
+    per process rather than once per Database.
+
+    ':memory:' databases cannot be shared between connections, so they get a single
+    connection that callers must serialize themselves.
+    """
+    def __init__(self, db_file: str, pragmas: Dict[str, object] = None, statement_cache_size: int = None):
+        self.logger = logging.getLogger('SQLiteConnectionPool')
+        self.db_file = db_file
+        self.pragmas = DATABASE['PRAGMAS'] if pragmas is None else pragmas
+        self.statement_cache_size = statement_cache_size or DATABASE['STATEMENT_CACHE_SIZE']
+        self.shared = db_file == ':memory:'
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._connections: List[sqlite3.Connection] = []
+        self._shared_connection: Optional[sqlite3.Connection] = None
+        self._schema_ready = False
+        self.connections_opened = 0
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Returns the calling thread's connection, opening it on first use.
+        """
+        if self.shared:
+            if self._shared_connection is None:
+                with self._lock:
+                    if self._shared_connection is None:
+                        self._shared_connection = self._open()
+            return self._shared_connection
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        return connection
+
+    def _open(self) -> sqlite3.Connection:
+        # Each connection is used by one thread; the check is off so close_all can
+        # close connections from whichever thread shuts the process down
+        connection = sqlite3.connect(
+            self.db_file,
+            timeout=DATABASE['BUSY_TIMEOUT'],
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self._connections.append(connection)
+            self.connections_opened += 1
+        self.logger.debug(f"Opened SQLite connection to {self.db_file} for thread {threading.current_thread().name}.")
+        return connection
+
+    def ensure_schema(self, setup: Callable[[sqlite3.Connection], None]) -> None:
+        """
+        Runs `setup` with a pooled connection the first time it is called for this
+        database in this process.
+        """
+        if self._schema_ready:
+            return
+        with self._lock:
+            if self._schema_ready:
+                return
+            self._schema_ready = True
+        try:
+            setup(self.connection())
+        except Exception:
+            self._schema_ready = False
+            raise
+
+    def close(self) -> None:
+        """
+        Closes the calling thread's connection.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            connection.close()
+
+    def close_all(self) -> None:
+        """
+        Closes every connection opened by the pool. Intended for process shutdown.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._shared_connection = None
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing SQLite connection: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'open_connections': len(self._connections),
+                'connections_opened': self.connections_opened,
+            }
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_sqlite_pool(db_file: str) -> SQLiteConnectionPool:
+    """
+    Returns the shared pool for a database file.
+    """
+    key = db_file if db_file == ':memory:' else os.path.abspath(db_file)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SQLiteConnectionPool(db_file)
+        return pool
@@ -1,16 +1,168 @@
 # database/database_setup.py
 
+import ast
+import atexit
+import json
 import sqlite3
 import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import DATABASE
+from database.agent_memory import AgentMemory
+from database.capability_index import CapabilityIndex, normalize_capabilities
+from database.connection_pool import SQLiteConnectionPool, get_sqlite_pool
+from database.tool_registry import ToolRegistry, content_hash, next_version, version_sort_key
+from messaging.serialization import decode_message, encode_message, to_serializable
+from tools.tool_runtime import invalidate_tool
+
+_flush_requested = threading.Event()
+_flusher: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+
+# Marks a pending memory key deletion
+_DELETED = object()
+
+
+class _WriteBuffer:
+    """
+    Pending write-behind rows for one database file, shared by every Database on
+    that file so updates coalesce across agents and flush in one transaction.
+    """
+    def __init__(self, database: 'Database', flush_interval: float, max_pending: int):
+        self.database = database  # used by the flusher thread
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.memory: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self.tasks: Dict[str, Tuple] = {}  # task_id -> latest row
+        self.task_events: List[Tuple[str, str, str, float]] = []  # transitions in order
+        self.lock = threading.Lock()
+        self.flush_lock = threading.RLock()
+        self.flush_due = False
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+        self.rows_written = 0
+
+    def __len__(self) -> int:
+        return len(self.agents) + len(self.memory) + len(self.tasks)
+
+
+# One write buffer, capability index and tool registry per database file; buffers
+# are served by one flusher thread per process
+_write_buffers: Dict[SQLiteConnectionPool, _WriteBuffer] = {}
+_capability_indexes: Dict[SQLiteConnectionPool, CapabilityIndex] = {}
+_tool_registries: Dict[SQLiteConnectionPool, ToolRegistry] = {}
+_write_buffers_lock = threading.Lock()
+
 
 class Database:
-    def __init__(self, db_file='aaas.db'):
-        self.conn = sqlite3.connect(db_file, check_same_thread=False)
-        self.create_tables()
+    """
+    SQLite persistence for agents, tools and tasks.
+
+    Agent memory is stored one row per key in agent_memory, with values encoded by
+    the message serializer, so a write costs one key regardless of memory size.
+
+    With write-behind enabled, save_agent and the memory writes only record the
+    latest state per agent_id (or agent_id and key) in a buffer shared by every
+    Database on the same file. A background thread writes pending rows in a single
+    transaction every `flush_interval` seconds, or as soon as `max_pending` writes
+    are waiting. Repeated updates between flushes cost one row write. Reads flush
+    first so they see every accepted write, and close() or interpreter exit performs
+    a final flush.
+
+    Connections come from the process-wide SQLiteConnectionPool for the file, one
+    per thread, and the schema is created once per process.
+
+    Task state is one row per task in tasks, with every status transition also
+    appended to task_events; both go through the write buffer. Unfinished tasks are
+    covered by a partial index, so loading them for recovery does not read the
+    history of finished tasks.
+
+    Agent capabilities are kept in the indexed agent_capabilities table and in a
+    CapabilityIndex loaded from it once per process. save_agent updates both, so
+    capability lookups are served from memory; a change counter kept by triggers
+    on the table tells the index to reload when another process changes it.
+
+    Tools are versioned: (tool_name, version) is unique and indexed, and tool source
+    is stored once per content hash in tool_code. register_tool reuses the tool_id
+    of identical code under the same name and otherwise adds the next version. Tool
+    rows are cached in a ToolRegistry as they are read or saved, so repeated lookups
+    by id or name do not touch the database.
+    """
+    SAVE_AGENT_SQL = '''
+        INSERT OR REPLACE INTO agents (agent_id, agent_name, system_message, model_name, tools, memory, config)
+        VALUES (?, ?, ?, ?, ?, NULL, ?)
+    '''
+    SET_MEMORY_SQL = '''
+        INSERT INTO agent_memory (agent_id, key, value, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (agent_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+    '''
+    DELETE_MEMORY_SQL = 'DELETE FROM agent_memory WHERE agent_id = ? AND key = ?'
+    ADD_CAPABILITY_SQL = 'INSERT OR IGNORE INTO agent_capabilities (capability, agent_id, score) VALUES (?, ?, 1.0)'
+    SAVE_TOOL_SQL = '''
+        INSERT INTO tools (tool_id, tool_name, tool_description, version, version_sort, function, content_hash, created_at)
+        VALUES (?, ?, ?, ?, ?, NULL, ?, ?)
+        ON CONFLICT (tool_id) DO UPDATE SET
+            tool_name = excluded.tool_name, tool_description = excluded.tool_description, version = excluded.version,
+            version_sort = excluded.version_sort, function = NULL, content_hash = excluded.content_hash,
+            created_at = excluded.created_at
+    '''
+    SAVE_TASK_SQL = '''
+        INSERT INTO tasks (
+            task_id, task_name, task_description, capabilities, tools, dependencies, retry_count, timeout,
+            context, status, version, function, process_id, data, finished, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (task_id) DO UPDATE SET
+            retry_count = excluded.retry_count, status = excluded.status, process_id = excluded.process_id,
+            data = excluded.data, finished = excluded.finished, updated_at = excluded.updated_at
+    '''
+    TASK_EVENT_SQL = 'INSERT INTO task_events (task_id, process_id, status, at) VALUES (?, ?, ?, ?)'
+    SELECT_TOOL_SQL = '''
+        SELECT t.tool_id, t.tool_name, t.tool_description, t.version, t.content_hash, t.created_at, coalesce(c.code, t.function)
+        FROM tools t LEFT JOIN tool_code c ON c.content_hash = t.content_hash
+    '''
+
+    def __init__(self, db_file='aaas.db', write_behind: bool = None, flush_interval: float = None, max_pending: int = None):
         self.logger = logging.getLogger('Database')
+        self.pool = get_sqlite_pool(db_file)
+        self.create_tables()
+        self.write_behind = DATABASE['WRITE_BEHIND'] if write_behind is None else write_behind
+        with _write_buffers_lock:
+            buffer = _write_buffers.get(self.pool)
+            if buffer is None:
+                buffer = _write_buffers[self.pool] = _WriteBuffer(
+                    self,
+                    flush_interval if flush_interval is not None else DATABASE['FLUSH_INTERVAL'],
+                    max_pending or DATABASE['MAX_PENDING_WRITES'],
+                )
+            else:
+                buffer.flush_interval = flush_interval if flush_interval is not None else buffer.flush_interval
+                buffer.max_pending = max_pending or buffer.max_pending
+            capability_index = _capability_indexes.get(self.pool)
+            if capability_index is None:
+                capability_index = _capability_indexes[self.pool] = CapabilityIndex()
+                self._load_capabilities(capability_index)
+            tool_registry = _tool_registries.get(self.pool)
+            if tool_registry is None:
+                tool_registry = _tool_registries[self.pool] = ToolRegistry()
+        self._buffer = buffer
+        self.capability_index = capability_index
+        self.tool_registry = tool_registry
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        The calling thread's pooled connection.
+        """
+        return self.pool.connection()
 
     def create_tables(self):
-        cursor = self.conn.cursor()
+        self.pool.ensure_schema(self._create_schema)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS agents (
                 agent_id TEXT PRIMARY KEY,
@@ -47,27 +199,139 @@ class Database:
                 function TEXT
             )
         ''')
-        self.conn.commit()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_events (
+                task_id TEXT NOT NULL,
+                process_id TEXT,
+                status TEXT NOT NULL,
+                at REAL NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events (task_id, at)')
+        self._migrate_tasks(cursor)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_process ON tasks (process_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_unfinished ON tasks (process_id) WHERE finished = 0')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS agent_memory (
+                agent_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB,
+                updated_at REAL,
+                PRIMARY KEY (agent_id, key)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS agent_capabilities (
+                capability TEXT NOT NULL,
+                agent_id TEXT NOT NULL,
+                score REAL NOT NULL DEFAULT 1.0,
+                PRIMARY KEY (capability, agent_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_agent_capabilities_agent ON agent_capabilities (agent_id)')
+        # Bumped on every capability change, so other processes know to reload their CapabilityIndex
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS capability_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO capability_version (id, version) VALUES (1, 0)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS agent_capabilities_{event.lower()}_version
+                AFTER {event} ON agent_capabilities
+                BEGIN UPDATE capability_version SET version = version + 1 WHERE id = 1; END
+            ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tool_code (
+                content_hash TEXT PRIMARY KEY,
+                code TEXT NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self._migrate_tools(cursor)
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tools_name_version ON tools (tool_name, version)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tools_name_hash ON tools (tool_name, content_hash)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tools_name_version_sort ON tools (tool_name, version_sort, created_at)')
+        self._migrate_agent_memory(cursor)
+        # Agents saved before capabilities were tracked are found by their name
+        cursor.execute('''
+            INSERT OR IGNORE INTO agent_capabilities (capability, agent_id, score)
+            SELECT lower(agent_name), agent_id, 1.0 FROM agents
+            WHERE agent_name IS NOT NULL AND agent_id NOT IN (SELECT agent_id FROM agent_capabilities)
+        ''')
+        conn.commit()
         self.logger.debug("Database tables created.")
 
+    def _migrate_agent_memory(self, cursor) -> None:
+        # Older databases kept the whole memory dict as str(dict) in agents.memory
+        rows = cursor.execute("SELECT agent_id, memory FROM agents WHERE memory IS NOT NULL AND memory NOT IN ('', '{}')").fetchall()
+        now = time.time()
+        for agent_id, memory in rows:
+            try:
+                values = ast.literal_eval(memory)
+            except (ValueError, SyntaxError) as e:
+                self.logger.warning(f"Could not migrate memory of agent {agent_id}: {e}")
+                continue
+            cursor.executemany(self.SET_MEMORY_SQL, [(agent_id, str(key), encode_message(value), now) for key, value in values.items()])
+            cursor.execute('UPDATE agents SET memory = NULL WHERE agent_id = ?', (agent_id,))
+        if rows:
+            self.logger.info(f"Migrated memory of {len(rows)} agents to the agent_memory table.")
+
+    def _migrate_tasks(self, cursor) -> None:
+        # The original tasks table had no process, encoded task or finished flag
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(tasks)')}
+        for column, column_type in (('process_id', 'TEXT'), ('data', 'BLOB'), ('finished', 'INTEGER NOT NULL DEFAULT 1'), ('updated_at', 'REAL')):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE tasks ADD COLUMN {column} {column_type}')
+
+    def _migrate_tools(self, cursor) -> None:
+        # Older databases kept tool source in tools.function with no hash or timestamp
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(tools)')}
+        for column, column_type in (('content_hash', 'TEXT'), ('created_at', 'REAL'), ('version_sort', 'TEXT')):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE tools ADD COLUMN {column} {column_type}')
+        versions = cursor.execute('SELECT tool_id, version FROM tools WHERE version_sort IS NULL').fetchall()
+        cursor.executemany(
+            'UPDATE tools SET version_sort = ? WHERE tool_id = ?',
+            [(version_sort_key(str(version) if version is not None else None), tool_id) for tool_id, version in versions]
+        )
+        rows = cursor.execute('SELECT tool_id, function FROM tools WHERE content_hash IS NULL AND function IS NOT NULL').fetchall()
+        now = time.time()
+        for tool_id, code in rows:
+            code_hash = content_hash(code)
+            cursor.execute('INSERT OR IGNORE INTO tool_code (content_hash, code) VALUES (?, ?)', (code_hash, code))
+            cursor.execute(
+                'UPDATE tools SET content_hash = ?, function = NULL, created_at = coalesce(created_at, ?) WHERE tool_id = ?',
+                (code_hash, now, tool_id)
+            )
+        if rows:
+            self.logger.info(f"Moved the source of {len(rows)} tools to the tool_code table.")
+
     def save_agent(self, agent_data):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO agents (agent_id, agent_name, system_message, model_name, tools, memory, config)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            agent_data['agent_id'],
-            agent_data['agent_name'],
-            agent_data['system_message'],
-            agent_data['model_name'],
-            ','.join(agent_data['tools']),
-            str(agent_data['memory']),
-            str(agent_data['config'])
-        ))
-        self.conn.commit()
+        """
+        Saves an agent. Its capabilities are the optional 'capabilities' entry plus its
+        lowercased name, which keeps name-based lookups working.
+        """
+        memory = agent_data.get('memory')
+        if memory and not isinstance(memory, AgentMemory):
+            self.update_agent_memory(agent_data['agent_id'], memory)
+        capabilities = normalize_capabilities(list(agent_data.get('capabilities') or []) + [agent_data['agent_name']])
+        self.capability_index.set_agent(agent_data['agent_id'], capabilities)
+        if self.write_behind:
+            snapshot = dict(agent_data, tools=list(agent_data['tools']), config=dict(agent_data['config']), capabilities=capabilities)
+            with self._buffer.lock:
+                self._buffer.agents[agent_data['agent_id']] = snapshot
+            self._schedule_flush()
+            return
+        with self.conn as conn:
+            conn.execute(self.SAVE_AGENT_SQL, self._agent_row(agent_data))
+            versions = self._execute_capability_writes(conn, {agent_data['agent_id']: capabilities})
+        self.capability_index.advance(*versions)
         self.logger.debug(f"Agent {agent_data['agent_id']} saved to database.")
 
     def update_agent_tools(self, agent_id, tools):
+        self.flush()
         cursor = self.conn.cursor()
         cursor.execute('''
             UPDATE agents SET tools = ? WHERE agent_id = ?
@@ -76,46 +340,434 @@ class Database:
         self.logger.debug(f"Agent {agent_id} tools updated.")
 
     def update_agent_memory(self, agent_id, memory):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            UPDATE agents SET memory = ? WHERE agent_id = ?
-        ''', (str(memory), agent_id))
-        self.conn.commit()
+        """
+        Upserts every key of `memory`. Prefer set_agent_memory for single keys.
+        """
+        self._write_memory(agent_id, list(memory.items()))
         self.logger.debug(f"Agent {agent_id} memory updated.")
 
-    def save_tool(self, tool_data):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO tools (tool_id, tool_name, tool_description, version, function)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            tool_data['tool_id'],
-            tool_data['tool_name'],
-            tool_data['tool_description'],
-            tool_data['version'],
-            tool_data['function']  # Serialize function appropriately
-        ))
-        self.conn.commit()
-        self.logger.debug(f"Tool {tool_data['tool_id']} saved to database.")
+    def set_agent_memory(self, agent_id: str, key: str, value: Any) -> None:
+        self._write_memory(agent_id, [(key, value)])
 
-    def find_agent_by_capabilities(self, capabilities):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM agents WHERE agent_name LIKE ?
-        ''', ('%' + capabilities + '%',))
-        result = cursor.fetchone()
-        if result:
-            agent_data = {
-                'agent_id': result[0],
-                'agent_name': result[1],
-                'system_message': result[2],
-                'model_name': result[3],
-                'tools': result[4].split(','),
-                'memory': eval(result[5]),
-                'config': eval(result[6])
-            }
-            self.logger.debug(f"Agent found with capabilities: {capabilities}")
-            return agent_data
-        else:
-            self.logger.debug(f"No agent found with capabilities: {capabilities}")
+    def delete_agent_memory(self, agent_id: str, key: str) -> None:
+        self._write_memory(agent_id, [(key, _DELETED)])
+
+    def _write_memory(self, agent_id: str, items: List[Tuple[str, Any]]) -> None:
+        now = time.time()
+        if self.write_behind:
+            with self._buffer.lock:
+                for key, value in items:
+                    self._buffer.memory[(agent_id, key)] = (value, now)
+            self._schedule_flush()
+            return
+        with self.conn as conn:
+            self._execute_memory_writes(conn, {(agent_id, key): (value, now) for key, value in items})
+
+    def _execute_memory_writes(self, conn: sqlite3.Connection, writes: Dict[Tuple[str, str], Tuple[Any, float]]) -> None:
+        upserts = [(agent_id, key, encode_message(value), updated_at) for (agent_id, key), (value, updated_at) in writes.items() if value is not _DELETED]
+        deletes = [(agent_id, key) for (agent_id, key), (value, _) in writes.items() if value is _DELETED]
+        if upserts:
+            conn.executemany(self.SET_MEMORY_SQL, upserts)
+        if deletes:
+            conn.executemany(self.DELETE_MEMORY_SQL, deletes)
+
+    def _execute_capability_writes(self, conn: sqlite3.Connection, capabilities: Dict[str, List[str]]) -> Optional[Tuple[int, int]]:
+        """
+        Writes capabilities already applied to the capability index. Returns the change
+        counter before and after, to hand to CapabilityIndex.advance() once committed.
+        """
+        if not capabilities:
+            return None
+        # Called after the transaction's first write, so no other process writes in between
+        before = self._capability_version(conn)
+        for agent_id, names in capabilities.items():
+            placeholders = ','.join('?' * len(names))
+            conn.execute(f'DELETE FROM agent_capabilities WHERE agent_id = ? AND capability NOT IN ({placeholders})', (agent_id, *names))
+            conn.executemany(self.ADD_CAPABILITY_SQL, [(name, agent_id) for name in names])
+        return before, self._capability_version(conn)
+
+    def update_capability_score(self, agent_id: str, capability: str, score: float) -> None:
+        """
+        Sets how strongly `agent_id` is preferred for `capability`; higher ranks first.
+        """
+        capability = normalize_capabilities(capability)[0]
+        self.flush()
+        with self.conn as conn:
+            conn.execute('UPDATE agent_capabilities SET score = ? WHERE capability = ? AND agent_id = ?', (score, capability, agent_id))
+            after = self._capability_version(conn)
+        self.capability_index.set_score(agent_id, capability, score)
+        # The trigger bumps the counter once per updated row, at most one here
+        self.capability_index.advance(after - 1, after)
+
+    def find_agents_by_capabilities(self, capabilities, limit: int = None) -> List[Tuple[str, float]]:
+        """
+        Returns (agent_id, score) candidates for one capability or a list of them,
+        best first, from the in-memory capability index. The index is reloaded if
+        another process changed agent_capabilities since it was loaded; that is
+        checked at most every CAPABILITY_REFRESH_INTERVAL seconds, and on every miss.
+        """
+        capabilities = normalize_capabilities(capabilities)
+        self.refresh_capabilities()
+        ranked = self.capability_index.rank(capabilities, limit)
+        if not ranked and capabilities and self.refresh_capabilities(force=True):
+            ranked = self.capability_index.rank(capabilities, limit)
+        return ranked
+
+    def refresh_capabilities(self, force: bool = False) -> bool:
+        """
+        Reloads the capability index if the agent_capabilities change counter moved
+        since it was loaded. Returns True if it was reloaded.
+        """
+        index = self.capability_index
+        now = time.monotonic()
+        if not force and now - index.checked_at < DATABASE['CAPABILITY_REFRESH_INTERVAL']:
+            return False
+        index.checked_at = now
+        if self._capability_version() == index.version:
+            return False
+        # Pending capability writes of this process would be lost by the reload
+        self.flush()
+        self._load_capabilities(index)
+        self.logger.debug(f"Reloaded the capability index at version {index.version}.")
+        return True
+
+    def _capability_version(self, conn: sqlite3.Connection = None) -> int:
+        return (conn or self.conn).execute('SELECT version FROM capability_version WHERE id = 1').fetchone()[0]
+
+    def _load_capabilities(self, index: CapabilityIndex) -> None:
+        # Read in one transaction so the rows match the version they are stamped with
+        with self.conn as conn:
+            conn.execute('BEGIN')
+            version = self._capability_version(conn)
+            index.load(conn.execute('SELECT capability, agent_id, score FROM agent_capabilities').fetchall(), version)
+
+    def get_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        self.flush()
+        row = self.conn.execute('SELECT * FROM agents WHERE agent_id = ?', (agent_id,)).fetchone()
+        return self._agent_from_row(row) if row else None
+
+    def _agent_from_row(self, row) -> Dict[str, Any]:
+        return {
+            'agent_id': row[0],
+            'agent_name': row[1],
+            'system_message': row[2],
+            'model_name': row[3],
+            'tools': row[4].split(',') if row[4] else [],
+            'memory': AgentMemory(self, row[0]),
+            'config': self._load_config(row[6]),
+            'capabilities': sorted(self.capability_index.capabilities_of(row[0])),
+        }
+
+    def get_agent_memory(self, agent_id: str, key: str, default: Any = None) -> Any:
+        self.flush()
+        row = self.conn.execute('SELECT value FROM agent_memory WHERE agent_id = ? AND key = ?', (agent_id, key)).fetchone()
+        return decode_message(row[0]) if row else default
+
+    def get_agent_memory_keys(self, agent_id: str) -> List[str]:
+        self.flush()
+        return [row[0] for row in self.conn.execute('SELECT key FROM agent_memory WHERE agent_id = ?', (agent_id,))]
+
+    def load_agent_memory(self, agent_id: str) -> Dict[str, Any]:
+        self.flush()
+        rows = self.conn.execute('SELECT key, value FROM agent_memory WHERE agent_id = ?', (agent_id,)).fetchall()
+        return {key: decode_message(value) for key, value in rows}
+
+    @staticmethod
+    def _agent_row(agent_data):
+        return (
+            agent_data['agent_id'],
+            agent_data['agent_name'],
+            agent_data['system_message'],
+            agent_data['model_name'],
+            ','.join(agent_data['tools']),
+            json.dumps(agent_data['config'], default=to_serializable)
+        )
+
+    @staticmethod
+    def _load_config(text: Optional[str]) -> Dict[str, Any]:
+        if not text:
+            return {}
+        try:
+            return json.loads(text)
+        except ValueError:
+            # Rows written before config was stored as JSON hold str(dict)
+            return ast.literal_eval(text)
+
+    # Write-behind
+
+    def _schedule_flush(self) -> None:
+        _start_flusher()
+        if len(self._buffer) >= self._buffer.max_pending:
+            self._buffer.flush_due = True
+            _flush_requested.set()
+
+    def has_pending_writes(self) -> bool:
+        return len(self._buffer) > 0
+
+    @property
+    def flushes(self) -> int:
+        return self._buffer.flushes
+
+    @property
+    def rows_written(self) -> int:
+        return self._buffer.rows_written
+
+    def flush(self) -> int:
+        """
+        Writes all pending agent saves and memory updates in one transaction and
+        returns the number of rows written. Pending writes that fail are put back
+        unless a newer write for the same agent arrived in the meantime.
+        """
+        buffer = self._buffer
+        if not len(buffer):
+            return 0
+        with buffer.flush_lock:
+            buffer.flush_due = False
+            buffer.last_flush = time.monotonic()
+            with buffer.lock:
+                agents, buffer.agents = buffer.agents, {}
+                memory, buffer.memory = buffer.memory, {}
+                tasks, buffer.tasks = buffer.tasks, {}
+                task_events, buffer.task_events = buffer.task_events, []
+            if not agents and not memory and not tasks:
+                return 0
+            try:
+                with self.conn as conn:
+                    conn.executemany(self.SAVE_AGENT_SQL, [self._agent_row(data) for data in agents.values()])
+                    versions = self._execute_capability_writes(conn, {agent_id: data['capabilities'] for agent_id, data in agents.items()})
+                    self._execute_memory_writes(conn, memory)
+                    conn.executemany(self.SAVE_TASK_SQL, tasks.values())
+                    conn.executemany(self.TASK_EVENT_SQL, task_events)
+                if versions:
+                    self.capability_index.advance(*versions)
+            except Exception:
+                with buffer.lock:
+                    for agent_id, data in agents.items():
+                        buffer.agents.setdefault(agent_id, data)
+                    for key, write in memory.items():
+                        buffer.memory.setdefault(key, write)
+                    for task_id, row in tasks.items():
+                        buffer.tasks.setdefault(task_id, row)
+                    buffer.task_events[:0] = task_events
+                raise
+            written = len(agents) + len(memory) + len(tasks)
+            buffer.flushes += 1
+            buffer.rows_written += written
+        self.logger.debug(f"Flushed {len(agents)} agent saves, {len(memory)} memory writes and {len(tasks)} task updates.")
+        return written
+
+    def close(self) -> None:
+        """
+        Flushes pending writes. Connections belong to the shared pool and stay open.
+        """
+        self.flush()
+
+    def save_tool(self, tool_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Saves a tool version and returns the stored row. The source is read from
+        'code' (or the older 'function' key); a missing version becomes the one after
+        the name's latest. Raises sqlite3.IntegrityError if another tool already has
+        this tool_name and version.
+        """
+        code = tool_data['code'] if 'code' in tool_data else tool_data['function']
+        version = tool_data.get('version')
+        if not version:
+            latest = self.find_tool_by_name(tool_data['tool_name'])
+            version = next_version(latest['version']) if latest else '1.0'
+        tool = {
+            'tool_id': tool_data['tool_id'],
+            'tool_name': tool_data['tool_name'],
+            'tool_description': tool_data.get('tool_description'),
+            'version': str(version),
+            'content_hash': content_hash(code),
+            'created_at': time.time(),
+            'code': code,
+        }
+        with self.conn as conn:
+            conn.execute('INSERT OR IGNORE INTO tool_code (content_hash, code) VALUES (?, ?)', (tool['content_hash'], code))
+            conn.execute(self.SAVE_TOOL_SQL, (
+                tool['tool_id'], tool['tool_name'], tool['tool_description'], tool['version'],
+                version_sort_key(tool['version']), tool['content_hash'], tool['created_at']
+            ))
+        invalidate_tool(tool['tool_id'])
+        self.tool_registry.add(tool, latest=True)
+        self.logger.debug(f"Tool {tool['tool_id']} saved to database as {tool['tool_name']} {tool['version']}.")
+        return tool
+
+    def register_tool(self, tool_name: str, tool_description: str, code: str) -> str:
+        """
+        Returns the tool_id for this code under `tool_name`. Identical code already
+        registered under the name is reused; otherwise the code is saved as the
+        name's next version.
+        """
+        code_hash = content_hash(code)
+        for _ in range(5):
+            tool_id = self.tool_registry.find_by_hash(tool_name, code_hash)
+            if tool_id is None:
+                tool = self._select_tool('WHERE t.tool_name = ? AND t.content_hash = ?', (tool_name, code_hash))
+                tool_id = tool['tool_id'] if tool else None
+            if tool_id is not None:
+                return tool_id
+            try:
+                return self.save_tool({
+                    'tool_id': str(uuid.uuid4()),
+                    'tool_name': tool_name,
+                    'tool_description': tool_description,
+                    'code': code,
+                })['tool_id']
+            except sqlite3.IntegrityError:
+                # Another process took the next version first; drop the stale latest and retry
+                self.tool_registry.forget_latest(tool_name)
+        raise RuntimeError(f"Could not register a new version of tool {tool_name}")
+
+    def get_tool(self, tool_id: str) -> Optional[Dict[str, Any]]:
+        tool = self.tool_registry.get(tool_id)
+        if tool is None:
+            tool = self._select_tool('WHERE t.tool_id = ?', (tool_id,))
+        return tool
+
+    def find_tool_by_name(self, tool_name: str, version: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns the latest version of the named tool, or the given `version`.
+        """
+        tool_id = self.tool_registry.find(tool_name, version) if version else self.tool_registry.latest(tool_name)
+        tool = self.tool_registry.get(tool_id) if tool_id else None
+        if tool is not None:
+            return tool
+        if version:
+            return self._select_tool('WHERE t.tool_name = ? AND t.version = ?', (tool_name, str(version)))
+        # The highest version wins, whenever it was saved; created_at only breaks ties
+        return self._select_tool(
+            'WHERE t.tool_name = ?', (tool_name,), latest=True,
+            order='t.version_sort DESC, t.created_at DESC, t.rowid DESC'
+        )
+
+    def _select_tool(self, where: str, params: Tuple, latest: bool = False,
+                     order: str = 't.created_at DESC, t.rowid DESC') -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(f'{self.SELECT_TOOL_SQL} {where} ORDER BY {order} LIMIT 1', params).fetchone()
+        if not row:
             return None
+        tool = {
+            'tool_id': row[0], 'tool_name': row[1], 'tool_description': row[2], 'version': row[3],
+            'content_hash': row[4], 'created_at': row[5], 'code': row[6],
+        }
+        self.tool_registry.add(tool, latest=latest)
+        return tool
+
+    def save_task(self, process_id: str, task) -> None:
+        """
+        Records the current state of a task and appends its status to task_events.
+        A task is finished once it completes, or fails with no retries left.
+        """
+        data = task.to_dict()
+        status = data['status']
+        finished = status == 'COMPLETED' or (status == 'FAILED' and task.retry_count <= 0)
+        now = time.time()
+        row = (
+            task.task_id, task.task_name, task.task_description, ','.join(normalize_capabilities(task.capabilities)),
+            ','.join(task.tools), ','.join(task.dependencies), task.retry_count, task.timeout,
+            json.dumps(task.context, default=to_serializable), status, task.version, data['function'] if isinstance(data['function'], str) else None,
+            process_id, encode_message(data), int(finished), now,
+        )
+        event = (task.task_id, process_id, status, now)
+        if self.write_behind:
+            with self._buffer.lock:
+                self._buffer.tasks[task.task_id] = row
+                self._buffer.task_events.append(event)
+            self._schedule_flush()
+            return
+        with self.conn as conn:
+            conn.execute(self.SAVE_TASK_SQL, row)
+            conn.execute(self.TASK_EVENT_SQL, event)
+
+    def get_task_status(self, task_id: str) -> Optional[str]:
+        self.flush()
+        row = self.conn.execute('SELECT status FROM tasks WHERE task_id = ?', (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_process_status(self, process_id: str) -> Dict[str, int]:
+        """
+        Returns the number of tasks of a process in each status.
+        """
+        self.flush()
+        return dict(self.conn.execute('SELECT status, count(*) FROM tasks WHERE process_id = ? GROUP BY status', (process_id,)))
+
+    def get_task_history(self, task_id: str) -> List[Tuple[str, float]]:
+        self.flush()
+        return self.conn.execute('SELECT status, at FROM task_events WHERE task_id = ? ORDER BY at, rowid', (task_id,)).fetchall()
+
+    def load_unfinished_tasks(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Returns (process_id, task data) for every unfinished task, using the partial
+        index over unfinished tasks.
+        """
+        self.flush()
+        rows = self.conn.execute('SELECT process_id, data FROM tasks WHERE finished = 0 AND data IS NOT NULL')
+        return [(process_id, decode_message(data)) for process_id, data in rows]
+
+    def get_completed_task_ids(self, task_ids) -> List[str]:
+        """
+        Returns which of `task_ids` are completed.
+        """
+        self.flush()
+        task_ids = list(task_ids)
+        completed = []
+        for start in range(0, len(task_ids), 500):
+            batch = task_ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            completed.extend(row[0] for row in self.conn.execute(
+                f"SELECT task_id FROM tasks WHERE task_id IN ({placeholders}) AND status = 'COMPLETED'", batch
+            ))
+        return completed
+
+    def find_agent_by_capabilities(self, capabilities):
+        """
+        Returns the best-ranked agent for the capabilities, or None.
+        """
+        for agent_id, _ in self.find_agents_by_capabilities(capabilities, limit=1):
+            agent_data = self.get_agent(agent_id)
+            if agent_data:
+                self.logger.debug(f"Agent found with capabilities: {capabilities}")
+                return agent_data
+        self.logger.debug(f"No agent found with capabilities: {capabilities}")
+        return None
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is None:
+        with _flusher_lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name='database-flusher', daemon=True)
+                _flusher.start()
+
+
+def _flush_loop() -> None:
+    while True:
+        with _write_buffers_lock:
+            buffers = list(_write_buffers.values())
+        _flush_requested.wait(min((buffer.flush_interval for buffer in buffers), default=DATABASE['FLUSH_INTERVAL']))
+        _flush_requested.clear()
+        now = time.monotonic()
+        for buffer in buffers:
+            if len(buffer) and (buffer.flush_due or now - buffer.last_flush >= buffer.flush_interval):
+                try:
+                    buffer.database.flush()
+                except Exception as e:
+                    buffer.database.logger.error(f"Write-behind flush failed: {e}")
+
+
+def flush_all() -> None:
+    """
+    Flushes the pending write-behind writes of every database file. Registered to
+    run at interpreter exit.
+    """
+    with _write_buffers_lock:
+        buffers = list(_write_buffers.values())
+    for buffer in buffers:
+        try:
+            buffer.database.flush()
+        except Exception as e:
+            buffer.database.logger.error(f"Final write-behind flush failed: {e}")
+
+
+atexit.register(flush_all)
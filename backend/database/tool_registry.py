@@ -0,0 +1,142 @@
+# database/tool_registry.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config.settings import TOOLS
+
+
+def content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def next_version(version: Optional[str]) -> str:
+    """
+    Returns the version after `version`: '1.0' -> '1.1', '2' -> '3'. Versions that
+    are not dotted numbers get '.1' appended.
+    """
+    if not version:
+        return '1.0'
+    parts = version.split('.')
+    if parts[-1].isdigit():
+        parts[-1] = str(int(parts[-1]) + 1)
+        return '.'.join(parts)
+    return f"{version}.1"
+
+
+def version_sort_key(version: Optional[str]) -> str:
+    """
+    Returns a string that sorts tool versions in order, comparing dotted numbers
+    numerically so that '1.10' sorts after '1.9'. Non-numeric parts sort after
+    numeric ones, by text. Stored in tools.version_sort so the latest version of a
+    name is an indexed lookup.
+    """
+    return '.'.join(
+        '0' + part.zfill(12) if part.isdigit() else '1' + part for part in (version or '').split('.')
+    )
+
+
+class ToolRegistry:
+    """
+    In-process read-through cache of the tools table, filled by Database as tools
+    are saved or looked up.
+
+    Tool rows are kept by tool_id, the latest version of each name by name, and
+    each (tool_name, version) and (tool_name, content hash) pair maps to its
+    tool_id, so name lookups and dedup checks are dictionary accesses. Tool source
+    is kept once per content hash, mirroring the tool_code table.
+
+    At most `max_tools` rows and as many sources are kept, least recently used
+    first out; an evicted row takes its name, version and hash entries with it, and
+    lookups that miss fall back to the database.
+    """
+    def __init__(self, max_tools: int = None):
+        self.max_tools = max_tools if max_tools is not None else TOOLS['REGISTRY_CACHE_SIZE']
+        self._lock = threading.Lock()
+        self._tools: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # tool_id -> row without code
+        self._latest: Dict[str, str] = {}  # tool_name -> tool_id of its newest version
+        self._versions: Dict[Tuple[str, str], str] = {}  # (tool_name, version) -> tool_id
+        self._hashes: Dict[Tuple[str, str], str] = {}  # (tool_name, content_hash) -> tool_id
+        self._code: "OrderedDict[str, str]" = OrderedDict()  # content_hash -> code
+
+    def add(self, tool: Dict[str, Any], latest: bool = False) -> None:
+        """
+        Caches a tool row. `latest` marks it as the newest version of its name.
+        """
+        row = {k: v for k, v in tool.items() if k != 'code'}
+        key = (row['tool_name'], row['version'])
+        with self._lock:
+            previous = self._tools.get(row['tool_id'])
+            if previous is not None:
+                if (previous['tool_name'], previous['version']) != key:
+                    self._versions.pop((previous['tool_name'], previous['version']), None)
+                if (previous['tool_name'], previous['content_hash']) != (row['tool_name'], row['content_hash']):
+                    self._hashes.pop((previous['tool_name'], previous['content_hash']), None)
+            self._tools[row['tool_id']] = row
+            self._tools.move_to_end(row['tool_id'])
+            self._versions[key] = row['tool_id']
+            self._hashes[(row['tool_name'], row['content_hash'])] = row['tool_id']
+            if 'code' in tool and tool['code'] is not None:
+                self._code[row['content_hash']] = tool['code']
+                self._code.move_to_end(row['content_hash'])
+            if latest:
+                # An older version saved later does not replace a newer latest
+                current = self._tools.get(self._latest.get(row['tool_name']))
+                if current is None or version_sort_key(current['version']) <= version_sort_key(row['version']):
+                    self._latest[row['tool_name']] = row['tool_id']
+            self._evict()
+
+    def _evict(self) -> None:
+        # Called with the lock held
+        if not self.max_tools:
+            return
+        while len(self._tools) > self.max_tools:
+            tool_id, row = self._tools.popitem(last=False)
+            name = row['tool_name']
+            if self._versions.get((name, row['version'])) == tool_id:
+                del self._versions[(name, row['version'])]
+            if self._hashes.get((name, row['content_hash'])) == tool_id:
+                del self._hashes[(name, row['content_hash'])]
+            if self._latest.get(name) == tool_id:
+                del self._latest[name]
+        while len(self._code) > self.max_tools:
+            self._code.popitem(last=False)
+
+    def get(self, tool_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached row with its code, or None if either is not cached.
+        """
+        with self._lock:
+            row = self._tools.get(tool_id)
+            if row is None:
+                return None
+            code = self._code.get(row['content_hash'])
+            if code is None:
+                return None
+            self._tools.move_to_end(tool_id)
+            self._code.move_to_end(row['content_hash'])
+        return dict(row, code=code)
+
+    def latest(self, tool_name: str) -> Optional[str]:
+        return self._latest.get(tool_name)
+
+    def find(self, tool_name: str, version: str) -> Optional[str]:
+        return self._versions.get((tool_name, version))
+
+    def find_by_hash(self, tool_name: str, code_hash: str) -> Optional[str]:
+        return self._hashes.get((tool_name, code_hash))
+
+    def forget_latest(self, tool_name: str) -> None:
+        """
+        Drops the cached latest version of a name, so the next lookup reads it again.
+        """
+        with self._lock:
+            self._latest.pop(tool_name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tools, self._latest, self._versions, self._hashes, self._code = OrderedDict(), {}, {}, {}, OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tools)
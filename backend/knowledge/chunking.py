@@ -0,0 +1,363 @@
+# knowledge/chunking.py
+
+import csv
+import io
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from config.settings import KNOWLEDGE
+from knowledge.readers import UnsupportedFileType
+
+READ_BLOCK_SIZE = 64 * 1024
+MAX_JSON_VALUE_CHARS = 1024 * 1024  # longer JSON containers are streamed element by element
+
+
+class Chunk(NamedTuple):
+    """
+    A bounded piece of a knowledge file. `metadata` records where it came from, such
+    as the page, row range or character offset.
+    """
+    source: str
+    chunk_index: int
+    content: str
+    metadata: Dict[str, Any]
+
+
+def iter_chunks(file_path: str, source: str = None, max_chars: int = None) -> Iterator[Chunk]:
+    """
+    Streams a knowledge file as chunks of at most `max_chars` characters. Only one
+    block, page or row batch is held in memory at a time, so peak memory does not
+    depend on the file size.
+    """
+    max_chars = max_chars or KNOWLEDGE['CHUNK_SIZE']
+    source = source or file_path
+    file_extension = os.path.splitext(file_path)[1].lower()
+    chunker = CHUNKERS.get(file_extension)
+    if chunker is None:
+        raise UnsupportedFileType(f"Unsupported file type: {file_extension}")
+    for index, (content, metadata) in enumerate(chunker(file_path, max_chars)):
+        yield Chunk(source, index, content, metadata)
+
+
+def _split(text: str, max_chars: int, metadata: Dict[str, Any]) -> Iterator:
+    step = max(1, max_chars)
+    for offset in range(0, len(text), step):
+        yield text[offset:offset + step], dict(metadata, offset=offset)
+
+
+def _pack_lines(lines: Iterable[str], max_chars: int, header: str = '', base_metadata: Dict[str, Any] = None,
+                unit: str = 'line', start: int = 1) -> Iterator:
+    """
+    Packs lines into chunks of at most `max_chars`, repeating `header` at the top of
+    every chunk and recording the first and last line (or row) numbers. A header
+    longer than half of `max_chars` is truncated so chunks keep room for content.
+    """
+    yield from _pack_numbered(enumerate(lines, start), max_chars, header, base_metadata, unit)
+
+
+def _pack_numbered(numbered: Iterable, max_chars: int, header: str = '', base_metadata: Dict[str, Any] = None,
+                   unit: str = 'line') -> Iterator:
+    # Takes (number, line) pairs; consecutive pieces of one long line share its number
+    base_metadata = base_metadata or {}
+    if len(header) > max_chars // 2:
+        header = header[:max_chars // 2 - 1] + '\n' if max_chars >= 4 else ''
+
+    def span(first, last):
+        return dict(base_metadata, **{f'first_{unit}': first, f'last_{unit}': last})
+
+    buffer: List[str] = []
+    size = len(header)
+    first = last = None
+    for number, line in numbered:
+        if len(header) + len(line) > max_chars:
+            # A single oversized line is split on its own
+            if buffer:
+                yield header + ''.join(buffer), span(first, last)
+                buffer, size = [], len(header)
+            for piece, metadata in _split(line, max_chars - len(header), span(number, number)):
+                yield header + piece, metadata
+            continue
+        if size + len(line) > max_chars and buffer:
+            yield header + ''.join(buffer), span(first, last)
+            buffer, size = [], len(header)
+        if not buffer:
+            first = number
+        buffer.append(line)
+        size += len(line)
+        last = number
+    if buffer:
+        yield header + ''.join(buffer), span(first, last)
+
+
+def chunk_text(file_path: str, max_chars: int) -> Iterator:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from _pack_numbered(_read_lines(f, max_chars), max_chars)
+
+
+def _read_lines(f, max_chars: int) -> Iterator:
+    """
+    Yields (line number, text) with at most `max_chars` characters read at a time,
+    so a file without newlines is not loaded whole. A longer line comes out in
+    several pieces under the same number.
+    """
+    number = 1
+    for piece in iter(lambda: f.readline(max(1, max_chars)), ''):
+        yield number, piece
+        if piece.endswith('\n'):
+            number += 1
+
+
+def chunk_json(file_path: str, max_chars: int) -> Iterator:
+    """
+    Streams the elements of a top-level array, or the members of a top-level object,
+    without loading the whole document. Elements are re-serialized one per line.
+    Elements longer than MAX_JSON_VALUE_CHARS are streamed the same way, one level
+    further down, and keep the object keys above them: {"data": [rows]} becomes one
+    {"data": row} line per row.
+    """
+    def lines():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for path, value in _JsonStream(f).items():
+                for key in reversed(path):
+                    if isinstance(key, str):
+                        value = {key: value}
+                yield json.dumps(value, ensure_ascii=False) + '\n'
+    yield from _pack_lines(lines(), max_chars, unit='item', start=0)
+
+
+_TOO_LARGE = object()
+
+
+class _JsonStream:
+    """
+    Incremental reader of one JSON document. Values are decoded with the standard
+    decoder once they fit in the buffer; containers that do not fit in
+    `max_value_chars` are walked element by element instead, so the buffer never
+    holds much more than one bounded value. A string or number longer than that
+    raises ValueError rather than being read to the end of the file.
+    """
+    def __init__(self, f, max_value_chars: int = None):
+        self.f = f
+        self.max_value_chars = max_value_chars or MAX_JSON_VALUE_CHARS
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def items(self) -> Iterator:
+        """
+        Yields (path, value) pairs, where path holds the object keys and array indexes
+        leading to the value. The top-level container is always walked.
+        """
+        if self._peek() in ('[', '{'):
+            yield from self._walk(())
+        else:
+            yield from self._value(())
+
+    def _fill(self, size: int = None) -> None:
+        block = self.f.read(size or READ_BLOCK_SIZE)
+        if not block:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+
+    def _peek(self, separators: str = '') -> Optional[str]:
+        # Skips whitespace and the given separators; returns the next significant character
+        while True:
+            buffer = self.buffer
+            while self.position < len(buffer) and (buffer[self.position].isspace() or buffer[self.position] in separators):
+                self.position += 1
+            if self.position < len(buffer):
+                return buffer[self.position]
+            if self.eof:
+                return None
+            self._fill()
+
+    def _decode(self) -> Any:
+        # Returns the value at the position, or _TOO_LARGE once more than
+        # max_value_chars are buffered without completing it
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                if len(self.buffer) - self.position > self.max_value_chars:
+                    return _TOO_LARGE
+                # Reading as much again as is buffered keeps the retries linear overall
+                self._fill(max(READ_BLOCK_SIZE, len(self.buffer) - self.position))
+                continue
+            # A number at the end of the buffer may be cut short; read more to be sure
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+            self.position = end
+            return value
+
+    def _value(self, path: tuple) -> Iterator:
+        opening = self._peek()
+        if opening is None:
+            raise json.JSONDecodeError("Expecting value", self.buffer, self.position)
+        value = self._decode()
+        if value is not _TOO_LARGE:
+            yield path, value
+        elif opening in ('[', '{'):
+            yield from self._walk(path)
+        elif opening != '"':
+            # Only strings can legitimately be this long; anything else is malformed
+            self.decoder.raw_decode(self.buffer, self.position)
+        else:
+            raise ValueError(f"JSON value at {list(path)} is longer than {self.max_value_chars} characters")
+
+    def _walk(self, path: tuple) -> Iterator:
+        opening = self.buffer[self.position]
+        closing = ']' if opening == '[' else '}'
+        self.position += 1
+        index = 0
+        while True:
+            next_char = self._peek(',')
+            if next_char is None:
+                raise json.JSONDecodeError("Unterminated container", self.buffer, self.position)
+            if next_char == closing:
+                self.position += 1
+                return
+            if opening == '[':
+                yield from self._value(path + (index,))
+                index += 1
+                continue
+            key = self._decode() if next_char == '"' else None
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", self.buffer, self.position)
+            if self._peek() != ':':
+                raise json.JSONDecodeError("Expecting ':' delimiter", self.buffer, self.position)
+            self.position += 1
+            yield from self._value(path + (key,))
+
+
+def chunk_yaml(file_path: str, max_chars: int) -> Iterator:
+    """
+    Streams YAML documents one at a time. Each document is loaded whole, so a single
+    very large document still needs memory proportional to its size.
+    """
+    import yaml
+
+    def lines():
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for document in yaml.safe_load_all(f):
+                if isinstance(document, dict):
+                    items = ({key: value} for key, value in document.items())
+                elif isinstance(document, list):
+                    items = document
+                else:
+                    items = [document]
+                for item in items:
+                    yield json.dumps(item, ensure_ascii=False, default=str) + '\n'
+    yield from _pack_lines(lines(), max_chars, unit='item', start=0)
+
+
+def chunk_csv(file_path: str, max_chars: int) -> Iterator:
+    """
+    Streams CSV rows in batches using PyArrow when available, then pandas with
+    `chunksize`, then the csv module. Every chunk repeats the header row.
+    """
+    try:
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        pa_csv = None
+    if pa_csv is not None:
+        reader = pa_csv.open_csv(file_path, read_options=pa_csv.ReadOptions(block_size=READ_BLOCK_SIZE * 16))
+        yield from _pack_rows(reader.schema.names, _arrow_rows(reader), max_chars)
+        return
+
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    if pd is not None:
+        frames = iter(pd.read_csv(file_path, chunksize=KNOWLEDGE['TABLE_CHUNK_ROWS']))
+        first = next(frames, None)
+        if first is not None:
+            yield from _pack_rows([str(column) for column in first.columns], _frame_rows(first, frames), max_chars)
+        return
+
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is not None:
+            yield from _pack_rows(header, rows, max_chars)
+
+
+def _arrow_rows(reader) -> Iterator:
+    for batch in reader:
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def _frame_rows(first_frame, frames) -> Iterator:
+    yield from first_frame.itertuples(index=False, name=None)
+    for frame in frames:
+        yield from frame.itertuples(index=False, name=None)
+
+
+def _pack_rows(header: List[str], rows: Iterable, max_chars: int, base_metadata: Dict[str, Any] = None) -> Iterator:
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+
+    def format_row(row) -> str:
+        output.seek(0)
+        output.truncate()
+        writer.writerow(['' if value is None else value for value in row])
+        return output.getvalue()
+    yield from _pack_lines((format_row(row) for row in rows), max_chars, header=format_row(header),
+                           base_metadata=base_metadata, unit='row')
+
+
+def chunk_excel(file_path: str, max_chars: int) -> Iterator:
+    """
+    Streams .xlsx rows sheet by sheet with openpyxl in read-only mode. Legacy .xls
+    files go through pandas one sheet at a time.
+    """
+    if file_path.lower().endswith('.xlsx'):
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    continue
+                yield from _pack_rows([str(h) if h is not None else '' for h in header], rows, max_chars, {'sheet': sheet.title})
+        finally:
+            workbook.close()
+    else:
+        import pandas as pd
+        sheet_names = pd.ExcelFile(file_path).sheet_names
+        for sheet_name in sheet_names:
+            frame = pd.read_excel(file_path, sheet_name=sheet_name)
+            yield from _pack_rows(list(frame.columns), frame.itertuples(index=False, name=None), max_chars, {'sheet': sheet_name})
+
+
+def chunk_pdf(file_path: str, max_chars: int) -> Iterator:
+    """
+    Extracts text one page at a time.
+    """
+    from PyPDF2 import PdfReader
+    with open(file_path, 'rb') as f:
+        reader = PdfReader(f)
+        for page_number, page in enumerate(reader.pages, 1):
+            text = page.extract_text() or ''
+            if text:
+                yield from _split(text, max_chars, {'page': page_number})
+
+
+CHUNKERS = {
+    '.txt': chunk_text,
+    '.md': chunk_text,
+    '.log': chunk_text,
+    '.json': chunk_json,
+    '.csv': chunk_csv,
+    '.xlsx': chunk_excel,
+    '.xls': chunk_excel,
+    '.pdf': chunk_pdf,
+    '.yaml': chunk_yaml,
+    '.yml': chunk_yaml,
+}
@@ -0,0 +1,348 @@
+# knowledge/knowledge_store.py
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config.settings import KNOWLEDGE
+from knowledge.chunking import Chunk, iter_chunks
+from knowledge.readers import UnsupportedFileType, read_file
+
+
+class ChunkedDocument:
+    """
+    Stand-in for the parsed content of a file too large to hold in memory. Iterating
+    streams the file as chunks; each iteration re-reads the file.
+    """
+    def __init__(self, file_path: str, source: str):
+        self.file_path = file_path
+        self.source = source
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return iter_chunks(self.file_path, source=self.source)
+
+    def __repr__(self) -> str:
+        return f"ChunkedDocument(source={self.source})"
+
+
+class KnowledgeStore(Mapping):
+    """
+    Process-wide, read-only view of the knowledge directory.
+
+    Behaves like the dict agents used to build in load_knowledge (relative path ->
+    parsed content), but files are parsed on first access and the parsed result is
+    cached on disk, keyed by path, mtime and size, so a file is parsed once across
+    agents and restarts. An optional watcher re-parses files that change on disk.
+    Files larger than KNOWLEDGE['MAX_INLINE_BYTES'] are returned as a ChunkedDocument
+    instead of being parsed whole.
+    """
+    def __init__(self, root: str = None, cache_dir: Optional[str] = None, watch_interval: float = None):
+        self.logger = logging.getLogger('KnowledgeStore')
+        self.root = root or KNOWLEDGE['ROOT']
+        self.cache_dir = cache_dir if cache_dir is not None else KNOWLEDGE['CACHE_DIR']
+        self.watch_interval = watch_interval if watch_interval is not None else KNOWLEDGE['WATCH_INTERVAL']
+        self._lock = threading.RLock()
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None  # relative path -> (mtime_ns, size)
+        self._parsed: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.parses = 0
+        self.disk_hits = 0
+        self.version = 0  # bumped whenever refresh() finds added, changed or removed files
+
+    # Mapping interface
+
+    def __getitem__(self, relative_path: str) -> Any:
+        signature = self._ensure_index().get(relative_path)
+        if signature is None:
+            raise KeyError(relative_path)
+        return self._load(relative_path, signature)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._ensure_index()))
+
+    def __len__(self) -> int:
+        return len(self._ensure_index())
+
+    def __contains__(self, relative_path) -> bool:
+        return relative_path in self._ensure_index()
+
+    # Indexing
+
+    def signatures(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Returns relative path -> (mtime_ns, size) for every file in the knowledge
+        directory, as of the last scan. The directory is scanned on first call.
+        """
+        return dict(self._ensure_index())
+
+    def _ensure_index(self) -> Dict[str, Tuple[int, int]]:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._scan()
+                    self.logger.debug(f"Indexed {len(self._index)} knowledge files under {self.root}.")
+                    if self.watch_interval:
+                        self.start_watcher()
+        return self._index
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        index = {}
+        for root, _, files in os.walk(self.root):
+            for file in files:
+                file_path = os.path.join(root, file)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                index[os.path.relpath(file_path, self.root)] = (stat.st_mtime_ns, stat.st_size)
+        return index
+
+    def refresh(self) -> List[str]:
+        """
+        Rescans the directory and re-parses files that changed since they were loaded.
+        Returns the relative paths that were added, changed or removed.
+        """
+        new_index = self._scan()
+        with self._lock:
+            old_index = self._index or {}
+            changed = [path for path, signature in new_index.items() if old_index.get(path) != signature]
+            removed = [path for path in old_index if path not in new_index]
+            self._index = new_index
+            if changed or removed:
+                self.version += 1
+            for path in removed:
+                self._parsed.pop(path, None)
+            stale = [(path, old_index[path]) for path in changed + removed if path in old_index]
+            reload = [path for path in changed if path in self._parsed]
+        for path, signature in stale:
+            self._remove_disk_cache(path, signature)
+        for path in reload:
+            self._load(path, new_index[path])
+        if changed or removed:
+            self.logger.info(f"Knowledge refreshed: {len(changed)} changed, {len(removed)} removed.")
+        return changed + removed
+
+    # Parsing and caching
+
+    def _load(self, relative_path: str, signature: Tuple[int, int]) -> Any:
+        cached = self._parsed.get(relative_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with self._lock:
+            file_lock = self._file_locks.setdefault(relative_path, threading.Lock())
+        # Parse each file once even when several agents ask for it at the same time
+        with file_lock:
+            cached = self._parsed.get(relative_path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            if signature[1] > KNOWLEDGE['MAX_INLINE_BYTES']:
+                value = ChunkedDocument(os.path.join(self.root, relative_path), relative_path)
+                self._parsed[relative_path] = (signature, value)
+                return value
+            value = self._read_disk_cache(relative_path, signature)
+            if value is None:
+                value = self._parse(relative_path, signature)
+            else:
+                self.disk_hits += 1
+            self._parsed[relative_path] = (signature, value)
+            return value
+
+    def preload(self, workers: int = None, progress: Callable[[int, int, str, Optional[str]], None] = None) -> Dict[str, Any]:
+        """
+        Parses every knowledge file that is not already cached, spreading the work over
+        a process pool sized to the available cores. Workers write parsed results to
+        the disk cache and return only a status, so large results do not cross process
+        boundaries; entries then load from the cache on first access. A file that fails
+        to parse is recorded with its error and does not affect the others.
+
+        `progress(completed, total, relative_path, error)` is called as files finish.
+        Returns a summary with counts and elapsed time.
+        """
+        started = time.perf_counter()
+        index = self._ensure_index()
+        pending = []
+        for relative_path, signature in index.items():
+            cached = self._parsed.get(relative_path)
+            if cached is not None and cached[0] == signature:
+                continue
+            if signature[1] > KNOWLEDGE['MAX_INLINE_BYTES']:
+                continue
+            if self.cache_dir and os.path.exists(self._cache_path(relative_path, signature)):
+                continue
+            pending.append((relative_path, signature))
+
+        workers = workers or KNOWLEDGE['PRELOAD_WORKERS'] or os.cpu_count() or 1
+        total = len(pending)
+        completed = failed = 0
+        if pending:
+            self.logger.info(f"Preloading {total} knowledge files with {workers} worker processes.")
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=min(workers, total)) as pool:
+                futures = {
+                    pool.submit(_preload_file, self.root, self.cache_dir, relative_path, signature): relative_path
+                    for relative_path, signature in pending
+                }
+                for future in as_completed(futures):
+                    relative_path = futures[future]
+                    try:
+                        _, signature, value, error = future.result()
+                    except Exception as e:
+                        # The worker itself died (for example, out of memory); isolate the file
+                        signature, value, error = index[relative_path], None, f"Error reading file: {str(e)}"
+                    completed += 1
+                    if error is not None:
+                        failed += 1
+                        self.logger.error(f"Error preloading {relative_path}: {error}")
+                        self._parsed[relative_path] = (signature, error)
+                    elif value is not None:
+                        self._parsed[relative_path] = (signature, value)
+                    if progress:
+                        progress(completed, total, relative_path, error)
+                    elif completed % 100 == 0 or completed == total:
+                        self.logger.info(f"Preloaded {completed}/{total} knowledge files.")
+            self.parses += completed - failed
+        summary = {
+            'files': len(index),
+            'parsed': completed - failed,
+            'failed': failed,
+            'skipped': len(index) - total,
+            'workers': workers,
+            'elapsed': time.perf_counter() - started,
+        }
+        self.logger.info(f"Knowledge preload finished: {summary}")
+        return summary
+
+    def iter_chunks(self, relative_path: str = None) -> Iterator[Chunk]:
+        """
+        Streams bounded chunks of one knowledge file, or of every supported file when
+        no path is given. Unsupported or unreadable files are skipped with a log entry.
+        """
+        paths = [relative_path] if relative_path is not None else list(self._ensure_index())
+        for path in paths:
+            try:
+                yield from iter_chunks(os.path.join(self.root, path), source=path)
+            except UnsupportedFileType:
+                if relative_path is not None:
+                    raise
+            except Exception as e:
+                self.logger.error(f"Error streaming knowledge file {path}: {str(e)}")
+
+    def _parse(self, relative_path: str, signature: Tuple[int, int]) -> Any:
+        file_path = os.path.join(self.root, relative_path)
+        try:
+            value = read_file(file_path)
+        except UnsupportedFileType as e:
+            self.logger.warning(str(e))
+            return str(e)
+        except Exception as e:
+            self.logger.error(f"Error reading file {file_path}: {str(e)}")
+            return f"Error reading file: {str(e)}"
+        self.parses += 1
+        self._write_disk_cache(relative_path, signature, value)
+        return value
+
+    def _cache_path(self, relative_path: str, signature: Tuple[int, int]) -> str:
+        return _cache_path(self.cache_dir, relative_path, signature)
+
+    def _read_disk_cache(self, relative_path: str, signature: Tuple[int, int]) -> Any:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(relative_path, signature), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable knowledge cache entry for {relative_path}: {e}")
+            return None
+
+    def _write_disk_cache(self, relative_path: str, signature: Tuple[int, int], value: Any) -> None:
+        _write_disk_cache(self.cache_dir, relative_path, signature, value)
+
+    def _remove_disk_cache(self, relative_path: str, signature: Tuple[int, int]) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            os.remove(self._cache_path(relative_path, signature))
+        except OSError:
+            pass
+
+    # Watching
+
+    def start_watcher(self) -> None:
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name='knowledge-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Knowledge refresh failed: {e}")
+
+
+def _cache_path(cache_dir: str, relative_path: str, signature: Tuple[int, int]) -> str:
+    key = f"{relative_path}\0{signature[0]}\0{signature[1]}".encode()
+    return os.path.join(cache_dir, hashlib.sha1(key).hexdigest() + '.pkl')
+
+
+def _write_disk_cache(cache_dir: Optional[str], relative_path: str, signature: Tuple[int, int], value: Any) -> None:
+    """
+    Pickles a parsed file into the disk cache, atomically. Shared by the store and
+    the preload workers, which have no store of their own.
+    """
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _cache_path(cache_dir, relative_path, signature))
+    except Exception as e:
+        logging.getLogger('KnowledgeStore').warning(f"Could not cache parsed knowledge for {relative_path}: {e}")
+
+
+def _preload_file(root: str, cache_dir: Optional[str], relative_path: str, signature: Tuple[int, int]):
+    """
+    Process-pool worker for KnowledgeStore.preload. Returns (relative_path, signature,
+    value, error); value is only returned when there is no disk cache to write to.
+    """
+    try:
+        value = read_file(os.path.join(root, relative_path))
+    except UnsupportedFileType as e:
+        return relative_path, signature, str(e), None
+    except Exception as e:
+        return relative_path, signature, None, f"Error reading file: {str(e)}"
+    if not cache_dir:
+        return relative_path, signature, value, None
+    _write_disk_cache(cache_dir, relative_path, signature, value)
+    return relative_path, signature, None, None
+
+
+_store: Optional[KnowledgeStore] = None
+_store_lock = threading.Lock()
+
+
+def get_knowledge_store() -> KnowledgeStore:
+    """
+    Returns the process-wide knowledge store. Creating it does no I/O.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = KnowledgeStore()
+    return _store
@@ -0,0 +1,48 @@
+# knowledge/readers.py
+
+import json
+import os
+from typing import Any
+
+SUPPORTED_EXTENSIONS = {'.txt', '.md', '.log', '.json', '.csv', '.xlsx', '.xls', '.pdf', '.yaml', '.yml'}
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+def read_file(file_path: str) -> Any:
+    """
+    Parses a knowledge file into text or structured data based on its extension.
+    pandas, PyPDF2 and yaml are imported only when a file that needs them is read.
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+
+    if file_extension in ['.txt', '.md', '.log']:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    elif file_extension == '.json':
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    elif file_extension == '.csv':
+        import pandas as pd
+        return pd.read_csv(file_path).to_dict(orient='records')
+
+    elif file_extension in ['.xlsx', '.xls']:
+        import pandas as pd
+        return pd.read_excel(file_path).to_dict(orient='records')
+
+    elif file_extension == '.pdf':
+        from PyPDF2 import PdfReader
+        with open(file_path, 'rb') as f:
+            reader = PdfReader(f)
+            return ' '.join(page.extract_text() for page in reader.pages)
+
+    elif file_extension in ['.yaml', '.yml']:
+        import yaml
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f)
+
+    raise UnsupportedFileType(f"Unsupported file type: {file_extension}")
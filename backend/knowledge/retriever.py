@@ -0,0 +1,176 @@
+# knowledge/retriever.py
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import KNOWLEDGE
+from knowledge.chunking import CHUNKERS
+from knowledge.knowledge_store import KnowledgeStore, get_knowledge_store
+from knowledge.vector_index import HashEmbedding, VectorIndex
+
+
+def create_embedding(name: str = None, dimensions: int = None):
+    """
+    Resolves KNOWLEDGE['EMBEDDING']: 'hash' for the local HashEmbedding, or
+    '<provider>:<model>' for a get_<provider>_embedding factory in models.models,
+    e.g. 'huggingface:sentence-transformers/all-MiniLM-L6-v2'. Provider embeddings
+    are wrapped in the shared, caching EmbeddingService for that model.
+    """
+    name = name or KNOWLEDGE['EMBEDDING']
+    if name == 'hash':
+        return HashEmbedding(dimensions)
+    provider, _, model_name = name.partition(':')
+    from models import models
+    from models.embedding_service import get_embedding_service
+    factory = getattr(models, f"get_{provider}_embedding", None)
+    if factory is None or not model_name:
+        raise ValueError(f"Unknown embedding: {name}")
+    return get_embedding_service(name, lambda: factory(model_name))
+
+
+class KnowledgeRetriever:
+    """
+    Retrieval over the knowledge store: files are streamed as chunks, embedded in
+    batches of `batch_size` and added to a VectorIndex, so agents can fetch the top-k
+    relevant chunks for a query instead of placing whole files in the prompt.
+
+    `sync` is incremental: it compares file signatures (mtime, size) with those
+    recorded at the last sync and only re-embeds added or changed files, deleting
+    the rows of changed or removed ones. start() runs a sync on a background
+    thread; search() starts one whenever the store has changed since the last sync
+    (including changes picked up by the store's watcher) and answers from what is
+    indexed so far rather than waiting for it.
+    """
+    SOURCES_FILE = 'sources.json'
+
+    def __init__(self, store: KnowledgeStore = None, index_dir: str = None, embedding=None, batch_size: int = None):
+        self.logger = logging.getLogger('KnowledgeRetriever')
+        self.store = store or get_knowledge_store()
+        self.index_dir = index_dir or KNOWLEDGE['INDEX_DIR']
+        self.embedding = embedding or create_embedding()
+        self.batch_size = batch_size or KNOWLEDGE['EMBED_BATCH_SIZE']
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._syncer: Optional[threading.Thread] = None
+        self._index: Optional[VectorIndex] = None
+        self._sources: Dict[str, List[int]] = {}
+        self._synced_version: Optional[int] = None
+
+    @property
+    def index(self) -> VectorIndex:
+        if self._index is None:
+            with self._open_lock:
+                if self._index is None:
+                    dimensions = len(self.embedding.embed_query('dimension probe'))
+                    sources_path = os.path.join(self.index_dir, self.SOURCES_FILE)
+                    if os.path.exists(sources_path):
+                        with open(sources_path, 'r', encoding='utf-8') as f:
+                            self._sources = json.load(f)
+                    self._index = VectorIndex(self.index_dir, dimensions)
+        return self._index
+
+    def start(self) -> None:
+        """
+        Syncs the index on a background thread, unless a sync is already running.
+        """
+        with self._open_lock:
+            if self._syncer is not None and self._syncer.is_alive():
+                return
+            self._syncer = threading.Thread(target=self._background_sync, name='knowledge-index-sync', daemon=True)
+            self._syncer.start()
+
+    def _background_sync(self) -> None:
+        try:
+            self.sync()
+        except Exception as e:
+            self.logger.error(f"Knowledge index sync failed: {e}")
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Brings the index up to date with the knowledge directory and persists it.
+        Returns counts of indexed files, removed files and added chunks.
+        """
+        with self._lock:
+            index = self.index
+            version = self.store.version
+            current = {path: list(signature) for path, signature in self.store.signatures().items()}
+            changed = [path for path, signature in current.items() if self._sources.get(path) != signature]
+            removed = [path for path in self._sources if path not in current]
+            for path in changed + removed:
+                if path in self._sources:
+                    index.delete_where(source=path)
+                    self._sources.pop(path, None)
+            chunks = 0
+            for path in changed:
+                chunks += self._index_file(path)
+                self._sources[path] = current[path]
+            self._synced_version = version
+            if changed or removed:
+                self._save()
+                self.logger.info(f"Knowledge index synced: {len(changed)} files indexed ({chunks} chunks), {len(removed)} removed.")
+            return {'indexed': len(changed), 'removed': len(removed), 'chunks': chunks}
+
+    def _index_file(self, relative_path: str) -> int:
+        if os.path.splitext(relative_path)[1].lower() not in CHUNKERS:
+            return 0
+        added = 0
+        batch = []
+        for chunk in self.store.iter_chunks(relative_path):
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                added += self._add_batch(batch)
+                batch = []
+        if batch:
+            added += self._add_batch(batch)
+        return added
+
+    def _add_batch(self, chunks) -> int:
+        vectors = self.embedding.embed_documents([chunk.content for chunk in chunks])
+        metadata = [
+            dict(chunk.metadata, source=chunk.source, chunk_index=chunk.chunk_index, content=chunk.content)
+            for chunk in chunks
+        ]
+        self.index.add(vectors, metadata)
+        return len(chunks)
+
+    def remove_source(self, relative_path: str) -> int:
+        with self._lock:
+            removed = self.index.delete_where(source=relative_path)
+            self._sources.pop(relative_path, None)
+            self._save()
+            return removed
+
+    def _save(self) -> None:
+        self.index.save()
+        sources_path = os.path.join(self.index_dir, self.SOURCES_FILE)
+        with open(sources_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self._sources, f)
+        os.replace(sources_path + '.tmp', sources_path)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Returns the `k` chunks most similar to `query` as (score, metadata) pairs; the
+        metadata includes the chunk's source, position and content.
+        """
+        if self._synced_version != self.store.version:
+            self.start()
+        return self.index.search(self.embedding.embed_query(query), k)
+
+
+_retriever: Optional[KnowledgeRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_knowledge_retriever() -> KnowledgeRetriever:
+    """
+    Returns the process-wide retriever. The index is opened on first use and synced
+    with the knowledge directory in the background, from start() or the first search.
+    """
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = KnowledgeRetriever()
+    return _retriever
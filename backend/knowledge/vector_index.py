@@ -0,0 +1,328 @@
+# knowledge/vector_index.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import KNOWLEDGE
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashEmbedding:
+    """
+    Deterministic, dependency-free embedding based on feature hashing of word
+    unigrams and bigrams. It needs no network or model download, which makes it
+    useful for tests and as a fallback; retrieval quality is lexical only.
+    Implements the embed_documents/embed_query interface of the embedding objects
+    returned by models.models.
+    """
+    def __init__(self, dimensions: int = None):
+        self.dimensions = dimensions or KNOWLEDGE['EMBEDDING_DIMENSIONS']
+
+    def _features(self, text: str) -> Iterable[str]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        yield from tokens
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            vector[value % self.dimensions] += 1.0 if (value >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over a memory-mapped float32 matrix.
+
+    Vectors live in `<directory>/vectors.f32`, which grows by doubling, and
+    per-row metadata in a SQLite side table, `<directory>/meta.sqlite`, written
+    incrementally; `meta.json` only records the matrix shape. In memory the index
+    keeps one liveness flag per row and reads metadata for search results only.
+    Once `train_threshold` vectors have been added, an IVF (inverted file) index
+    is trained with k-means: each vector is assigned to its nearest of `n_lists`
+    centroids and a query only scans the `n_probes` closest lists. Before that,
+    queries scan every live row. Deletes are tombstones removed from the inverted
+    lists; `compact` reclaims their rows.
+    """
+    VECTORS_FILE = 'vectors.f32'
+    META_FILE = 'meta.json'
+    METADATA_DB = 'meta.sqlite'
+    CENTROIDS_FILE = 'centroids.npy'
+    _FILTER_KEY = re.compile(r"^\w+$")
+
+    def __init__(self, directory: str, dimensions: int, n_lists: int = None, n_probes: int = None, train_threshold: int = None):
+        self.logger = logging.getLogger('VectorIndex')
+        self.directory = directory
+        self.dimensions = dimensions
+        self.n_lists = n_lists or KNOWLEDGE['IVF_LISTS']
+        self.n_probes = n_probes or KNOWLEDGE['IVF_PROBES']
+        self.train_threshold = train_threshold or self.n_lists * 39
+        self._lock = threading.RLock()
+        self.count = 0
+        self.capacity = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[List[int]] = []
+        self.row_list: Dict[int, int] = {}
+        self.vectors: Optional[np.memmap] = None
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, self.METADATA_DB), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, source TEXT, meta TEXT NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_rows_source ON rows (source)")
+        self._load()
+
+    # Storage
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, self.VECTORS_FILE)
+
+    def _load(self) -> None:
+        meta_path = os.path.join(self.directory, self.META_FILE)
+        if not os.path.exists(meta_path):
+            self._db.execute("DELETE FROM rows")
+            self._db.commit()
+            self._resize(1024)
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['dimensions'] != self.dimensions:
+            raise ValueError(f"Index at {self.directory} has {meta['dimensions']} dimensions, expected {self.dimensions}")
+        self.count = meta['count']
+        self.capacity = meta['capacity']
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(self.capacity, self.dimensions))
+        if 'rows' in meta:
+            # Indexes saved before the side table kept every row's metadata in meta.json
+            self._db.execute("DELETE FROM rows")
+            self._insert_metadata(0, meta['rows'])
+            self._db.commit()
+        # Rows added after the last save have no vectors on disk
+        self._db.execute("DELETE FROM rows WHERE row >= ?", (self.count,))
+        self._db.commit()
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        rows = [row for (row,) in self._db.execute("SELECT row FROM rows")]
+        self.alive[rows] = True
+        centroids_path = os.path.join(self.directory, self.CENTROIDS_FILE)
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+            self._assign_all()
+
+    def _resize(self, capacity: int) -> None:
+        new_path = self._vectors_path + '.new'
+        vectors = np.memmap(new_path, dtype=np.float32, mode='w+', shape=(capacity, self.dimensions))
+        if self.vectors is not None and self.count:
+            vectors[:self.count] = self.vectors[:self.count]
+        vectors.flush()
+        del vectors
+        if self.vectors is not None:
+            del self.vectors
+        os.replace(new_path, self._vectors_path)
+        self.capacity = capacity
+        self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dimensions))
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive[:capacity]
+        self.alive = alive
+
+    def _insert_metadata(self, first_row: int, metadata: Sequence[Optional[Dict[str, Any]]]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO rows (row, source, meta) VALUES (?, ?, ?)",
+            [(first_row + offset, item.get('source'), json.dumps(item))
+             for offset, item in enumerate(metadata) if item is not None],
+        )
+
+    def get_metadata(self, rows: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        with self._lock:
+            found = {}
+            for offset in range(0, len(rows), 500):
+                batch = [int(row) for row in rows[offset:offset + 500]]
+                placeholders = ','.join('?' * len(batch))
+                for row, meta in self._db.execute(f"SELECT row, meta FROM rows WHERE row IN ({placeholders})", batch):
+                    found[row] = json.loads(meta)
+        return [found.get(int(row)) for row in rows]
+
+    def save(self) -> None:
+        with self._lock:
+            self.vectors.flush()
+            self._db.commit()
+            meta = {'dimensions': self.dimensions, 'count': self.count, 'capacity': self.capacity}
+            tmp_path = os.path.join(self.directory, self.META_FILE + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, os.path.join(self.directory, self.META_FILE))
+            centroids_path = os.path.join(self.directory, self.CENTROIDS_FILE)
+            if self.centroids is not None:
+                np.save(centroids_path, self.centroids)
+            elif os.path.exists(centroids_path):
+                os.remove(centroids_path)
+
+    # Mutation
+
+    def add(self, vectors: Sequence[Sequence[float]], metadata: Sequence[Dict[str, Any]]) -> List[int]:
+        """
+        Appends normalized vectors with their metadata and returns the new row ids.
+        """
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions))
+        with self._lock:
+            needed = self.count + len(matrix)
+            if needed > self.capacity:
+                capacity = self.capacity
+                while capacity < needed:
+                    capacity *= 2
+                self._resize(capacity)
+            rows = list(range(self.count, needed))
+            self.vectors[self.count:needed] = matrix
+            self._insert_metadata(self.count, metadata)
+            self.alive[self.count:needed] = True
+            self.count = needed
+            if self.centroids is not None:
+                self._assign(rows, matrix)
+            elif self.live_count >= self.train_threshold:
+                self.train()
+            return rows
+
+    def delete(self, rows: Iterable[int]) -> int:
+        deleted = []
+        with self._lock:
+            for row in rows:
+                if 0 <= row < self.count and self.alive[row]:
+                    self.alive[row] = False
+                    list_id = self.row_list.pop(row, None)
+                    if list_id is not None:
+                        self.lists[list_id].remove(row)
+                    deleted.append((row,))
+            self._db.executemany("DELETE FROM rows WHERE row = ?", deleted)
+        return len(deleted)
+
+    def delete_where(self, **filters) -> int:
+        """
+        Deletes every row whose metadata matches all of `filters`, e.g. source='a.pdf'.
+        """
+        clauses, values = [], []
+        for key, value in filters.items():
+            if key == 'source':
+                clauses.append("source = ?")
+            elif self._FILTER_KEY.match(key):
+                clauses.append(f"json_extract(meta, '$.{key}') = ?")
+            else:
+                raise ValueError(f"Unsupported metadata filter: {key}")
+            values.append(value)
+        with self._lock:
+            where = ' AND '.join(clauses) or '1'
+            rows = [row for (row,) in self._db.execute(f"SELECT row FROM rows WHERE {where}", values)]
+            return self.delete(rows)
+
+    def _live_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.count])
+
+    @property
+    def live_count(self) -> int:
+        return int(self.alive[:self.count].sum())
+
+    def compact(self) -> None:
+        """
+        Drops deleted rows from the matrix and retrains the IVF index if present.
+        """
+        with self._lock:
+            live = self._live_rows().tolist()
+            matrix = np.array(self.vectors[live]) if live else np.zeros((0, self.dimensions), dtype=np.float32)
+            # Ascending order: each row's new id is free once the rows before it have moved
+            self._db.executemany("UPDATE rows SET row = ? WHERE row = ?", [(new, old) for new, old in enumerate(live) if new != old])
+            self._db.commit()
+            self.count = len(live)
+            self.alive[:] = False
+            self.alive[:self.count] = True
+            if self.count:
+                self.vectors[:self.count] = matrix
+            if self.centroids is not None:
+                self.train()
+
+    # IVF
+
+    def train(self, iterations: int = 10, sample_size: int = 50_000) -> None:
+        """
+        Trains IVF centroids with k-means on a sample of the live vectors and assigns
+        every live row to its nearest centroid.
+        """
+        with self._lock:
+            live = self._live_rows()
+            n_lists = min(self.n_lists, len(live))
+            if n_lists == 0:
+                self.centroids = None
+                return
+            rng = np.random.default_rng(0)
+            sample = live if len(live) <= sample_size else rng.choice(live, sample_size, replace=False)
+            data = np.array(self.vectors[np.sort(sample)])
+            centroids = data[rng.choice(len(data), n_lists, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(data @ centroids.T, axis=1)
+                for list_id in range(n_lists):
+                    members = data[assignment == list_id]
+                    if len(members):
+                        centroids[list_id] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+            self.centroids = centroids
+            self._assign_all()
+            self.logger.debug(f"Trained IVF index with {n_lists} lists on {len(data)} vectors.")
+
+    def _assign_all(self) -> None:
+        self.lists = [[] for _ in range(len(self.centroids))]
+        self.row_list = {}
+        live = self._live_rows().tolist()
+        for offset in range(0, len(live), 8192):
+            rows = live[offset:offset + 8192]
+            self._assign(rows, np.asarray(self.vectors[rows]))
+
+    def _assign(self, rows: List[int], matrix: np.ndarray) -> None:
+        assignment = np.argmax(matrix @ self.centroids.T, axis=1)
+        for row, list_id in zip(rows, assignment.tolist()):
+            self.lists[list_id].append(row)
+            self.row_list[row] = list_id
+
+    # Query
+
+    def search(self, vector: Sequence[float], k: int = 5, n_probes: int = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Returns up to `k` (score, metadata) pairs ordered by cosine similarity.
+        """
+        query = self._normalize(np.asarray(vector, dtype=np.float32).reshape(1, self.dimensions))[0]
+        with self._lock:
+            if self.centroids is not None:
+                probes = min(n_probes or self.n_probes, len(self.centroids))
+                nearest_lists = np.argsort(-(self.centroids @ query))[:probes]
+                candidates = np.array(sorted(row for list_id in nearest_lists for row in self.lists[list_id]), dtype=np.int64)
+            else:
+                candidates = self._live_rows().astype(np.int64)
+            if not len(candidates):
+                return []
+            scores = np.asarray(self.vectors[candidates]) @ query
+            top = min(k, len(candidates))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            rows = [int(candidates[i]) for i in best]
+            metadata = self.get_metadata(rows)
+            return [(float(scores[i]), meta) for i, meta in zip(best, metadata)]
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
@@ -2,7 +2,9 @@
 
 import logging
 import logging.config
-from config.settings import LOGGING_CONFIG_FILE
+from config.settings import KNOWLEDGE, LOGGING_CONFIG_FILE
+from knowledge.knowledge_store import get_knowledge_store
+from knowledge.retriever import get_knowledge_retriever
 from agents.orchestrator.orchestrator import OrchestratorAgent
 from messaging.messaging import MessagingClient
 
@@ -12,11 +14,15 @@ def setup_logging():
 def main():
     setup_logging()
     logger = logging.getLogger('Main')
+    if KNOWLEDGE['PRELOAD_ON_START']:
+        get_knowledge_store().preload()
+    if KNOWLEDGE['INDEX_ON_START']:
+        get_knowledge_retriever().start()
     orchestrator = OrchestratorAgent()
     messaging_client = MessagingClient()
 
     def on_message(ch, method, properties, body):
-        orchestrator.receive_message(body.decode())
+        orchestrator.receive_message(body)
 
     logger.info("Orchestrator is starting to listen for process requests.")
     messaging_client.receive_messages('process_requests', on_message)
@@ -0,0 +1,213 @@
+# messaging/async_messaging.py
+
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config.settings import MESSAGE_BROKER
+from messaging.consumer import previous_attempts
+
+
+def _broker_url() -> str:
+    return (
+        f"amqp://{MESSAGE_BROKER['USERNAME']}:{MESSAGE_BROKER['PASSWORD']}"
+        f"@{MESSAGE_BROKER['HOST']}:{MESSAGE_BROKER['PORT']}/{MESSAGE_BROKER['VIRTUAL_HOST'].lstrip('/')}"
+    )
+
+
+class AsyncMessagingClient:
+    """
+    asyncio messaging client with an aio-pika style interface.
+
+    `publish` buffers messages and flushes them as a batch once `batch_size` messages
+    are queued or `flush_interval` seconds have passed. A batch is published without
+    waiting between messages and its publisher confirms are awaited together, so the
+    broker round trip is paid once per batch instead of once per message.
+
+    Passing an InMemoryBroker runs the same interface without RabbitMQ.
+    """
+    def __init__(self, url: str = None, broker=None, batch_size: int = None, flush_interval: float = None,
+                 publisher_confirms: bool = None, prefetch_count: int = None):
+        self.url = url or _broker_url()
+        self.broker = broker
+        self.batch_size = batch_size or MESSAGE_BROKER['PUBLISH_BATCH_SIZE']
+        self.flush_interval = flush_interval if flush_interval is not None else MESSAGE_BROKER['PUBLISH_FLUSH_INTERVAL']
+        self.publisher_confirms = MESSAGE_BROKER['PUBLISHER_CONFIRMS'] if publisher_confirms is None else publisher_confirms
+        self.prefetch_count = prefetch_count or MESSAGE_BROKER['PREFETCH_COUNT']
+        self.logger = logging.getLogger('AsyncMessagingClient')
+        self.connection = None
+        self.channel = None
+        self._buffer: List[Tuple[str, str, Any, Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._consumers: List[asyncio.Task] = []
+        self.published = 0
+        self.batches = 0
+
+    async def connect(self) -> None:
+        if self.broker is not None or self.channel is not None:
+            return
+        import aio_pika
+        self.connection = await aio_pika.connect_robust(self.url)
+        self.channel = await self.connection.channel(publisher_confirms=self.publisher_confirms)
+        self.logger.debug(f"Connected to broker at {MESSAGE_BROKER['HOST']}.")
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def send_message(self, routing_key: str, message, exchange_name: str = '', properties: Dict[str, Any] = None) -> None:
+        """
+        Publishes a single message and waits for its confirm.
+        """
+        await self.connect()
+        await self._publish_many([(exchange_name, routing_key, message, properties)])
+
+    async def publish(self, routing_key: str, message, exchange_name: str = '', properties: Dict[str, Any] = None) -> asyncio.Future:
+        """
+        Buffers a message for batched publishing. The returned future resolves once the
+        broker has confirmed the batch containing it.
+        """
+        await self.connect()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append((exchange_name, routing_key, message, properties, future))
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._timed_flush)
+        return future
+
+    def _timed_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+        self._flush_task.add_done_callback(self._on_timed_flush_done)
+
+    def _on_timed_flush_done(self, task: asyncio.Task) -> None:
+        # The batch's futures already carry the error; retrieving it here keeps it
+        # from surfacing only as "Task exception was never retrieved"
+        if self._flush_task is task:
+            self._flush_task = None
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Timed flush failed: {task.exception()}")
+
+    async def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            await self._publish_many([item[:4] for item in batch])
+        except Exception as e:
+            self.logger.error(f"Batch publish of {len(batch)} messages failed: {e}")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        for *_, future in batch:
+            if not future.done():
+                future.set_result(True)
+        self.batches += 1
+
+    async def _publish_many(self, messages) -> None:
+        if self.broker is not None:
+            for exchange_name, routing_key, message, properties in messages:
+                self.broker.publish(exchange_name, routing_key, message, self.broker.BasicProperties(**(properties or {})))
+        else:
+            import aio_pika
+            exchanges = {}
+            publishes = []
+            for exchange_name, routing_key, message, properties in messages:
+                if exchange_name not in exchanges:
+                    exchanges[exchange_name] = (
+                        self.channel.default_exchange if not exchange_name
+                        else await self.channel.get_exchange(exchange_name)
+                    )
+                body = message.encode() if isinstance(message, str) else message
+                publishes.append(exchanges[exchange_name].publish(
+                    aio_pika.Message(body=body, **(properties or {})),
+                    routing_key=routing_key
+                ))
+            await asyncio.gather(*publishes)
+        self.published += len(messages)
+
+    async def consume(self, queue_name: str, callback: Callable[[Any], Awaitable[None]], prefetch_count: int = None) -> None:
+        """
+        Starts consuming `queue_name`. `callback` receives a message exposing `body`,
+        `headers` and `routing_key`; the message is acked after the callback returns.
+        A failing callback is retried in place up to
+        MESSAGE_BROKER['MAX_DELIVERY_ATTEMPTS'] times, counting attempts recorded in
+        the x-attempts header, and the message is then rejected without requeue.
+        """
+        await self.connect()
+        prefetch_count = prefetch_count or self.prefetch_count
+        if self.broker is not None:
+            self._consumers.append(asyncio.ensure_future(self._consume_memory(queue_name, callback, prefetch_count)))
+        else:
+            await self.channel.set_qos(prefetch_count=prefetch_count)
+            queue = await self.channel.get_queue(queue_name, ensure=True)
+
+            async def on_message(message):
+                error = await self._run_with_retries(callback, message)
+                if error is None:
+                    await message.ack()
+                    return
+                self.logger.error(f"Handler failed for message from '{queue_name}', rejecting it: {error}")
+                await message.reject(requeue=False)
+
+            await queue.consume(on_message)
+        self.logger.debug(f"Started consuming from queue '{queue_name}' with prefetch {prefetch_count}.")
+
+    async def _consume_memory(self, queue_name: str, callback, prefetch_count: int) -> None:
+        loop = asyncio.get_running_loop()
+        in_flight = asyncio.Semaphore(prefetch_count)
+
+        async def handle(properties, body, redelivered):
+            try:
+                message = SimpleNamespace(body=body, headers=getattr(properties, 'headers', None) or {}, routing_key=queue_name)
+                error = await self._run_with_retries(callback, message)
+                if error is not None:
+                    # The in-memory broker has no dead-letter queue, so the message is dropped
+                    self.logger.error(f"Handler failed for message from '{queue_name}', dropping it: {error}")
+            finally:
+                in_flight.release()
+
+        while True:
+            await in_flight.acquire()
+            message = self.broker.get(queue_name)
+            if message is None:
+                message = await loop.run_in_executor(None, self.broker.get, queue_name, 0.1)
+            if message is None:
+                in_flight.release()
+                continue
+            asyncio.ensure_future(handle(*message))
+
+    @staticmethod
+    async def _run_with_retries(callback, message, max_attempts: int = None) -> Optional[Exception]:
+        # The asyncio counterpart of messaging.consumer.run_with_retries
+        max_attempts = max_attempts or MESSAGE_BROKER['MAX_DELIVERY_ATTEMPTS']
+        error = None
+        for _ in range(max(1, max_attempts - previous_attempts(message))):
+            try:
+                await callback(message)
+                return None
+            except Exception as e:
+                error = e
+        return error
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        for consumer in self._consumers:
+            consumer.cancel()
+        self._consumers = []
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+            self.channel = None
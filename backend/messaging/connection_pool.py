@@ -0,0 +1,143 @@
+# messaging/connection_pool.py
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import MESSAGE_BROKER
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of broker connections and channels.
+
+    Blocking AMQP connections are not thread-safe, so the pool keeps one connection
+    per thread and a small free list of channels on it. Every MessagingClient in the
+    process shares the pool, so the number of connections tracks the number of
+    threads that talk to the broker rather than the number of agents.
+    """
+    def __init__(self, connect: Callable[[], Any], properties_factory: Callable[..., Any], max_idle_channels: int = None):
+        self.logger = logging.getLogger('ConnectionPool')
+        self.connect = connect
+        self.properties_factory = properties_factory
+        self.max_idle_channels = max_idle_channels or MESSAGE_BROKER['CHANNEL_POOL_SIZE']
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[Any] = []
+        self.connections_opened = 0
+        self.channels_opened = 0
+
+    def connection(self):
+        """
+        Returns the calling thread's connection, opening it on first use.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or not connection.is_open:
+            connection = self.connect()
+            self._local.connection = connection
+            self._local.channels = {True: [], False: []}
+            with self._lock:
+                self._connections.append(connection)
+                self.connections_opened += 1
+            self.logger.debug(f"Opened broker connection for thread {threading.current_thread().name}.")
+        return connection
+
+    @contextmanager
+    def channel(self, confirm: bool = False):
+        """
+        Checks out a channel on the calling thread's connection. Channels in confirm
+        mode are pooled separately from plain channels.
+        """
+        connection = self.connection()
+        idle = self._local.channels[confirm]
+        channel = idle.pop() if idle else None
+        if channel is None or not channel.is_open:
+            channel = connection.channel()
+            if confirm:
+                channel.confirm_delivery()
+            with self._lock:
+                self.channels_opened += 1
+        try:
+            yield channel
+        finally:
+            if channel.is_open and len(idle) < self.max_idle_channels and connection is getattr(self._local, 'connection', None):
+                idle.append(channel)
+            elif channel.is_open:
+                channel.close()
+
+    def make_properties(self, properties: Optional[Dict[str, Any]] = None):
+        return self.properties_factory(**(properties or {}))
+
+    def close(self) -> None:
+        """
+        Closes the calling thread's connection.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            if connection.is_open:
+                connection.close()
+
+    def close_all(self) -> None:
+        """
+        Closes every connection opened by the pool. Intended for process shutdown.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                if connection.is_open:
+                    connection.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing broker connection: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'open_connections': sum(1 for c in self._connections if c.is_open),
+                'connections_opened': self.connections_opened,
+                'channels_opened': self.channels_opened,
+            }
+
+
+def _connect_rabbitmq(host: str):
+    import pika
+    credentials = pika.PlainCredentials(MESSAGE_BROKER['USERNAME'], MESSAGE_BROKER['PASSWORD'])
+    params = pika.ConnectionParameters(
+        host=host,
+        port=MESSAGE_BROKER['PORT'],
+        virtual_host=MESSAGE_BROKER['VIRTUAL_HOST'],
+        credentials=credentials,
+        heartbeat=MESSAGE_BROKER['HEARTBEAT'],
+        blocked_connection_timeout=MESSAGE_BROKER['BLOCKED_CONNECTION_TIMEOUT']
+    )
+    return pika.BlockingConnection(params)
+
+
+def _rabbitmq_properties(**properties):
+    import pika
+    return pika.BasicProperties(**properties)
+
+
+_pools: Dict[Any, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(host: str = None, broker=None) -> ConnectionPool:
+    """
+    Returns the shared pool for a RabbitMQ host, or for an in-memory broker when given.
+    """
+    host = host or MESSAGE_BROKER['HOST']
+    key = ('memory', broker) if broker is not None else ('amqp', host)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if broker is not None:
+                pool = ConnectionPool(broker.connect, broker.BasicProperties)
+            else:
+                pool = ConnectionPool(lambda: _connect_rabbitmq(host), _rabbitmq_properties)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,132 @@
+# messaging/consumer.py
+
+import functools
+import logging
+import queue
+import threading
+import zlib
+from typing import Any, Callable, List, Optional
+from config.settings import MESSAGE_BROKER
+
+_STOP = object()
+ATTEMPTS_HEADER = 'x-attempts'
+
+
+def header_key(header_name: str) -> Callable[[Any, bytes], Optional[str]]:
+    """
+    Returns an ordering key function that reads `header_name` from the message headers.
+    """
+    def key(properties, body):
+        headers = getattr(properties, 'headers', None) or {}
+        return headers.get(header_name)
+    return key
+
+
+def previous_attempts(properties) -> int:
+    """
+    Returns the failed attempts recorded in the ATTEMPTS_HEADER message header, set
+    by a producer or by a consumer that gave up on the message before.
+    """
+    headers = getattr(properties, 'headers', None) or {}
+    try:
+        return max(0, int(headers.get(ATTEMPTS_HEADER, 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def run_with_retries(callback: Callable, ch, method, properties, body, max_attempts: int = None) -> Optional[Exception]:
+    """
+    Runs the handler for one delivery, retrying it in place until it returns or it
+    has failed `max_attempts` times in all, counting the attempts recorded in the
+    message headers. Returns the last error, or None once the handler succeeded.
+
+    Retrying before the delivery is settled keeps it ahead of later messages with
+    the same ordering key, and nothing is republished, so a failed retry cannot
+    lose the message.
+    """
+    max_attempts = max_attempts or MESSAGE_BROKER['MAX_DELIVERY_ATTEMPTS']
+    error = None
+    for _ in range(max(1, max_attempts - previous_attempts(properties))):
+        try:
+            callback(ch, method, properties, body)
+            return None
+        except Exception as e:
+            error = e
+    return error
+
+
+class ConcurrentConsumer:
+    """
+    Hands deliveries from a consuming channel to a pool of worker threads.
+
+    Each message is acked only after its handler returns; a failing handler is
+    retried in its worker by run_with_retries, up to
+    MESSAGE_BROKER['MAX_DELIVERY_ATTEMPTS'], and the message is then rejected without
+    requeue, so it is dropped or dead-lettered. Acks and rejects are scheduled back
+    onto the connection's own thread, since channels are not thread-safe.
+
+    With an `ordering_key`, every worker has its own lane and blocks on it: messages
+    sharing a key are routed to the same lane and processed in delivery order, and
+    messages without a key go to the shortest lane. Without an ordering function,
+    all workers serve one shared queue.
+    """
+    def __init__(self, callback: Callable, workers: int = 4, ordering_key: Callable[[Any, bytes], Optional[str]] = None,
+                 name: str = 'consumer', queue_name: str = None):
+        self.logger = logging.getLogger('ConcurrentConsumer')
+        self.callback = callback
+        self.workers = max(1, workers)
+        self.ordering_key = ordering_key
+        self.queue_name = queue_name or name
+        self.shared: queue.Queue = queue.Queue()
+        self.lanes: List[queue.Queue] = [queue.Queue() for _ in range(self.workers)] if ordering_key else []
+        self.threads = []
+        for index in range(self.workers):
+            lane = self.lanes[index] if self.lanes else None
+            thread = threading.Thread(target=self._work, args=(lane,), name=f"{name}-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.processed = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+
+    def on_message(self, ch, method, properties, body):
+        key = self.ordering_key(properties, body) if self.ordering_key else None
+        item = (ch, method, properties, body)
+        if not self.lanes:
+            self.shared.put(item)
+        elif key is None:
+            min(self.lanes, key=lambda lane: lane.qsize()).put(item)
+        else:
+            self.lanes[zlib.crc32(str(key).encode()) % self.workers].put(item)
+
+    def _work(self, lane: Optional[queue.Queue]):
+        source = lane if lane is not None else self.shared
+        while True:
+            item = source.get()
+            if item is _STOP:
+                return
+            self._handle(*item)
+
+    def _handle(self, ch, method, properties, body):
+        error = run_with_retries(self.callback, ch, method, properties, body)
+        if error is not None:
+            self.logger.error(f"Handler failed for delivery {method.delivery_tag} on '{self.queue_name}', rejecting it: {error}")
+            ch.connection.add_callback_threadsafe(
+                functools.partial(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=False)
+            )
+            with self._stats_lock:
+                self.failed += 1
+            return
+        ch.connection.add_callback_threadsafe(functools.partial(ch.basic_ack, delivery_tag=method.delivery_tag))
+        with self._stats_lock:
+            self.processed += 1
+
+    def close(self, wait: bool = True) -> None:
+        for lane in self.lanes:
+            lane.put(_STOP)
+        if not self.lanes:
+            for _ in self.threads:
+                self.shared.put(_STOP)
+        if wait:
+            for thread in self.threads:
+                thread.join()
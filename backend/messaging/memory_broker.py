@@ -0,0 +1,200 @@
+# messaging/memory_broker.py
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+
+class BasicProperties:
+    """
+    Minimal stand-in for pika.BasicProperties.
+    """
+    def __init__(self, headers: Dict[str, Any] = None, **kwargs):
+        self.headers = headers or {}
+        self.content_type = kwargs.pop('content_type', None)
+        self.content_encoding = kwargs.pop('content_encoding', None)
+        self.delivery_mode = kwargs.pop('delivery_mode', None)
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class InMemoryBroker:
+    """
+    Thread-safe in-process broker with the subset of AMQP semantics the agents use:
+    default and direct exchanges, named queues, prefetch, manual ack and requeue.
+    It lets the messaging stack run and be benchmarked without RabbitMQ.
+    """
+    BasicProperties = BasicProperties
+
+    def __init__(self):
+        self.logger = logging.getLogger('InMemoryBroker')
+        self._condition = threading.Condition()
+        self._queues: Dict[str, Deque[Tuple[Any, bytes, bool]]] = {}
+        self._bindings: Dict[str, Dict[str, Set[str]]] = {}
+        self.published = 0
+        self.delivered = 0
+
+    def connect(self) -> 'InMemoryConnection':
+        return InMemoryConnection(self)
+
+    def exchange_declare(self, exchange: str, exchange_type: str = 'direct') -> None:
+        with self._condition:
+            self._bindings.setdefault(exchange, {})
+
+    def queue_declare(self, queue: str) -> None:
+        with self._condition:
+            self._queues.setdefault(queue, deque())
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: str) -> None:
+        with self._condition:
+            self._queues.setdefault(queue, deque())
+            self._bindings.setdefault(exchange, {}).setdefault(routing_key, set()).add(queue)
+
+    def publish(self, exchange: str, routing_key: str, body, properties=None) -> None:
+        if isinstance(body, str):
+            body = body.encode()
+        with self._condition:
+            if exchange:
+                targets = self._bindings.get(exchange, {}).get(routing_key, ())
+            else:
+                targets = (routing_key,)
+            for queue in targets:
+                self._queues.setdefault(queue, deque()).append((properties, body, False))
+            self.published += 1
+            self._condition.notify_all()
+
+    def get(self, queue: str, timeout: float = None) -> Optional[Tuple[Any, bytes, bool]]:
+        """
+        Pops the next (properties, body, redelivered) message from `queue`, waiting up
+        to `timeout` seconds.
+        """
+        with self._condition:
+            messages = self._queues.setdefault(queue, deque())
+            if not messages and timeout:
+                self._condition.wait_for(lambda: bool(messages), timeout)
+            if not messages:
+                return None
+            self.delivered += 1
+            return messages.popleft()
+
+    def requeue(self, queue: str, properties, body) -> None:
+        with self._condition:
+            self._queues.setdefault(queue, deque()).appendleft((properties, body, True))
+            self._condition.notify_all()
+
+    def queue_depth(self, queue: str) -> int:
+        with self._condition:
+            return len(self._queues.get(queue, ()))
+
+
+class InMemoryConnection:
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+        self.is_open = True
+        self._callbacks: Deque = deque()
+
+    def channel(self) -> 'InMemoryChannel':
+        return InMemoryChannel(self)
+
+    def add_callback_threadsafe(self, callback) -> None:
+        self._callbacks.append(callback)
+
+    def process_data_events(self, time_limit: float = 0) -> None:
+        while self._callbacks:
+            self._callbacks.popleft()()
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+class InMemoryChannel:
+    def __init__(self, connection: InMemoryConnection):
+        self.connection = connection
+        self.broker = connection.broker
+        self.is_open = True
+        self.prefetch_count = 0
+        self._consumers: Dict[str, Tuple[str, Any, bool]] = {}
+        self._unacked: Dict[int, Tuple[str, Any, bytes]] = {}
+        self._delivery_tags = itertools.count(1)
+        self._consumer_tags = itertools.count(1)
+        self._consuming = False
+
+    def confirm_delivery(self) -> None:
+        # Publishes are applied synchronously, so every publish is already confirmed
+        pass
+
+    def basic_qos(self, prefetch_count: int = 0, **kwargs) -> None:
+        self.prefetch_count = prefetch_count
+
+    def exchange_declare(self, exchange: str, exchange_type: str = 'direct', **kwargs) -> None:
+        self.broker.exchange_declare(exchange, exchange_type)
+
+    def queue_declare(self, queue: str, **kwargs):
+        self.broker.queue_declare(queue)
+        return SimpleNamespace(method=SimpleNamespace(queue=queue, message_count=self.broker.queue_depth(queue)))
+
+    def queue_bind(self, queue: str, exchange: str, routing_key: str = None, **kwargs) -> None:
+        self.broker.queue_bind(queue, exchange, routing_key or queue)
+
+    def basic_publish(self, exchange: str, routing_key: str, body, properties=None, **kwargs) -> None:
+        self.broker.publish(exchange, routing_key, body, properties)
+
+    def basic_consume(self, queue: str, on_message_callback, auto_ack: bool = False, **kwargs) -> str:
+        consumer_tag = f"ctag{next(self._consumer_tags)}"
+        self._consumers[consumer_tag] = (queue, on_message_callback, auto_ack)
+        return consumer_tag
+
+    def basic_ack(self, delivery_tag: int = 0, multiple: bool = False) -> None:
+        for tag in self._matching_tags(delivery_tag, multiple):
+            self._unacked.pop(tag, None)
+
+    def basic_nack(self, delivery_tag: int = 0, multiple: bool = False, requeue: bool = True) -> None:
+        for tag in self._matching_tags(delivery_tag, multiple):
+            queue, properties, body = self._unacked.pop(tag)
+            if requeue:
+                self.broker.requeue(queue, properties, body)
+
+    def _matching_tags(self, delivery_tag: int, multiple: bool) -> List[int]:
+        if multiple:
+            return [tag for tag in list(self._unacked) if tag <= delivery_tag]
+        return [delivery_tag] if delivery_tag in self._unacked else []
+
+    def start_consuming(self) -> None:
+        self._consuming = True
+        while self._consuming and self._consumers and self.is_open:
+            self.connection.process_data_events()
+            delivered = False
+            for consumer_tag, (queue, callback, auto_ack) in list(self._consumers.items()):
+                if self.prefetch_count and len(self._unacked) >= self.prefetch_count:
+                    break
+                message = self.broker.get(queue)
+                if message is None:
+                    continue
+                properties, body, redelivered = message
+                delivery_tag = next(self._delivery_tags)
+                if not auto_ack:
+                    self._unacked[delivery_tag] = (queue, properties, body)
+                method = SimpleNamespace(
+                    delivery_tag=delivery_tag,
+                    consumer_tag=consumer_tag,
+                    routing_key=queue,
+                    redelivered=redelivered
+                )
+                callback(self, method, properties or BasicProperties(), body)
+                delivered = True
+            if not delivered:
+                time.sleep(0.001)
+        self.connection.process_data_events()
+
+    def stop_consuming(self) -> None:
+        self._consuming = False
+
+    def close(self) -> None:
+        self.stop_consuming()
+        for tag in list(self._unacked):
+            self.basic_nack(tag)
+        self.is_open = False
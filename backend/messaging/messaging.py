@@ -1,48 +1,99 @@
 # messaging/messaging.py
 
-import pika
+import functools
 import logging
+from typing import Iterable, Tuple
+from config.settings import MESSAGE_BROKER
+from messaging.connection_pool import ConnectionPool, get_connection_pool
+from messaging.consumer import ConcurrentConsumer, run_with_retries
 
 class MessagingClient:
-    def __init__(self, host='localhost'):
-        self.connection_params = pika.ConnectionParameters(host)
-        self.connection = pika.BlockingConnection(self.connection_params)
-        self.channel = self.connection.channel()
+    def __init__(self, host=None, broker=None, pool: ConnectionPool = None):
+        # Connections and channels come from the process-wide pool and are opened on first use
+        self.pool = pool or get_connection_pool(host=host, broker=broker)
+        self.publisher_confirms = MESSAGE_BROKER['PUBLISHER_CONFIRMS']
         self.logger = logging.getLogger('MessagingClient')
 
     def declare_exchange(self, exchange_name, exchange_type='direct'):
-        self.channel.exchange_declare(exchange=exchange_name, exchange_type=exchange_type)
+        with self.pool.channel() as channel:
+            channel.exchange_declare(exchange=exchange_name, exchange_type=exchange_type)
         self.logger.debug(f"Declared exchange '{exchange_name}' of type '{exchange_type}'.")
 
     def bind_queue(self, queue_name, exchange_name, routing_key):
-        self.channel.queue_declare(queue=queue_name)
-        self.channel.queue_bind(exchange=exchange_name, queue=queue_name, routing_key=routing_key)
+        with self.pool.channel() as channel:
+            channel.queue_declare(queue=queue_name)
+            channel.queue_bind(exchange=exchange_name, queue=queue_name, routing_key=routing_key)
         self.logger.debug(f"Bound queue '{queue_name}' to exchange '{exchange_name}' with routing key '{routing_key}'.")
 
-    def send_message(self, exchange_name, routing_key, message, properties=None):
+    def send_message(self, routing_key, message, exchange_name='', properties=None):
         # Set message properties if provided
-        pika_properties = pika.BasicProperties()
-        if properties:
-            for key, value in properties.items():
-                setattr(pika_properties, key, value)
-
-        self.channel.basic_publish(
-            exchange=exchange_name,
-            routing_key=routing_key,
-            body=message,
-            properties=pika_properties
-        )
+        pika_properties = self.pool.make_properties(properties)
+        with self.pool.channel(confirm=self.publisher_confirms) as channel:
+            channel.basic_publish(
+                exchange=exchange_name,
+                routing_key=routing_key,
+                body=message,
+                properties=pika_properties
+            )
         self.logger.debug(f"Message sent to exchange '{exchange_name}' with routing key '{routing_key}': {message}")
 
-    def receive_messages(self, queue_name, callback):
-        self.channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=True)
-        self.logger.debug(f"Started consuming from queue '{queue_name}'.")
-        try:
-            self.channel.start_consuming()
-        except KeyboardInterrupt:
-            self.channel.stop_consuming()
-        except Exception as e:
-            self.logger.error(f"An error occurred while consuming messages: {e}")
-            self.channel.stop_consuming()
-        finally:
-            self.connection.close()
+    def send_batch(self, messages: Iterable[Tuple[str, str]], exchange_name='', properties=None) -> int:
+        """
+        Publishes (routing_key, message) pairs on a single pooled channel.
+        """
+        pika_properties = self.pool.make_properties(properties)
+        count = 0
+        with self.pool.channel(confirm=self.publisher_confirms) as channel:
+            for routing_key, message in messages:
+                channel.basic_publish(
+                    exchange=exchange_name,
+                    routing_key=routing_key,
+                    body=message,
+                    properties=pika_properties
+                )
+                count += 1
+        self.logger.debug(f"Batch of {count} messages sent to exchange '{exchange_name}'.")
+        return count
+
+    def receive_messages(self, queue_name, callback, prefetch_count=None, workers=None, ordering_key=None):
+        """
+        Consumes `queue_name` with manual acks. Each message is acked only after
+        `callback` returns. With more than one worker, deliveries are handed to a
+        ConcurrentConsumer; `ordering_key(properties, body)` keeps messages that share
+        a key in order.
+        """
+        prefetch_count = prefetch_count or MESSAGE_BROKER['PREFETCH_COUNT']
+        workers = workers or MESSAGE_BROKER['CONSUMER_WORKERS']
+        consumer = None
+        if workers > 1:
+            consumer = ConcurrentConsumer(callback, workers=workers, ordering_key=ordering_key, name=queue_name, queue_name=queue_name)
+            on_message = consumer.on_message
+        else:
+            on_message = functools.partial(self._handle_and_ack, callback, queue_name)
+        with self.pool.channel() as channel:
+            channel.basic_qos(prefetch_count=prefetch_count)
+            channel.basic_consume(queue=queue_name, on_message_callback=on_message, auto_ack=False)
+            self.logger.debug(f"Started consuming from queue '{queue_name}' with prefetch {prefetch_count} and {workers} worker(s).")
+            try:
+                channel.start_consuming()
+            except KeyboardInterrupt:
+                channel.stop_consuming()
+            except Exception as e:
+                self.logger.error(f"An error occurred while consuming messages: {e}")
+                channel.stop_consuming()
+            finally:
+                if consumer:
+                    consumer.close(wait=False)
+                # Unacked deliveries are returned to the queue when the channel closes
+                channel.close()
+
+    def _handle_and_ack(self, callback, queue_name, ch, method, properties, body):
+        error = run_with_retries(callback, ch, method, properties, body)
+        if error is not None:
+            self.logger.error(f"Handler failed for delivery {method.delivery_tag} on '{queue_name}', rejecting it: {error}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,262 @@
+# messaging/serialization.py
+
+import json
+import logging
+import struct
+import zlib
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Union
+from config.settings import MESSAGE_SERIALIZATION
+
+logger = logging.getLogger('Serialization')
+
+# Envelope: magic, format version, codec id, compression id, payload.
+# JSON text never starts with a NUL byte, so legacy JSON bodies are still recognised.
+ENVELOPE_MAGIC = b'\x00AM'
+ENVELOPE_VERSION = 1
+_HEADER = struct.Struct('>3sBBB')
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class MessageDecodeError(ValueError):
+    """
+    Raised for any body that cannot be decoded: a malformed envelope, an unknown
+    codec or compression id, or a payload the codec or decompressor rejects.
+    """
+
+
+# What the codecs and decompressors raise on corrupt input; none share a base class
+_DECODE_ERRORS = (ValueError, TypeError, struct.error, zlib.error)
+if msgpack:
+    _DECODE_ERRORS += (msgpack.exceptions.UnpackException,)
+if zstandard:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+def to_serializable(obj: Any) -> Any:
+    """
+    Fallback hook for types the codecs do not handle natively: objects exposing
+    to_dict (such as Task), enums, callables and plain objects.
+    """
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if callable(obj):
+        return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}"
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class Codec:
+    name = None
+    codec_id = None
+
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    name = 'json'
+    codec_id = 1
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=to_serializable, separators=(',', ':')).encode()
+
+    def loads(self, data):
+        # orjson output is plain JSON, so either implementation can read it
+        return orjson.loads(data) if orjson else json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+    codec_id = 2
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=to_serializable, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MsgpackCodec(Codec):
+    name = 'msgpack'
+    codec_id = 3
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, default=to_serializable, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class Compressor:
+    name = None
+    compression_id = None
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+class ZlibCompressor(Compressor):
+    name = 'zlib'
+    compression_id = 1
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    name = 'zstd'
+    compression_id = 2
+
+    def __init__(self, level: int = 3):
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {'json': JsonCodec}
+COMPRESSORS: Dict[str, Callable[[], Compressor]] = {'zlib': ZlibCompressor}
+if orjson:
+    CODECS['orjson'] = OrjsonCodec
+if msgpack:
+    CODECS['msgpack'] = MsgpackCodec
+if zstandard:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+# Decoders by wire id; JSON-family ids decode with whichever JSON library is present
+_DECODERS: Dict[int, Callable[[], Codec]] = {1: JsonCodec, 2: JsonCodec}
+if msgpack:
+    _DECODERS[3] = MsgpackCodec
+_DECOMPRESSORS: Dict[int, Callable[[], Compressor]] = {1: ZlibCompressor}
+if zstandard:
+    _DECOMPRESSORS[2] = ZstdCompressor
+
+
+class MessageSerializer:
+    """
+    Encodes messages into a versioned envelope with a pluggable codec and optional
+    compression for payloads larger than `compression_threshold` bytes. Decoding reads
+    the codec and compression from the envelope header, so producers and consumers
+    do not need to agree on settings, and bodies without an envelope are parsed as
+    JSON for compatibility with older senders.
+    """
+    def __init__(self, codec: str = None, compression: Optional[str] = None, compression_threshold: int = None):
+        codec = codec or MESSAGE_SERIALIZATION['CODEC']
+        if codec == 'auto':
+            codec = 'orjson' if 'orjson' in CODECS else 'json'
+        if codec not in CODECS:
+            raise ValueError(f"Unknown or unavailable codec: {codec}")
+        self.codec = CODECS[codec]()
+        compression = compression if compression is not None else MESSAGE_SERIALIZATION['COMPRESSION']
+        if compression and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown or unavailable compression: {compression}")
+        self.compressor = COMPRESSORS[compression]() if compression else None
+        self.compression_threshold = (
+            compression_threshold if compression_threshold is not None
+            else MESSAGE_SERIALIZATION['COMPRESSION_THRESHOLD']
+        )
+        self._decoders: Dict[int, Codec] = {}
+        self._decompressors: Dict[int, Compressor] = {}
+
+    def encode(self, obj: Any) -> bytes:
+        payload = self.codec.dumps(obj)
+        compression_id = 0
+        if self.compressor and len(payload) >= self.compression_threshold:
+            payload = self.compressor.compress(payload)
+            compression_id = self.compressor.compression_id
+        return _HEADER.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, self.codec.codec_id, compression_id) + payload
+
+    def decode(self, body: Union[bytes, str]) -> Any:
+        try:
+            return self._decode(body)
+        except MessageDecodeError:
+            raise
+        except _DECODE_ERRORS as e:
+            raise MessageDecodeError(f"Could not decode message: {e}") from e
+
+    def _decode(self, body: Union[bytes, str]) -> Any:
+        if isinstance(body, str):
+            return json.loads(body)
+        if not body.startswith(ENVELOPE_MAGIC):
+            return json.loads(body)
+        _, version, codec_id, compression_id = _HEADER.unpack_from(body)
+        if version != ENVELOPE_VERSION:
+            raise MessageDecodeError(f"Unsupported message envelope version: {version}")
+        payload = body[_HEADER.size:]
+        if compression_id:
+            payload = self._decompressor(compression_id).decompress(payload)
+        return self._decoder(codec_id).loads(payload)
+
+    def _decoder(self, codec_id: int) -> Codec:
+        decoder = self._decoders.get(codec_id)
+        if decoder is None:
+            if codec_id not in _DECODERS:
+                raise MessageDecodeError(f"No decoder available for codec id {codec_id}")
+            decoder = self._decoders[codec_id] = _DECODERS[codec_id]()
+        return decoder
+
+    def _decompressor(self, compression_id: int) -> Compressor:
+        decompressor = self._decompressors.get(compression_id)
+        if decompressor is None:
+            if compression_id not in _DECOMPRESSORS:
+                raise MessageDecodeError(f"No decompressor available for compression id {compression_id}")
+            decompressor = self._decompressors[compression_id] = _DECOMPRESSORS[compression_id]()
+        return decompressor
+
+
+_default_serializer: Optional[MessageSerializer] = None
+
+
+def get_serializer() -> MessageSerializer:
+    global _default_serializer
+    if _default_serializer is None:
+        _default_serializer = MessageSerializer()
+    return _default_serializer
+
+
+def encode_message(obj: Any) -> bytes:
+    """
+    Encodes a message with the process-wide serializer configured in settings.
+    """
+    return get_serializer().encode(obj)
+
+
+def decode_message(body: Union[bytes, str]) -> Any:
+    """
+    Decodes an enveloped or legacy JSON message body. Raises MessageDecodeError if
+    the body is corrupt.
+    """
+    return get_serializer().decode(body)
@@ -0,0 +1,269 @@
+# models/embedding_service.py
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import EMBEDDING_SERVICE
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache keyed by content hash: an in-memory LRU of
+    `max_entries` vectors in front of an optional SQLite table on disk, so vectors
+    survive restarts and are shared by processes using the same file.
+    """
+    def __init__(self, max_entries: int = None, path: Optional[str] = None):
+        self.max_entries = max_entries if max_entries is not None else EMBEDDING_SERVICE['CACHE_SIZE']
+        self.path = path
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def get_many(self, keys: Sequence[str]) -> Tuple[Dict[str, List[float]], int]:
+        """
+        Returns (found vectors by key, number found on disk). Disk hits are promoted
+        into the memory LRU.
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+        missing = [key for key in keys if key not in found]
+        disk_hits = 0
+        if missing and self._conn is not None:
+            for offset in range(0, len(missing), 500):
+                batch = missing[offset:offset + 500]
+                placeholders = ','.join('?' * len(batch))
+                with self._lock:
+                    rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    disk_hits += 1
+            self._remember({key: found[key] for key in missing if key in found})
+        return found, disk_hits
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        self._remember(vectors)
+        if self._conn is not None and vectors:
+            rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._conn.execute("COMMIT")
+
+    def _remember(self, vectors: Dict[str, List[float]]) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            for key, vector in vectors.items():
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+
+class EmbeddingService:
+    """
+    Caching, coalescing and batching front end for an embedding backend such as the
+    objects returned by models.models.get_*_embedding. It exposes the same
+    embed_documents/embed_query interface, so it can be used wherever the backend is.
+
+    Texts are keyed by a hash of the model id and content. Cache misses go to a
+    dispatcher thread that waits up to `max_wait` seconds to gather up to
+    `batch_size` texts from all callers into a single backend call. A text that is
+    already being embedded for another caller is not requested again; the second
+    caller waits for the first result.
+    """
+    def __init__(self, backend, model_id: str, batch_size: int = None, max_wait: float = None,
+                 cache: EmbeddingCache = None):
+        self.logger = logging.getLogger('EmbeddingService')
+        self.backend = backend
+        self.model_id = model_id
+        self.batch_size = batch_size or EMBEDDING_SERVICE['BATCH_SIZE']
+        self.max_wait = max_wait if max_wait is not None else EMBEDDING_SERVICE['BATCH_WAIT']
+        self.cache = cache if cache is not None else EmbeddingCache(path=EMBEDDING_SERVICE['CACHE_PATH'])
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._in_flight: Dict[str, Future] = {}
+        self._pending: "OrderedDict[str, str]" = OrderedDict()  # key -> text, waiting for dispatch
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {
+            'requests': 0, 'texts': 0, 'memory_hits': 0, 'disk_hits': 0, 'coalesced': 0, 'misses': 0,
+            'backend_calls': 0, 'backend_texts': 0, 'backend_errors': 0,
+            'request_seconds': 0.0, 'backend_seconds': 0.0,
+        }
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode()).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        keys = [self.key(text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found, disk_hits = self.cache.get_many(unique)
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            hits = misses = coalesced = 0
+            for key, text in zip(keys, texts):
+                if key in found:
+                    hits += 1
+                    continue
+                if key in futures:
+                    coalesced += 1
+                    continue
+                future = self._in_flight.get(key)
+                if future is not None:
+                    coalesced += 1
+                else:
+                    future = self._in_flight[key] = Future()
+                    self._pending[key] = text
+                    misses += 1
+                futures[key] = future
+            if misses:
+                self._ensure_dispatcher()
+                self._ready.notify()
+            self._stats['requests'] += 1
+            self._stats['texts'] += len(texts)
+            self._stats['disk_hits'] += disk_hits
+            self._stats['memory_hits'] += hits - disk_hits
+            self._stats['coalesced'] += coalesced
+            self._stats['misses'] += misses
+        for key, future in futures.items():
+            found[key] = future.result()
+        with self._lock:
+            self._stats['request_seconds'] += time.perf_counter() - started
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name='embedding-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._ready.wait()
+                if not self._pending and self._closed:
+                    return
+                # Give other callers a moment to add to the batch
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popitem(last=False))
+            try:
+                self._embed_batch(batch)
+            except Exception as e:
+                # Never let a bad batch stop the dispatcher; its callers get the error
+                self.logger.error(f"Embedding dispatcher failed on a batch of {len(batch)} texts: {e}")
+                with self._lock:
+                    futures = [self._in_flight.pop(key, None) for key, _ in batch]
+                for future in futures:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+
+    def _embed_batch(self, batch: List[Tuple[str, str]]) -> None:
+        keys = [key for key, _ in batch]
+        started = time.perf_counter()
+        try:
+            vectors = self.backend.embed_documents([text for _, text in batch])
+            if len(vectors) != len(batch):
+                raise ValueError(f"Embedding backend returned {len(vectors)} vectors for {len(batch)} texts")
+            results = dict(zip(keys, vectors))
+            error = None
+        except Exception as e:
+            self.logger.error(f"Embedding batch of {len(batch)} texts failed: {e}")
+            results, error = {}, e
+        elapsed = time.perf_counter() - started
+        if results:
+            try:
+                self.cache.put_many(results)
+            except Exception as e:
+                self.logger.warning(f"Could not cache {len(results)} embeddings: {e}")
+        with self._lock:
+            futures = [self._in_flight.pop(key) for key in keys]
+            self._stats['backend_calls'] += 1
+            self._stats['backend_texts'] += len(batch)
+            self._stats['backend_seconds'] += elapsed
+            if error is not None:
+                self._stats['backend_errors'] += 1
+        for key, future in zip(keys, futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[key])
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns counters plus the cache hit rate (memory and disk hits, and coalesced
+        requests, over all texts), average request latency and average backend batch
+        size and latency.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats['memory_hits'] + stats['disk_hits'] + stats['coalesced']
+        stats['hit_rate'] = served / stats['texts'] if stats['texts'] else 0.0
+        stats['avg_request_ms'] = 1000 * stats['request_seconds'] / stats['requests'] if stats['requests'] else 0.0
+        stats['avg_backend_ms'] = 1000 * stats['backend_seconds'] / stats['backend_calls'] if stats['backend_calls'] else 0.0
+        stats['avg_batch_size'] = stats['backend_texts'] / stats['backend_calls'] if stats['backend_calls'] else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._ready.notify_all()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        self.cache.close()
+
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_id: str, backend_factory) -> EmbeddingService:
+    """
+    Returns the process-wide EmbeddingService for `model_id`, creating its backend
+    with `backend_factory()` on first use.
+    """
+    service = _services.get(model_id)
+    if service is None:
+        with _services_lock:
+            service = _services.get(model_id)
+            if service is None:
+                service = _services[model_id] = EmbeddingService(backend_factory(), model_id)
+    return service
@@ -0,0 +1,111 @@
+# models/model_registry.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from config.settings import MODEL_REGISTRY
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    Turns client parameters (which may contain dicts and lists) into a hashable key.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((repr(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of configured model clients keyed by (provider, model,
+    params), so the factories in models.models hand out one client per
+    configuration instead of building a new one on every call. At most
+    `max_entries` clients are kept, least recently used first out.
+
+    Providers built on httpx (OpenAI and compatible endpoints, Azure, Groq) are
+    given one shared keep-alive connection pool from http_client(); the other
+    providers keep the pool of their cached client.
+    """
+    def __init__(self, max_entries: int = None):
+        self.logger = logging.getLogger('ModelRegistry')
+        self.max_entries = max_entries if max_entries is not None else MODEL_REGISTRY['MAX_CLIENTS']
+        self._clients: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, provider: str, model_name: str, factory: Callable[[], Any], **params) -> Any:
+        """
+        Returns the cached client for this configuration, creating it with
+        `factory()` on first use. `params` must hold everything the factory's client
+        depends on besides the provider and model.
+        """
+        key = (provider, model_name, _freeze(params))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self._stats['hits'] += 1
+                return client
+            self._stats['misses'] += 1
+        # Built outside the lock: the first client of a provider also imports its SDK
+        client = factory()
+        with self._lock:
+            client = self._clients.setdefault(key, client)
+            self._clients.move_to_end(key)
+            while self.max_entries and len(self._clients) > self.max_entries:
+                self._clients.popitem(last=False)
+                self._stats['evictions'] += 1
+        return client
+
+    def http_client(self):
+        """
+        Returns the shared httpx.Client that HTTP-based clients use for connection
+        pooling and keep-alive. httpx is imported on first use.
+        """
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    import httpx
+                    self._http_client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=MODEL_REGISTRY['HTTP_MAX_CONNECTIONS'],
+                            max_keepalive_connections=MODEL_REGISTRY['HTTP_MAX_KEEPALIVE'],
+                            keepalive_expiry=MODEL_REGISTRY['HTTP_KEEPALIVE_EXPIRY'],
+                        ),
+                        timeout=MODEL_REGISTRY['HTTP_TIMEOUT'],
+                    )
+        return self._http_client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['clients'] = len(self._clients)
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            http_client, self._http_client = self._http_client, None
+        if http_client is not None:
+            http_client.close()
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -1,5 +1,10 @@
-# models.py 
+# models.py
 
+import os
+from models.model_registry import get_model_registry
+
+# Provider SDKs are imported inside each factory, so only the providers in use are loaded.
+# Clients are cached per (provider, model, params) by the model registry.
 
 # Configuration
 DEFAULT_TEMPERATURE = 0.0
@@ -11,74 +16,122 @@ def get_api_key(service):
 
 # Ollama models
 def get_ollama_chat(model_name:str, temperature=DEFAULT_TEMPERATURE, base_url="http://localhost:11434"):
-    return Ollama(model=model_name,temperature=temperature, base_url=base_url)
+    def build():
+        from langchain_community.llms import Ollama
+        return Ollama(model=model_name,temperature=temperature, base_url=base_url)
+    return get_model_registry().get("ollama_chat", model_name, build, temperature=temperature, base_url=base_url)
 
 def get_ollama_embedding(model_name:str, temperature=DEFAULT_TEMPERATURE):
-    return OllamaEmbeddings(model=model_name,temperature=temperature)
+    def build():
+        from langchain_community.embeddings import OllamaEmbeddings
+        return OllamaEmbeddings(model=model_name,temperature=temperature)
+    return get_model_registry().get("ollama_embedding", model_name, build, temperature=temperature)
 
 # HuggingFace models
 
 def get_huggingface_embedding(model_name:str):
-    return HuggingFaceEmbeddings(model_name=model_name)
+    def build():
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    return get_model_registry().get("huggingface_embedding", model_name, build)
 
 # LM Studio and other OpenAI compatible interfaces
 def get_lmstudio_chat(model_name:str, base_url="http://localhost:1234/v1", temperature=DEFAULT_TEMPERATURE):
-    return ChatOpenAI(model_name=model_name, base_url=base_url, temperature=temperature, api_key="none") # type: ignore
+    def build():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model_name=model_name, base_url=base_url, temperature=temperature, api_key="none", http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("lmstudio_chat", model_name, build, base_url=base_url, temperature=temperature)
 
 def get_lmstudio_embedding(model_name:str, base_url="http://localhost:1234/v1"):
-    return OpenAIEmbeddings(model_name=model_name, base_url=base_url) # type: ignore
+    def build():
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model_name=model_name, base_url=base_url, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("lmstudio_embedding", model_name, build, base_url=base_url)
 
 # Anthropic models
 def get_anthropic_chat(model_name:str, api_key=None, temperature=DEFAULT_TEMPERATURE):
     api_key = api_key or get_api_key("anthropic")
-    return ChatAnthropic(model_name=model_name, temperature=temperature, api_key=api_key) # type: ignore
+    def build():
+        from langchain_anthropic import ChatAnthropic
+        return ChatAnthropic(model_name=model_name, temperature=temperature, api_key=api_key) # type: ignore
+    return get_model_registry().get("anthropic_chat", model_name, build, api_key=api_key, temperature=temperature)
 
 # OpenAI models
 def get_openai_chat(model_name:str, api_key=None, temperature=DEFAULT_TEMPERATURE):
     api_key = api_key or get_api_key("openai")
-    return ChatOpenAI(model_name=model_name, temperature=temperature, api_key=api_key) # type: ignore
+    def build():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model_name=model_name, temperature=temperature, api_key=api_key, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("openai_chat", model_name, build, api_key=api_key, temperature=temperature)
 
 def get_openai_instruct(model_name:str,api_key=None, temperature=DEFAULT_TEMPERATURE):
     api_key = api_key or get_api_key("openai")
-    return OpenAI(model=model_name, temperature=temperature, api_key=api_key) # type: ignore
+    def build():
+        from langchain_openai import OpenAI
+        return OpenAI(model=model_name, temperature=temperature, api_key=api_key, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("openai_instruct", model_name, build, api_key=api_key, temperature=temperature)
 
 def get_openai_embedding(model_name:str, api_key=None):
     api_key = api_key or get_api_key("openai")
-    return OpenAIEmbeddings(model=model_name, api_key=api_key) # type: ignore
+    def build():
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=model_name, api_key=api_key, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("openai_embedding", model_name, build, api_key=api_key)
 
 def get_azure_openai_chat(deployment_name:str, api_key=None, temperature=DEFAULT_TEMPERATURE, azure_endpoint=None):
     api_key = api_key or get_api_key("openai_azure")
     azure_endpoint = azure_endpoint or os.getenv("OPENAI_AZURE_ENDPOINT")
-    return AzureChatOpenAI(deployment_name=deployment_name, temperature=temperature, api_key=api_key, azure_endpoint=azure_endpoint) # type: ignore
+    def build():
+        from langchain_openai import AzureChatOpenAI
+        return AzureChatOpenAI(deployment_name=deployment_name, temperature=temperature, api_key=api_key, azure_endpoint=azure_endpoint, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("azure_openai_chat", deployment_name, build, api_key=api_key, temperature=temperature, azure_endpoint=azure_endpoint)
 
 def get_azure_openai_instruct(deployment_name:str, api_key=None, temperature=DEFAULT_TEMPERATURE, azure_endpoint=None):
     api_key = api_key or get_api_key("openai_azure")
     azure_endpoint = azure_endpoint or os.getenv("OPENAI_AZURE_ENDPOINT")
-    return AzureOpenAI(deployment_name=deployment_name, temperature=temperature, api_key=api_key, azure_endpoint=azure_endpoint) # type: ignore
+    def build():
+        from langchain_openai import AzureOpenAI
+        return AzureOpenAI(deployment_name=deployment_name, temperature=temperature, api_key=api_key, azure_endpoint=azure_endpoint, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("azure_openai_instruct", deployment_name, build, api_key=api_key, temperature=temperature, azure_endpoint=azure_endpoint)
 
 def get_azure_openai_embedding(deployment_name:str, api_key=None, azure_endpoint=None):
     api_key = api_key or get_api_key("openai_azure")
     azure_endpoint = azure_endpoint or os.getenv("OPENAI_AZURE_ENDPOINT")
-    return AzureOpenAIEmbeddings(deployment_name=deployment_name, api_key=api_key, azure_endpoint=azure_endpoint) # type: ignore
+    def build():
+        from langchain_openai import AzureOpenAIEmbeddings
+        return AzureOpenAIEmbeddings(deployment_name=deployment_name, api_key=api_key, azure_endpoint=azure_endpoint, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("azure_openai_embedding", deployment_name, build, api_key=api_key, azure_endpoint=azure_endpoint)
 
 # Google models
 def get_google_chat(model_name:str, api_key=None, temperature=DEFAULT_TEMPERATURE):
     api_key = api_key or get_api_key("google")
-    return ChatGoogleGenerativeAI(model=model_name, temperature=temperature, google_api_key=api_key, safety_settings={HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE }) # type: ignore
+    def build():
+        from langchain_google_genai import ChatGoogleGenerativeAI, HarmBlockThreshold, HarmCategory
+        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature, google_api_key=api_key, safety_settings={HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE }) # type: ignore
+    return get_model_registry().get("google_chat", model_name, build, api_key=api_key, temperature=temperature)
 
 # Groq models
 def get_groq_chat(model_name:str, api_key=None, temperature=DEFAULT_TEMPERATURE):
     api_key = api_key or get_api_key("groq")
-    return ChatGroq(model_name=model_name, temperature=temperature, api_key=api_key) # type: ignore
-   
+    def build():
+        from langchain_groq import ChatGroq
+        return ChatGroq(model_name=model_name, temperature=temperature, api_key=api_key, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("groq_chat", model_name, build, api_key=api_key, temperature=temperature)
+
 # OpenRouter models
 def get_openrouter(model_name: str="meta-llama/llama-3.1-8b-instruct:free", api_key=None, temperature=DEFAULT_TEMPERATURE):
     api_key = api_key or get_api_key("openrouter")
-    return ChatOpenAI(api_key=api_key, base_url="https://openrouter.ai/api/v1", model=model_name, temperature=temperature) # type: ignore
-        
+    def build():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(api_key=api_key, base_url="https://openrouter.ai/api/v1", model=model_name, temperature=temperature, http_client=get_model_registry().http_client()) # type: ignore
+    return get_model_registry().get("openrouter_chat", model_name, build, api_key=api_key, temperature=temperature)
+
 def get_embedding_hf(model_name="sentence-transformers/all-MiniLM-L6-v2"):
-    return HuggingFaceEmbeddings(model_name=model_name)
+    return get_huggingface_embedding(model_name)
 
 def get_embedding_openai(api_key=None):
     api_key = api_key or get_api_key("openai")
-    return OpenAIEmbeddings(api_key=api_key) #type: ignore
+    def build():
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(api_key=api_key, http_client=get_model_registry().http_client()) #type: ignore
+    return get_model_registry().get("openai_embedding", None, build, api_key=api_key)
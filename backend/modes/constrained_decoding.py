@@ -0,0 +1,510 @@
+import json
+import queue
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import torch
+
+WHITESPACE = ' \t\n\r'
+NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+INTEGER = re.compile(r'-?(?:0|[1-9]\d*)')
+HEX_DIGITS = set('0123456789abcdefABCDEF')
+MAX_NUMBER_LENGTH = 24
+ANY_VALUE: Dict[str, Any] = {}
+
+# A parser state is a stack of frames (tuples), innermost last. Frames refer to
+# compiled schema alternatives by index so states are hashable and can be kept in
+# a set; the matcher tracks every state the text so far could be in.
+State = Tuple[tuple, ...]
+DONE: State = (('done',),)
+
+
+class JsonSchemaMatcher:
+    """
+    Character-level matcher for JSON documents that conform to a JSON schema, as
+    produced by pydantic's model_json_schema().
+
+    Text is fed incrementally; the matcher rejects a prefix as soon as no
+    continuation of it can be a valid document, and reports when the root value
+    is complete. Supported keywords: type (including lists), properties, required,
+    additionalProperties, items, minItems, maxItems, maxLength, enum, const, anyOf,
+    oneOf, allOf with a single entry, and $ref into $defs/definitions. Objects only
+    accept their declared properties unless additionalProperties is a schema or
+    true and the object declares none. Formats and numeric bounds are not checked.
+    """
+    def __init__(self, schema: Dict[str, Any], max_whitespace: int = 4, max_string_length: int = None):
+        self.root_schema = schema
+        self.max_whitespace = max_whitespace
+        self.max_string_length = max_string_length
+        self._alternatives: List[tuple] = []
+        self._nodes: List[List[int]] = []
+        self._node_ids: Dict[int, int] = {}
+        root = self._compile(schema)
+        self.states: Set[State] = {(('done',), ('value', root))}
+        self.whitespace_run = 0
+        self.text = ""
+
+    # -- schema compilation -------------------------------------------------
+
+    def _resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        while '$ref' in schema:
+            path = schema['$ref']
+            if not path.startswith('#/'):
+                raise ValueError(f"Unsupported $ref: {path}")
+            target = self.root_schema
+            for part in path[2:].split('/'):
+                target = target[part]
+            schema = dict(target, **{k: v for k, v in schema.items() if k != '$ref'})
+        if 'allOf' in schema and len(schema['allOf']) == 1:
+            schema = dict(self._resolve(schema['allOf'][0]), **{k: v for k, v in schema.items() if k != 'allOf'})
+        return schema
+
+    def _compile(self, schema: Any) -> int:
+        """
+        Returns the node id of a schema; a node is the list of alternatives a value
+        of that schema may take.
+        """
+        if schema is True or schema is None:
+            schema = ANY_VALUE
+        key = id(schema)
+        if key in self._node_ids:
+            return self._node_ids[key]
+        node_id = self._node_ids[key] = len(self._nodes)
+        self._nodes.append([])
+        alternatives = self._nodes[node_id]
+        resolved = self._resolve(schema)
+
+        if 'const' in resolved:
+            alternatives.append(self._add(('literal', (json.dumps(resolved['const']),))))
+            return node_id
+        if 'enum' in resolved:
+            alternatives.append(self._add(('literal', tuple(json.dumps(value) for value in resolved['enum']))))
+            return node_id
+        options = resolved.get('anyOf') or resolved.get('oneOf')
+        if options:
+            for option in options:
+                alternatives.extend(self._nodes[self._compile(option)])
+            return node_id
+
+        types = resolved.get('type') or ['object', 'array', 'string', 'number', 'boolean', 'null']
+        for type_name in [types] if isinstance(types, str) else types:
+            if type_name == 'object':
+                properties = resolved.get('properties', {})
+                additional = resolved.get('additionalProperties', not properties)
+                alternatives.append(self._add((
+                    'object',
+                    tuple((name, self._compile(sub)) for name, sub in properties.items()),
+                    frozenset(resolved.get('required', ())),
+                    None if additional is False else self._compile(additional),
+                )))
+            elif type_name == 'array':
+                alternatives.append(self._add((
+                    'array', self._compile(resolved.get('items', ANY_VALUE)), resolved.get('minItems', 0), resolved.get('maxItems'),
+                )))
+            elif type_name == 'string':
+                limits = [limit for limit in (resolved.get('maxLength'), self.max_string_length) if limit is not None]
+                alternatives.append(self._add(('string', min(limits) if limits else None)))
+            elif type_name in ('number', 'integer'):
+                alternatives.append(self._add(('number', type_name == 'integer')))
+            elif type_name == 'boolean':
+                alternatives.append(self._add(('literal', ('true', 'false'))))
+            elif type_name == 'null':
+                alternatives.append(self._add(('literal', ('null',))))
+            else:
+                raise ValueError(f"Unsupported schema type: {type_name}")
+        return node_id
+
+    def _add(self, alternative: tuple) -> int:
+        self._alternatives.append(alternative)
+        return len(self._alternatives) - 1
+
+    # -- matching -----------------------------------------------------------
+
+    @property
+    def complete(self) -> bool:
+        """
+        True when the text so far is a complete document (the root value has closed).
+        """
+        return DONE in self.states or any(self._can_finish(state) for state in self.states)
+
+    @property
+    def can_continue(self) -> bool:
+        """
+        True if more characters other than trailing whitespace may follow.
+        """
+        return any(state != DONE for state in self.states)
+
+    def _can_finish(self, state: State) -> bool:
+        # A root number has no closing character; it is complete when it parses
+        if len(state) == 2 and state[-1][0] == 'number':
+            return self._number_complete(state[-1])
+        return False
+
+    def advance(self, text: str) -> bool:
+        """
+        Consumes `text` and returns True, or returns False and leaves the matcher
+        unchanged if no valid document starts with the text so far plus `text`.
+        """
+        result = self.simulate(text)
+        if result is None:
+            return False
+        self.states, self.whitespace_run = result
+        self.text += text
+        return True
+
+    def accepts(self, text: str) -> bool:
+        return self.simulate(text) is not None
+
+    def simulate(self, text: str):
+        states, whitespace_run = self.states, self.whitespace_run
+        for ch in text:
+            if ch in WHITESPACE and not any(state[-1][0] == 'string' for state in states):
+                whitespace_run += 1
+                if whitespace_run > self.max_whitespace:
+                    return None
+            else:
+                whitespace_run = 0
+            next_states = set()
+            for state in states:
+                next_states.update(self._feed(state, ch))
+            if not next_states:
+                return None
+            states = next_states
+        return states, whitespace_run
+
+    def _feed(self, state: State, ch: str) -> List[State]:
+        frame, rest = state[-1], state[:-1]
+        kind = frame[0]
+
+        if kind == 'done':
+            return [state] if ch in WHITESPACE else []
+
+        if kind == 'value':
+            if ch in WHITESPACE:
+                return [state]
+            return self._start_value(rest, frame[1], ch)
+
+        if kind == 'string':
+            _, max_length, length, escape = frame
+            if escape == 'escape':
+                if ch == 'u':
+                    return [rest + (('string', max_length, length, 4),)]
+                if ch in '"\\/bfnrt':
+                    return [rest + (('string', max_length, length + 1, 0),)]
+                return []
+            if escape:
+                if ch not in HEX_DIGITS:
+                    return []
+                return [rest + (('string', max_length, length + (escape == 1), escape - 1),)]
+            if ch == '"':
+                return [rest]
+            if ch < ' ' or (max_length is not None and length >= max_length):
+                return []
+            if ch == '\\':
+                return [rest + (('string', max_length, length, 'escape'),)]
+            return [rest + (('string', max_length, length + 1, 0),)]
+
+        if kind == 'literal':
+            _, candidates, position = frame
+            matching = tuple(literal for literal in candidates if position < len(literal) and literal[position] == ch)
+            if not matching:
+                return []
+            finished = [rest] if any(len(literal) == position + 1 for literal in matching) else []
+            remaining = tuple(literal for literal in matching if len(literal) > position + 1)
+            return finished + ([rest + (('literal', remaining, position + 1),)] if remaining else [])
+
+        if kind == 'number':
+            _, text, integer = frame
+            candidate = text + ch
+            if len(candidate) <= MAX_NUMBER_LENGTH and self._number_prefix(candidate, integer):
+                return [rest + (('number', candidate, integer),)]
+            # Any other character ends the number and belongs to the enclosing value
+            if self._number_complete(frame):
+                return self._feed(rest, ch) if rest else []
+            return []
+
+        if kind == 'key':
+            _, alternative, seen, text = frame
+            _, properties, _, additional = self._alternatives[alternative]
+            if ch == '"':
+                if additional is not None and text not in dict(properties):
+                    return [rest + (('object', alternative, seen, 'colon', text),)]
+                if text in dict(properties) and text not in seen:
+                    return [rest + (('object', alternative, seen, 'colon', text),)]
+                return []
+            if ch < ' ' or ch == '\\':
+                return []
+            candidate = text + ch
+            if additional is not None or any(name.startswith(candidate) for name, _ in properties if name not in seen):
+                return [rest + (('key', alternative, seen, candidate),)]
+            return []
+
+        if kind == 'object':
+            _, alternative, seen, phase, key = frame
+            _, properties, required, additional = self._alternatives[alternative]
+            if ch in WHITESPACE:
+                return [state]
+            if phase in ('start', 'next') and ch == '"':
+                return [rest + (('key', alternative, seen, ''),)]
+            if phase in ('start', 'after') and ch == '}':
+                return [rest] if required <= seen else []
+            if phase == 'after' and ch == ',':
+                if additional is None and all(name in seen for name, _ in properties):
+                    return []
+                return [rest + (('object', alternative, seen, 'next', None),)]
+            if phase == 'colon' and ch == ':':
+                value_node = dict(properties).get(key, additional)
+                return [rest + (('object', alternative, seen | {key}, 'after', None), ('value', value_node))]
+            return []
+
+        if kind == 'array':
+            _, alternative, count, phase = frame
+            _, items, min_items, max_items = self._alternatives[alternative]
+            if ch in WHITESPACE:
+                return [state]
+            if phase in ('start', 'after') and ch == ']':
+                return [rest] if count >= min_items else []
+            if phase == 'after' and ch == ',':
+                if max_items is not None and count >= max_items:
+                    return []
+                return [rest + (('array', alternative, count, 'next'),)]
+            if phase in ('start', 'next'):
+                if max_items is not None and count >= max_items:
+                    return []
+                return self._start_value(rest + (('array', alternative, count + 1, 'after'),), items, ch)
+            return []
+
+        raise ValueError(f"Unknown parser frame: {kind}")
+
+    def _start_value(self, rest: State, node: int, ch: str) -> List[State]:
+        states = []
+        for alternative in self._nodes[node]:
+            compiled = self._alternatives[alternative]
+            kind = compiled[0]
+            if kind == 'object' and ch == '{':
+                states.append(rest + (('object', alternative, frozenset(), 'start', None),))
+            elif kind == 'array' and ch == '[':
+                states.append(rest + (('array', alternative, 0, 'start'),))
+            elif kind == 'string' and ch == '"':
+                states.append(rest + (('string', compiled[1], 0, 0),))
+            elif kind == 'number' and (ch == '-' or ch.isdigit()):
+                states.append(rest + (('number', ch, compiled[1]),))
+            elif kind == 'literal':
+                states.extend(self._feed(rest + (('literal', compiled[1], 0),), ch))
+        return states
+
+    @staticmethod
+    def _number_prefix(text: str, integer: bool) -> bool:
+        pattern = INTEGER if integer else NUMBER
+        # A prefix is viable if it is already a number or becomes one with a digit
+        return bool(pattern.fullmatch(text) or pattern.fullmatch(text + '0'))
+
+    @staticmethod
+    def _number_complete(frame: tuple) -> bool:
+        _, text, integer = frame
+        return bool((INTEGER if integer else NUMBER).fullmatch(text))
+
+
+class JsonSchemaLogitsProcessor:
+    """
+    Per-request logits processor for InferenceEngine that only lets the model pick
+    tokens keeping its output a valid prefix of a document matching `schema`, and
+    forces EOS once the root object closes.
+
+    Candidates are checked in order of their logits, starting with the `top_k` best,
+    and up to `max_candidates` valid tokens keep their logits; the vocabulary is only
+    scanned further when none of the top tokens fit.
+    """
+    def __init__(self, tokenizer, schema: Dict[str, Any], eos_token_ids: Iterable[int], top_k: int = 64,
+                 max_candidates: int = 8, **matcher_options):
+        self.tokenizer = tokenizer
+        self.matcher = JsonSchemaMatcher(schema, **matcher_options)
+        self.eos_token_ids = set(eos_token_ids)
+        self.top_k = top_k
+        self.max_candidates = max_candidates
+        self._consumed = 0
+        self._token_text: Dict[int, str] = {}
+        # Tokens are decoded after an anchor token so leading spaces are preserved
+        self._anchor = tokenizer.encode("a", add_special_tokens=False)[-1]
+        self._anchor_text = tokenizer.decode([self._anchor])
+        self.rejected_tokens = 0
+
+    def token_text(self, token_id: int) -> str:
+        text = self._token_text.get(token_id)
+        if text is None:
+            text = self.tokenizer.decode([self._anchor, token_id])[len(self._anchor_text):]
+            self._token_text[token_id] = text
+        return text
+
+    def _allowed(self, token_id: int) -> bool:
+        if token_id in self.eos_token_ids:
+            return self.matcher.complete
+        text = self.token_text(token_id)
+        return bool(text) and self.matcher.accepts(text)
+
+    def __call__(self, generated_ids: List[int], logits: torch.Tensor) -> torch.Tensor:
+        for token_id in generated_ids[self._consumed:]:
+            self.matcher.advance(self.token_text(token_id))
+        self._consumed = len(generated_ids)
+
+        if self.matcher.complete and not self.matcher.can_continue:
+            allowed = list(self.eos_token_ids)
+        else:
+            allowed = []
+            top = torch.topk(logits, min(self.top_k, logits.shape[-1])).indices.tolist()
+            for candidates in (top, None):
+                if candidates is None:
+                    # None of the top tokens fit: scan the rest of the vocabulary in logit order
+                    candidates = torch.argsort(logits, descending=True).tolist()[len(top):]
+                for token_id in candidates:
+                    if self._allowed(token_id):
+                        allowed.append(token_id)
+                        if len(allowed) >= self.max_candidates:
+                            break
+                    else:
+                        self.rejected_tokens += 1
+                if allowed:
+                    break
+            if not allowed:
+                allowed = list(self.eos_token_ids)
+        masked = torch.full_like(logits, float('-inf'))
+        index = torch.tensor(allowed, device=logits.device)
+        masked[index] = logits[index]
+        return masked
+
+
+def parse_partial_json(text: str) -> Any:
+    """
+    Parses an incomplete JSON document by closing its open strings, arrays and
+    objects. Keys, numbers and literals only appear once complete, while an
+    unfinished string value is kept as far as it goes. Returns None before any value starts.
+    """
+    closers: List[str] = []
+    safe_end, safe_closers = 0, None
+    in_string = escape = string_is_key = expecting_key = False
+    escape_at = unicode_digits = 0
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+                unicode_digits = 4 if ch == 'u' else 0
+            elif unicode_digits:
+                unicode_digits -= 1
+            elif ch == '\\':
+                escape, escape_at = True, i
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_end, safe_closers = i + 1, list(closers)
+            continue
+        if ch == '"':
+            in_string, string_is_key = True, expecting_key
+        elif ch in '{[':
+            closers.append('}' if ch == '{' else ']')
+            expecting_key = ch == '{'
+            safe_end, safe_closers = i + 1, list(closers)
+        elif ch in '}]':
+            if closers:
+                closers.pop()
+            expecting_key = False
+            safe_end, safe_closers = i + 1, list(closers)
+        elif ch == ',':
+            # Whatever came before the comma is a complete value
+            safe_end, safe_closers = i, list(closers)
+            expecting_key = bool(closers) and closers[-1] == '}'
+        elif ch == ':':
+            expecting_key = False
+
+    candidate = None
+    if in_string and not string_is_key:
+        # Cut a dangling escape sequence before closing the string
+        value = text[:escape_at] if escape or unicode_digits else text
+        candidate = value + '"' + ''.join(reversed(closers))
+    elif not in_string and text.rstrip()[-1:] in ('"', ']', '}'):
+        candidate = text + ''.join(reversed(closers))
+    if candidate is not None:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+    if safe_closers is None:
+        return None
+    return json.loads(text[:safe_end] + ''.join(reversed(safe_closers)))
+
+
+class JsonStreamValidator:
+    """
+    on_token callback for InferenceEngine that validates a JSON completion against
+    `schema` while it streams. Generation is stopped as soon as the output can no
+    longer match the schema (status 'invalid', with the reason in `error`) or when
+    the root value closes (status 'complete', parsed into `value`).
+
+    Text before the first '{' or '[' that can open a matching document, such as a
+    "```json" fence or "Here is the object:", is skipped like get_assistant_message
+    and validate_json_data tolerate it; only `max_preamble` characters are allowed.
+    Nothing after the root value is read, so a closing fence does not matter.
+
+    Each time the parsed prefix changes, the partial object is passed to
+    `on_partial` and queued for drain().
+    """
+    def __init__(self, schema: Dict[str, Any], on_partial: Callable[[Any], None] = None, max_preamble: int = 256,
+                 **matcher_options):
+        # Pretty-printed output indents freely; only constrained decoding needs a tight bound
+        matcher_options.setdefault('max_whitespace', 256)
+        self.matcher = JsonSchemaMatcher(schema, **matcher_options)
+        self.on_partial = on_partial
+        self.max_preamble = max_preamble
+        self.preamble = ""
+        self.started = False
+        self.status = 'streaming'
+        self.error: Optional[str] = None
+        self.partial: Any = None
+        self.value: Any = None
+        self._consumed = 0
+        self._partials: "queue.Queue[Any]" = queue.Queue()
+
+    def __call__(self, token_id: int, text: str) -> bool:
+        if self.status != 'streaming':
+            return False
+        new_text, self._consumed = text[self._consumed:], len(text)
+        for ch in new_text:
+            if not self.started:
+                if ch in '{[' and self.matcher.advance(ch):
+                    self.started = True
+                    continue
+                self.preamble += ch
+                if len(self.preamble) > self.max_preamble:
+                    self.status = 'invalid'
+                    self.error = f"No json object found in the first {self.max_preamble} characters of the output"
+                    return False
+                continue
+            if not self.matcher.advance(ch):
+                self.status = 'invalid'
+                self.error = (f"Output cannot match the json schema at character {len(self.preamble) + len(self.matcher.text)}: "
+                              f"{self.matcher.text[-40:]!r} followed by {ch!r}")
+                return False
+            if self.matcher.complete and not self.matcher.can_continue:
+                self.status = 'complete'
+                break
+
+        partial = parse_partial_json(self.matcher.text)
+        if partial is not None and partial != self.partial:
+            self.partial = partial
+            self._partials.put(partial)
+            if self.on_partial is not None:
+                self.on_partial(partial)
+        if self.status == 'complete':
+            self.value = json.loads(self.matcher.text)
+            return False
+        return True
+
+    def drain(self) -> List[Any]:
+        """
+        Returns the partial objects produced since the last call.
+        """
+        partials = []
+        while True:
+            try:
+                partials.append(self._partials.get_nowait())
+            except queue.Empty:
+                return partials
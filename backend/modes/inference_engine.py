@@ -0,0 +1,519 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+import torch
+
+logger = logging.getLogger("inference_engine")
+
+Prompt = Union[str, List[Dict[str, str]]]
+TTFT_WINDOW = 10000  # recent first-token latencies kept for percentiles
+
+
+class GenerationRequest:
+    """
+    One prompt submitted to the InferenceEngine. Text is streamed back as it is
+    generated; result() returns the decoded prompt and completion, like
+    tokenizer.decode(model.generate(...)[0]) did.
+
+    `logits_processor(generated_ids, logits)` may rewrite the next-token logits of
+    this request, and `on_token(token_id, text)` is called for every generated token;
+    returning False from it stops the request. If either raises, only this request
+    fails. With `reuse_prefix`, the request starts from the engine's cached KV state
+    for the longest matching prompt prefix, and its own final state is cached.
+    """
+    def __init__(self, prompt: Prompt, max_new_tokens: int, temperature: float, repetition_penalty: float,
+                 do_sample: bool, logits_processor: Callable = None, on_token: Callable = None,
+                 reuse_prefix: bool = False):
+        self.prompt = prompt
+        self.reuse_prefix = reuse_prefix
+        self.reused_tokens = 0
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.repetition_penalty = repetition_penalty
+        self.do_sample = do_sample
+        self.logits_processor = logits_processor
+        self.on_token = on_token
+        self.prompt_ids: List[int] = []
+        self.generated_ids: List[int] = []
+        self.text = ""
+        self.full_text: Optional[str] = None
+        self.stop_reason: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._prefix_offset = 0  # generated_ids[_prefix_offset:_read_offset] is context already emitted
+        self._read_offset = 0
+        self._chunks: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._done = threading.Event()
+
+    def stream(self) -> Iterator[str]:
+        """
+        Yields completion text as it is generated.
+        """
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    def result(self, timeout: float = None) -> str:
+        if not self._done.wait(timeout):
+            raise TimeoutError("Generation did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.full_text
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        return None if self.first_token_at is None else self.first_token_at - self.submitted_at
+
+    def _emit(self, text: str) -> None:
+        if text:
+            self._chunks.put(text)
+
+    def _finish(self, full_text: Optional[str], stop_reason: str, error: BaseException = None) -> None:
+        self.full_text = full_text
+        self.stop_reason = stop_reason
+        self.error = error
+        self.finished_at = time.perf_counter()
+        self._chunks.put(None)
+        self._done.set()
+
+
+def _cache_layers(past_key_values):
+    """
+    Returns a model cache as ((key, value), ...) per layer, tensors shaped
+    (batch, heads, sequence, head_dim).
+    """
+    if isinstance(past_key_values, tuple):
+        return past_key_values
+    if hasattr(past_key_values, 'layers'):
+        return tuple((layer.keys, layer.values) for layer in past_key_values.layers)
+    return past_key_values.to_legacy_cache()
+
+
+class PrefixCache:
+    """
+    KV states of recently generated sequences, keyed by their token ids. States are
+    kept per layer as (key, value) tensors of one sequence.
+
+    lookup() finds the entry sharing the longest prefix with a new prompt and
+    returns views of it cut to that prefix, so a prompt that repeats a cached
+    system prompt, or extends a previous turn of the same conversation, only
+    computes its new tokens. Stored tensors are never written, so the views can
+    back any number of lookups. Entries are dropped least recently used first once
+    they hold more than `max_tokens` tokens in total; pinned entries, such as a
+    prefilled system prompt, are never dropped.
+    """
+    def __init__(self, max_tokens: int = 32768, min_prefix: int = 16):
+        self.max_tokens = max_tokens
+        self.min_prefix = min_prefix
+        self._entries: List[Any] = []  # [token ids, layers, pinned], most recent last
+        self._tokens = 0
+
+    def lookup(self, ids: List[int]):
+        best, best_length = None, 0
+        for entry in self._entries:
+            cached = entry[0]
+            limit = min(len(cached), len(ids))
+            length = 0
+            while length < limit and cached[length] == ids[length]:
+                length += 1
+            if length > best_length:
+                best, best_length = entry, length
+        # At least one prompt token must be fed to get next-token logits
+        best_length = min(best_length, len(ids) - 1)
+        if best is None or best_length < self.min_prefix:
+            return 0, None
+        self._entries.remove(best)
+        self._entries.append(best)
+        return best_length, tuple((key[..., :best_length, :], value[..., :best_length, :]) for key, value in best[1])
+
+    def store(self, ids: List[int], layers, pinned: bool = False) -> None:
+        if len(ids) > self.max_tokens:
+            return
+        pinned = pinned or any(entry[2] for entry in self._entries if entry[0] == ids)
+        self._entries = [entry for entry in self._entries if entry[0] != ids]
+        self._entries.append([list(ids), layers, pinned])
+        self._tokens = sum(len(entry[0]) for entry in self._entries)
+        while self._tokens > self.max_tokens:
+            evictable = next((entry for entry in self._entries if not entry[2]), None)
+            if evictable is None:
+                break
+            self._entries.remove(evictable)
+            self._tokens -= len(evictable[0])
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens
+
+    def clear(self) -> None:
+        self._entries = []
+        self._tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class InferenceEngine:
+    """
+    Serves generation requests for one local model from a queue with dynamic batching.
+
+    A worker thread takes the first waiting request, waits up to `max_wait` seconds
+    for more, and runs up to `max_batch_size` prompts as one left-padded batch,
+    decoding all of them step by step with a shared KV cache. Tokens are streamed
+    to each request as they are sampled, and a request leaves the batch when it
+    produces EOS, reaches its token limit or is stopped by its on_token callback.
+    Requests arriving while a batch runs wait for the next batch.
+
+    Requests submitted with `reuse_prefix` are batched the same way on top of the
+    PrefixCache: each row starts from the cached KV state of the longest matching
+    prefix of its prompt, left-padded to the longest prefix in the batch, so only
+    new tokens are computed; each row's final state is cut out of the batch cache
+    and stored for the next turn. prefill() pins the state of a prefix shared by
+    many prompts, such as a system prompt.
+
+    A request whose logits_processor or on_token raises fails alone; the rest of
+    the batch carries on. stop() fails requests that have not started.
+    """
+    def __init__(self, model, tokenizer, max_batch_size: int = 8, max_wait: float = 0.01,
+                 max_new_tokens: int = 1500, eos_token_id: Union[int, Sequence[int], None] = None,
+                 prefix_cache_tokens: int = 32768):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_new_tokens = max_new_tokens
+        eos_token_id = tokenizer.eos_token_id if eos_token_id is None else eos_token_id
+        self.eos_token_ids = set([eos_token_id] if isinstance(eos_token_id, int) else eos_token_id)
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else min(self.eos_token_ids)
+        self.prefix_cache = PrefixCache(prefix_cache_tokens)
+        self._requests: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'requests': 0, 'completed': 0, 'failed': 0, 'batches': 0, 'batched_requests': 0,
+            'prompt_tokens': 0, 'generated_tokens': 0, 'busy_seconds': 0.0, 'ttft_total': 0.0, 'ttft_count': 0,
+            'prefix_hits': 0, 'prefix_tokens_reused': 0,
+        }
+        self._ttfts: "deque[float]" = deque(maxlen=TTFT_WINDOW)
+        self._cache_type = None  # past_key_values class the model returns
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._serve, name="inference-engine", daemon=True)
+        self._worker.start()
+
+    # -- public API ---------------------------------------------------------
+
+    def submit(self, prompt: Prompt, max_new_tokens: int = None, temperature: float = 0.8,
+               repetition_penalty: float = 1.1, do_sample: bool = True,
+               logits_processor: Callable = None, on_token: Callable = None,
+               reuse_prefix: bool = False) -> GenerationRequest:
+        """
+        Queues a chat (list of messages) or plain text prompt and returns its request.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Inference engine has been stopped")
+        request = GenerationRequest(
+            prompt, max_new_tokens or self.max_new_tokens, temperature, repetition_penalty, do_sample,
+            logits_processor, on_token, reuse_prefix
+        )
+        with self._lock:
+            self._metrics['requests'] += 1
+        self._requests.put(request)
+        if self._stopped.is_set():
+            # stop() may have drained the queue before this request was added
+            self._drain()
+        return request
+
+    def prefill(self, prompt: Prompt) -> GenerationRequest:
+        """
+        Computes the KV state of a prompt prefix shared by many requests, such as a
+        system prompt, and pins it in the prefix cache. Chat prompts are encoded
+        without the generation prompt so later conversations extend them. Nothing is
+        generated; the returned request completes once the state is cached.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Inference engine has been stopped")
+        request = GenerationRequest(prompt, 0, 1.0, 1.0, False, reuse_prefix=True)
+        request.prompt_ids = self.encode(prompt, add_generation_prompt=False)
+        with self._lock:
+            self._metrics['requests'] += 1
+        self._requests.put(request)
+        return request
+
+    def generate(self, prompt: Prompt, **kwargs) -> str:
+        """
+        Generates a completion and returns the decoded prompt and completion.
+        """
+        return self.submit(prompt, **kwargs).result()
+
+    def stream(self, prompt: Prompt, **kwargs) -> Iterator[str]:
+        return self.submit(prompt, **kwargs).stream()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            ttfts = sorted(self._ttfts)
+        busy = metrics.pop('busy_seconds')
+        ttft_total = metrics.pop('ttft_total')
+        ttft_count = metrics.pop('ttft_count')
+        metrics.update({
+            'queue_depth': self._requests.qsize(),
+            'avg_batch_size': metrics['batched_requests'] / metrics['batches'] if metrics['batches'] else 0.0,
+            'tokens_per_second': metrics['generated_tokens'] / busy if busy else 0.0,
+            'avg_ttft_ms': ttft_total / ttft_count * 1e3 if ttft_count else 0.0,
+            'p95_ttft_ms': ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))] * 1e3 if ttfts else 0.0,
+        })
+        return metrics
+
+    def stop(self) -> None:
+        """
+        Stops the worker once its current batch is done and fails every request
+        still waiting, so their result() and stream() return.
+        """
+        self._stopped.set()
+        self._worker.join()
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            self._fail(request, RuntimeError("Inference engine was stopped before the request ran"))
+
+    # -- batching -----------------------------------------------------------
+
+    def _serve(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                first = self._requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            started = time.perf_counter()
+            try:
+                self._run_batch(batch)
+            except BaseException as e:
+                logger.error(f"Batch of {len(batch)} requests failed: {e}")
+                for request in batch:
+                    if not request._done.is_set():
+                        self._fail(request, e)
+            with self._lock:
+                self._metrics['batches'] += 1
+                self._metrics['batched_requests'] += len(batch)
+                self._metrics['busy_seconds'] += time.perf_counter() - started
+
+    def encode(self, prompt: Prompt, add_generation_prompt: bool = True) -> List[int]:
+        if isinstance(prompt, str):
+            return self.tokenizer(prompt, add_special_tokens=True)['input_ids']
+        return list(self.tokenizer.apply_chat_template(
+            prompt, add_generation_prompt=add_generation_prompt, tokenize=True, return_dict=False
+        ))
+
+    def _run_batch(self, batch: List[GenerationRequest]) -> None:
+        device = self.model.device
+        encoded = []
+        for request in batch:
+            try:
+                # Prefill requests are encoded when submitted
+                request.prompt_ids = request.prompt_ids or self.encode(request.prompt)
+            except Exception as e:
+                self._fail(request, e)
+                continue
+            encoded.append(request)
+        batch = encoded
+        if not batch:
+            return
+        prefixes, reused = [], []
+        for request in batch:
+            length, prefix = self.prefix_cache.lookup(request.prompt_ids) if request.reuse_prefix else (0, None)
+            request.reused_tokens = length
+            prefixes.append(prefix)
+            reused.append(length)
+        suffixes = [len(request.prompt_ids) - length for request, length in zip(batch, reused)]
+        cached, width = max(reused), max(suffixes)
+        # Left padding keeps every row's cached prefix and its last prompt token in the
+        # final columns of their sections; masked columns are ignored by attention
+        input_ids = torch.full((len(batch), width), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), cached + width), dtype=torch.long)
+        for row, request in enumerate(batch):
+            input_ids[row, width - suffixes[row]:] = torch.tensor(request.prompt_ids[reused[row]:], dtype=torch.long)
+            attention_mask[row, cached - reused[row]:cached] = 1
+            attention_mask[row, cached + width - suffixes[row]:] = 1
+        with self._lock:
+            self._metrics['prompt_tokens'] += sum(suffixes)
+            self._metrics['prefix_hits'] += sum(1 for length in reused if length)
+            self._metrics['prefix_tokens_reused'] += sum(reused)
+        past_key_values = self._batch_cache(prefixes, reused, cached)
+        past_key_values = self._decode(batch, input_ids.to(device), attention_mask.to(device), past_key_values)
+
+        layers = None
+        for row, request in enumerate(batch):
+            if not request.reuse_prefix or request.error is not None:
+                continue
+            layers = layers or _cache_layers(past_key_values)
+            # The last sampled token may not have been fed to the model, so it is left out
+            fed = max(0, len(request.generated_ids) - 1)
+            spans = ((cached - reused[row], cached), (cached + width - suffixes[row], cached + width + fed))
+            self.prefix_cache.store(request.prompt_ids + request.generated_ids[:fed], tuple(
+                (torch.cat([key[row:row + 1, :, a:b] for a, b in spans], dim=2),
+                 torch.cat([value[row:row + 1, :, a:b] for a, b in spans], dim=2))
+                for key, value in layers
+            ), pinned=request.max_new_tokens == 0)
+        for request in batch:
+            if not request._done.is_set():
+                # Only prefill requests, which generate nothing, are still open here
+                self._complete(request, 'prefill')
+
+    def _batch_cache(self, prefixes: List[Any], lengths: List[int], width: int) -> Any:
+        """
+        Stacks the cached prefixes of a batch into one KV cache of `width` positions,
+        each row left-padded with zeros.
+        """
+        if not width:
+            return None
+        template = next(prefix for prefix in prefixes if prefix is not None)
+        layers = []
+        for layer, (key, value) in enumerate(template):
+            keys = key.new_zeros((len(prefixes), key.shape[1], width, key.shape[3]))
+            values = value.new_zeros((len(prefixes), value.shape[1], width, value.shape[3]))
+            for row, prefix in enumerate(prefixes):
+                if prefix is not None:
+                    keys[row, :, width - lengths[row]:] = prefix[layer][0][0]
+                    values[row, :, width - lengths[row]:] = prefix[layer][1][0]
+            layers.append((keys, values))
+        if self._cache_type is None or issubclass(self._cache_type, tuple):
+            return tuple(layers)
+        return self._cache_type.from_legacy_cache(tuple(layers))
+
+    @torch.no_grad()
+    def _decode(self, batch: List[GenerationRequest], input_ids: torch.Tensor, attention_mask: torch.Tensor,
+                past_key_values=None) -> Any:
+        """
+        Runs the decode loop for a padded batch and returns the final KV cache.
+        `input_ids` holds only the tokens not yet covered by `past_key_values`.
+        """
+        device = input_ids.device
+        # Prefill rows only need the forward pass over their prompt
+        active = [request.max_new_tokens > 0 for request in batch]
+        step_input = input_ids
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)[:, -input_ids.shape[1]:]
+        max_new_tokens = max(request.max_new_tokens for request in batch)
+        temperatures = torch.tensor([max(request.temperature, 1e-5) for request in batch], device=device).unsqueeze(1)
+        sampling = torch.tensor([request.do_sample for request in batch], device=device)
+        for _ in range(max(1, max_new_tokens)):
+            outputs = self.model(
+                input_ids=step_input,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=past_key_values,
+                use_cache=True,
+            )
+            past_key_values = outputs.past_key_values
+            self._cache_type = type(past_key_values)
+            logits = outputs.logits[:, -1, :].float()
+            for row, request in enumerate(batch):
+                if not active[row]:
+                    continue
+                if request.repetition_penalty and request.repetition_penalty != 1.0:
+                    seen = torch.tensor(list(set(request.prompt_ids + request.generated_ids)), device=device)
+                    scores = logits[row, seen]
+                    logits[row, seen] = torch.where(scores < 0, scores * request.repetition_penalty, scores / request.repetition_penalty)
+                if request.logits_processor is not None:
+                    try:
+                        logits[row] = request.logits_processor(request.generated_ids, logits[row])
+                    except Exception as e:
+                        self._fail(request, e)
+                        active[row] = False
+            greedy = logits.argmax(dim=-1)
+            probabilities = torch.softmax(logits / temperatures, dim=-1)
+            sampled = torch.multinomial(probabilities, num_samples=1).squeeze(1)
+            next_tokens = torch.where(sampling, sampled, greedy)
+
+            now = time.perf_counter()
+            token_list = next_tokens.tolist()
+            for row, request in enumerate(batch):
+                if not active[row]:
+                    token_list[row] = self.pad_token_id
+                    continue
+                try:
+                    active[row] = self._accept(request, token_list[row], now)
+                except Exception as e:
+                    # A caller's on_token failing only ends that caller's request
+                    self._fail(request, e)
+                    active[row] = False
+            if not any(active):
+                break
+            step_input = torch.tensor(token_list, dtype=torch.long, device=device).unsqueeze(1)
+            attention_mask = torch.cat([attention_mask, torch.ones((len(batch), 1), dtype=attention_mask.dtype, device=device)], dim=1)
+            position_ids = position_ids[:, -1:] + 1
+        for row, request in enumerate(batch):
+            if active[row]:
+                self._complete(request, 'length')
+        return past_key_values
+
+    def _accept(self, request: GenerationRequest, token_id: int, now: float) -> bool:
+        """
+        Records a sampled token for a request and returns whether it stays active.
+        """
+        if request.first_token_at is None:
+            request.first_token_at = now
+            with self._lock:
+                self._ttfts.append(now - request.submitted_at)
+                self._metrics['ttft_total'] += now - request.submitted_at
+                self._metrics['ttft_count'] += 1
+        if token_id in self.eos_token_ids:
+            request.generated_ids.append(token_id)
+            self._complete(request, 'eos')
+            return False
+        request.generated_ids.append(token_id)
+        with self._lock:
+            self._metrics['generated_tokens'] += 1
+        # Decode only the tokens since the last emitted text, with the previous chunk as
+        # context so tokenizers that fold leading spaces into tokens decode consistently
+        ids = request.generated_ids
+        prefix_text = self.tokenizer.decode(ids[request._prefix_offset:request._read_offset], skip_special_tokens=True)
+        text = self.tokenizer.decode(ids[request._prefix_offset:], skip_special_tokens=True)
+        # Hold back text ending in an incomplete multi-byte character
+        if len(text) > len(prefix_text) and not text.endswith("�"):
+            delta = text[len(prefix_text):]
+            request._emit(delta)
+            request.text += delta
+            request._prefix_offset = request._read_offset
+            request._read_offset = len(ids)
+        if request.on_token is not None and request.on_token(token_id, request.text) is False:
+            self._complete(request, 'stopped')
+            return False
+        if len(request.generated_ids) >= request.max_new_tokens:
+            self._complete(request, 'length')
+            return False
+        return True
+
+    def _fail(self, request: GenerationRequest, error: BaseException) -> None:
+        logger.error(f"Generation request failed: {error}")
+        request._finish(None, 'error', error)
+        with self._lock:
+            self._metrics['failed'] += 1
+
+    def _complete(self, request: GenerationRequest, stop_reason: str) -> None:
+        full_text = self.tokenizer.decode(request.prompt_ids + request.generated_ids, skip_special_tokens=False)
+        request._finish(full_text, stop_reason)
+        with self._lock:
+            self._metrics['completed'] += 1
@@ -9,6 +9,8 @@ from transformers import (
 )
 
 from validator import validate_json_data
+from inference_engine import InferenceEngine
+from constrained_decoding import JsonSchemaLogitsProcessor, JsonStreamValidator
 
 from utils import (
     print_nous_text_art,
@@ -35,10 +37,10 @@ class Character(BaseModel):
         }
 
 # serialize pydantic model into json schema
-pydantic_schema = Character.model_json_schema()
+pydantic_schema = json.dumps(Character.model_json_schema())
 
 class ModelInference:
-    def __init__(self, model_path, chat_template, load_in_4bit):
+    def __init__(self, model_path, chat_template, load_in_4bit, max_batch_size=8, max_wait=0.01):
         inference_logger.info(print_nous_text_art())
         self.bnb_config = None
 
@@ -69,36 +71,69 @@ class ModelInference:
         inference_logger.info(self.model.config)
         inference_logger.info(self.model.generation_config)
         inference_logger.info(self.tokenizer.special_tokens_map)
-    
-    def run_inference(self, prompt):
-        inputs = self.tokenizer.apply_chat_template(
-            prompt,
-            add_generation_prompt=True,
-            return_tensors='pt'
-        )
 
-        tokens = self.model.generate(
-            inputs.to(self.model.device),
+        # Concurrent callers share the model through the engine's batched request queue
+        self.engine = InferenceEngine(
+            self.model,
+            self.tokenizer,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
             max_new_tokens=1500,
-            temperature=0.8,
-            repetition_penalty=1.1,
-            do_sample=True,
-            eos_token_id=self.tokenizer.eos_token_id
+            eos_token_id=self.tokenizer.eos_token_id,
+        )
+        # Every json prompt starts with the system prompt and schema, so their KV state is computed once
+        self.engine.prefill(self.system_messages())
+
+    def run_inference(self, prompt, logits_processor=None, on_token=None, reuse_prefix=True):
+        # Turns start from the cached system prompt or earlier turn and cache their own state for the next repair
+        return self.engine.generate(
+            prompt, temperature=0.8, repetition_penalty=1.1, do_sample=True, reuse_prefix=reuse_prefix,
+            logits_processor=logits_processor, on_token=on_token,
+        )
+
+    def schema_constraint(self):
+        # Processors track the request's output so far, so each generation needs its own
+        return JsonSchemaLogitsProcessor(self.tokenizer, json.loads(pydantic_schema), self.engine.eos_token_ids)
+
+    def system_messages(self):
+        sys_prompt = f"You are a helpful assistant that answers in JSON. Here's the json schema you must adhere to:\n<schema>\n{pydantic_schema}\n</schema>"
+        return [{"role": "system", "content": sys_prompt}]
+
+    def json_prompt(self, query):
+        return self.system_messages() + [{"role": "user", "content": query}]
+
+    def stream_json_completion(self, query, constrained=False):
+        """
+        Yields the json object as it forms, one partial object per change. Generation
+        stops when the root object closes and is aborted, raising ValueError, as soon
+        as the output can no longer match the schema.
+        """
+        validator = JsonStreamValidator(json.loads(pydantic_schema))
+        request = self.engine.submit(
+            self.json_prompt(query), temperature=0.8, repetition_penalty=1.1, do_sample=True, reuse_prefix=True,
+            logits_processor=self.schema_constraint() if constrained else None, on_token=validator,
         )
-        completion = self.tokenizer.decode(tokens[0], skip_special_tokens=False, clean_up_tokenization_space=True)
-        return completion
+        for _ in request.stream():
+            yield from validator.drain()
+        yield from validator.drain()
+        if validator.status != 'complete':
+            raise ValueError(validator.error or f"Generation ended before the json object closed ({request.stop_reason})")
+
+    def stream_inference(self, prompt):
+        return self.engine.stream(prompt, temperature=0.8, repetition_penalty=1.1, do_sample=True)
 
-    def generate_json_completion(self, query, chat_template, max_depth=5):
+    def generate_json_completion(self, query, chat_template, max_depth=5, constrained=False, on_partial=None):
         try:
             depth = 0
-            sys_prompt = f"You are a helpful assistant that answers in JSON. Here's the json schema you must adhere to:\n<schema>\n{pydantic_schema}\n</schema>"
-            prompt = [{"role": "system", "content": sys_prompt}]
-            prompt.append({"role": "user", "content": query})
+            prompt = self.json_prompt(query)
 
             inference_logger.info(f"Running inference to generate json object for pydantic schema:\n{json.dumps(json.loads(pydantic_schema), indent=2)}")
-            completion = self.run_inference(prompt)
+            # Constrained decoding masks off-schema tokens, so validation normally passes first time
+            # Each turn is validated while it streams and cut short once it leaves the schema
+            validator = JsonStreamValidator(json.loads(pydantic_schema), on_partial=on_partial)
+            completion = self.run_inference(prompt, self.schema_constraint() if constrained else None, validator)
 
-            def recursive_loop(prompt, completion, depth):
+            def recursive_loop(prompt, completion, validator, depth):
                 nonlocal max_depth
 
                 assistant_message = get_assistant_message(completion, chat_template, self.tokenizer.eos_token)
@@ -106,6 +141,8 @@ class ModelInference:
                 tool_message = f"Agent iteration {depth} to assist with user query: {query}\n"
                 if assistant_message is not None:
                     validation, json_object, error_message = validate_json_data(assistant_message, json.loads(pydantic_schema))
+                    if not validation and validator.error:
+                        error_message = validator.error
                     if validation:
                         inference_logger.info(f"Assistant Message:\n{assistant_message}")
                         inference_logger.info(f"json schema validation passed")
@@ -117,15 +154,19 @@ class ModelInference:
                         
                         depth += 1
                         if depth >= max_depth:
-                            print(f"Maximum recursion depth reached ({max_depth}). Stopping recursion.")
+                            inference_logger.warning(f"Maximum recursion depth reached ({max_depth}). Stopping recursion.")
                             return
                         
+                        # Keeping the failed answer in the conversation lets the next turn extend its cached KV state
+                        prompt.append({"role": "assistant", "content": assistant_message})
                         prompt.append({"role": "tool", "content": tool_message})
-                        completion = self.run_inference(prompt)
-                        recursive_loop(prompt, completion, depth)
+                        validator = JsonStreamValidator(json.loads(pydantic_schema), on_partial=on_partial)
+                        # Repair turns extend the cached state of the previous turn
+                        completion = self.run_inference(prompt, self.schema_constraint() if constrained else None, validator)
+                        recursive_loop(prompt, completion, validator, depth)
                 else:
                     inference_logger.warning("Assistant message is None")
-            recursive_loop(prompt, completion, depth)
+            recursive_loop(prompt, completion, validator, depth)
         except Exception as e:
             inference_logger.error(f"Exception occurred: {e}")
             raise e
@@ -137,14 +178,21 @@ if __name__ == "__main__":
     parser.add_argument("--load_in_4bit", type=str, default="False", help="Option to load in 4bit with bitsandbytes")
     parser.add_argument("--query", type=str, default="Please return a json object to represent Goku from the anime Dragon Ball Z?")
     parser.add_argument("--max_depth", type=int, default=5, help="Maximum number of recursive iteration")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="Maximum prompts generated together in one batch")
+    parser.add_argument("--mode", type=str, default="retry", choices=["retry", "constrained"], help="Validate and retry, or constrain decoding to the schema")
+    parser.add_argument("--stream", action="store_true", help="Print the json object as it forms instead of running the repair loop")
     args = parser.parse_args()
 
     # specify custom model path
     if args.model_path:
-        inference = ModelInference(args.model_path, args.chat_template, args.load_in_4bit)
+        inference = ModelInference(args.model_path, args.chat_template, args.load_in_4bit, args.max_batch_size)
     else:
         model_path = 'NousResearch/Hermes-2-Pro-Llama-3-8B'
-        inference = ModelInference(model_path, args.chat_template, args.load_in_4bit)
+        inference = ModelInference(model_path, args.chat_template, args.load_in_4bit, args.max_batch_size)
         
-    # Run the model evaluator
-    inference.generate_json_completion(args.query, args.chat_template, args.max_depth)
\ No newline at end of file
+    if args.stream:
+        for partial in inference.stream_json_completion(args.query, constrained=args.mode == "constrained"):
+            print(json.dumps(partial))
+    else:
+        # Run the model evaluator
+        inference.generate_json_completion(args.query, args.chat_template, args.max_depth, constrained=args.mode == "constrained")
\ No newline at end of file
@@ -0,0 +1,291 @@
+# tools/sandbox.py
+
+import logging
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import TOOLS
+from database.tool_registry import content_hash
+from tools.tool_runtime import ToolTimeout
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits are then not applied
+    resource = None
+
+
+class ToolCrashed(RuntimeError):
+    """
+    Raised when a tool's worker process dies, for example after exceeding its CPU limit.
+    """
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+
+def _apply_memory_limit(memory_limit_mb: int) -> None:
+    if resource is None or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _apply_cpu_limit(cpu_time_limit: int) -> None:
+    # RLIMIT_CPU counts the whole life of the process, so the soft limit is moved
+    # to the CPU time used so far plus the per-call allowance before each call
+    if resource is None or not cpu_time_limit:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    limit = int(usage.ru_utime + usage.ru_stime) + cpu_time_limit + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+
+def _encode_result(status: str, value: Any, shm_threshold: int) -> Tuple:
+    try:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        status, payload = 'error', pickle.dumps(RuntimeError(f"Tool result is not picklable: {e}"))
+    if shm_threshold and len(payload) > shm_threshold:
+        # Large results go through shared memory; the parent copies and unlinks it
+        block = shared_memory.SharedMemory(create=True, size=len(payload))
+        block.buf[:len(payload)] = payload
+        name = block.name
+        block.close()
+        return status, 'shm', name, len(payload)
+    return status, 'inline', payload, len(payload)
+
+
+def _worker_main(connection, memory_limit_mb: int, cpu_time_limit: int, shm_threshold: int) -> None:
+    # Imported here so spawned workers only import what tools need
+    from tools.tool_runtime import ToolRuntime
+    _apply_memory_limit(memory_limit_mb)
+    runtime = ToolRuntime()
+    sources: Dict[str, Dict[str, Any]] = {}
+    connection.send(('ready',))
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+        tool_data, args, kwargs = message
+        key = tool_data['content_hash']
+        if 'code' in tool_data:
+            sources[key] = tool_data
+        try:
+            _apply_cpu_limit(cpu_time_limit)
+            module = runtime.get(key, sources.get)
+            result = _encode_result('ok', module.main(*args, **kwargs), shm_threshold)
+        except BaseException as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            result = _encode_result('error', e, 0)
+        connection.send(result)
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+class _Worker:
+    """
+    Parent-side handle of one worker process, driven by its own dispatch thread.
+    """
+    def __init__(self, executor: 'SandboxedToolExecutor', index: int):
+        self.executor = executor
+        self.index = index
+        self.process = None
+        self.connection = None
+        self.loaded = set()  # content hashes of the tool sources the worker already has
+        self.start_process()
+        self.thread = threading.Thread(target=self.run, name=f'tool-sandbox-{index}', daemon=True)
+        self.thread.start()
+
+    def start_process(self) -> None:
+        executor = self.executor
+        parent, child = executor.context.Pipe()
+        self.process = executor.context.Process(
+            target=_worker_main,
+            args=(child, executor.memory_limit_mb, executor.cpu_time_limit, executor.shm_threshold),
+            name=f'tool-sandbox-{self.index}',
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.connection = parent
+        self.loaded = set()
+        # Pre-warm: wait until the interpreter is up so the first call does not pay for it
+        if not parent.poll(executor.start_timeout):
+            raise ToolCrashed(f"Tool sandbox worker {self.index} did not start")
+        parent.recv()
+
+    def restart(self) -> None:
+        self.executor.logger.warning(f"Restarting tool sandbox worker {self.index}.")
+        try:
+            self.process.kill()
+            self.process.join(5)
+        except Exception:
+            pass
+        self.connection.close()
+        self.executor._count('restarts')
+        self.start_process()
+
+    def run(self) -> None:
+        executor = self.executor
+        while True:
+            item = executor._jobs.get()
+            if item is None:
+                self.stop()
+                return
+            future, tool_data, args, kwargs, timeout = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.call(tool_data, args, kwargs, timeout))
+                executor._count('completed')
+            except BaseException as e:
+                future.set_exception(e)
+                executor._count('failed')
+
+    def call(self, tool_data: Dict[str, Any], args, kwargs, timeout: Optional[float]) -> Any:
+        # Keyed by content so a tool re-saved under the same version is sent again
+        key = tool_data.get('content_hash') or content_hash(tool_data['code'])
+        message = {'tool_id': tool_data['tool_id'], 'version': tool_data['version'], 'content_hash': key}
+        if key not in self.loaded:
+            message['code'] = tool_data['code']
+        timed_out = False
+        try:
+            self.connection.send((message, tuple(args), dict(kwargs)))
+            self.loaded.add(key)
+            if self.connection.poll(timeout):
+                status, transport, payload, size = self.connection.recv()
+            else:
+                timed_out = True
+        except (EOFError, OSError):
+            self.process.join(1)
+            exitcode = self.process.exitcode
+            self.restart()
+            raise ToolCrashed(f"Tool {tool_data['tool_id']} worker exited (exit code {exitcode}); "
+                              f"it may have exceeded its CPU or memory limit")
+        if timed_out:
+            self.restart()
+            raise ToolTimeout(f"Tool {tool_data['tool_id']} exceeded its {timeout}s timeout")
+        if transport == 'shm':
+            block = shared_memory.SharedMemory(name=payload)
+            try:
+                payload = bytes(block.buf[:size])
+            finally:
+                block.close()
+                block.unlink()
+            self.executor._count('shared_memory_results')
+        value = pickle.loads(payload)
+        if status == 'error':
+            raise value
+        return value
+
+    def stop(self) -> None:
+        try:
+            self.connection.send(None)
+            self.process.join(5)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
+
+
+class SandboxedToolExecutor:
+    """
+    Runs dynamic tools in a pool of pre-started worker processes, so a slow or
+    CPU-heavy tool neither blocks the calling thread's agent nor shares its memory.
+
+    Each worker runs with an address-space limit (`memory_limit_mb`) and a CPU time
+    limit per call (`cpu_time_limit`). Wall-clock timeouts, typically Task.timeout,
+    are enforced by killing and replacing the worker. Workers keep compiled tools
+    cached by content hash, so each version of a tool's source is sent to a worker once.
+    Results larger than `shm_threshold` bytes come back through shared memory
+    instead of the pipe.
+    """
+    def __init__(self, workers: int = None, memory_limit_mb: int = None, cpu_time_limit: int = None,
+                 shm_threshold: int = None, start_method: str = None, start_timeout: float = 30):
+        self.logger = logging.getLogger('SandboxedToolExecutor')
+        settings = TOOLS['SANDBOX']
+        self.workers = workers or settings['WORKERS'] or multiprocessing.cpu_count()
+        self.memory_limit_mb = settings['MEMORY_LIMIT_MB'] if memory_limit_mb is None else memory_limit_mb
+        self.cpu_time_limit = settings['CPU_TIME_LIMIT'] if cpu_time_limit is None else cpu_time_limit
+        self.shm_threshold = settings['SHM_THRESHOLD'] if shm_threshold is None else shm_threshold
+        self.context = multiprocessing.get_context(start_method or settings['START_METHOD'])
+        self.start_timeout = start_timeout
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'restarts': 0, 'shared_memory_results': 0}
+        self._shutdown = False
+        started = time.perf_counter()
+        self._workers: List[_Worker] = [_Worker(self, index) for index in range(self.workers)]
+        self.logger.info(f"Started {self.workers} tool sandbox workers in {time.perf_counter() - started:.2f}s.")
+
+    def submit(self, tool_data: Dict[str, Any], args=(), kwargs=None, timeout: float = None) -> Future:
+        """
+        Queues a call of the tool's main(*args, **kwargs) and returns a Future for its
+        result. `tool_data` needs tool_id, version and code.
+        """
+        if self._shutdown:
+            raise RuntimeError("Tool sandbox has been shut down")
+        future = Future()
+        self._count('submitted')
+        self._jobs.put((future, tool_data, args, kwargs or {}, timeout))
+        return future
+
+    def run(self, tool_data: Dict[str, Any], args=(), kwargs=None, timeout: float = None) -> Any:
+        """
+        Runs the tool and waits for its result. Raises ToolTimeout if it runs longer
+        than `timeout` seconds.
+        """
+        return self.submit(tool_data, args, kwargs, timeout).result()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, queue_depth=self._jobs.qsize())
+
+    def shutdown(self) -> None:
+        self._shutdown = True
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.thread.join()
+
+
+_sandbox: Optional[SandboxedToolExecutor] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_tool_sandbox() -> SandboxedToolExecutor:
+    """
+    Returns the process-wide tool sandbox, starting its workers on first use.
+    """
+    global _sandbox
+    if _sandbox is None:
+        with _sandbox_lock:
+            if _sandbox is None:
+                _sandbox = SandboxedToolExecutor()
+    return _sandbox
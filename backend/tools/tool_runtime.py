@@ -0,0 +1,168 @@
+# tools/tool_runtime.py
+
+import logging
+import re
+import sys
+import threading
+import types
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from config.settings import TOOLS
+
+
+class ToolNotFound(ValueError):
+    pass
+
+
+class ToolTimeout(TimeoutError):
+    pass
+
+
+def call_with_timeout(function: Callable, args=(), kwargs: Dict[str, Any] = None, timeout: float = None,
+                      name: str = 'tool') -> Any:
+    """
+    Calls `function(*args, **kwargs)` in this thread, or with a `timeout` on a daemon
+    thread, raising ToolTimeout if it has not returned in time. Threads cannot be
+    killed, so an overrunning call keeps running in the background and its result
+    is discarded; the sandbox backend stops the worker process instead.
+    """
+    kwargs = kwargs or {}
+    if not timeout:
+        return function(*args, **kwargs)
+    outcome: Dict[str, Any] = {}
+
+    def target():
+        try:
+            outcome['result'] = function(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=target, name=f"{name}-call", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise ToolTimeout(f"Tool {name} exceeded its {timeout}s timeout")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def module_name(tool_id: str, version: str) -> str:
+    """
+    Returns the sys.modules name of a compiled tool. Each tool version gets its own
+    name, so tools running concurrently never replace each other's module.
+    """
+    return 'dynamic_tool_' + re.sub(r'\W', '_', f"{tool_id}_{version}")
+
+
+class ToolRuntime:
+    """
+    Compiles dynamic tools once per version and keeps the resulting modules in an
+    LRU keyed by (tool_id, version).
+
+    Every lookup reads the tool's current row through `load`, normally an in-memory
+    ToolRegistry hit, so a re-saved tool is compiled afresh on its next call even if
+    the save raced with a compile or happened in another process; only the source
+    is not recompiled. Database.save_tool also invalidates the tool, so its old
+    modules leave the cache straight away.
+    """
+    def __init__(self, max_entries: int = None):
+        self.logger = logging.getLogger('ToolRuntime')
+        self.max_entries = max_entries or TOOLS['RUNTIME_CACHE_SIZE']
+        self._modules: "OrderedDict[Tuple[str, str], types.ModuleType]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'compiled': 0, 'invalidated': 0, 'evicted': 0}
+
+    def get(self, tool_id: str, load: Callable[[str], Optional[Dict[str, Any]]]) -> types.ModuleType:
+        """
+        Returns the compiled module for the current version of `tool_id`, compiling
+        the row returned by `load(tool_id)` if that version is not cached.
+        """
+        tool_data = self.get_tool_data(tool_id, load)
+        key = (tool_id, str(tool_data.get('version')))
+        with self._lock:
+            module = self._modules.get(key)
+            if module is not None:
+                self._modules.move_to_end(key)
+                self._stats['hits'] += 1
+                return module
+            self._stats['misses'] += 1
+        module = self.compile(tool_data)
+        with self._lock:
+            self._modules[key] = module
+            self._modules.move_to_end(key)
+            while len(self._modules) > self.max_entries:
+                _, evicted = self._modules.popitem(last=False)
+                sys.modules.pop(evicted.__name__, None)
+                self._stats['evicted'] += 1
+        return module
+
+    def get_tool_data(self, tool_id: str, load: Callable[[str], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Returns the current tool row for `tool_id` without compiling it. Rows are
+        cached by the ToolRegistry behind `load`, not here, so they are never older
+        than the registry's.
+        """
+        tool_data = load(tool_id)
+        if not tool_data:
+            raise ToolNotFound(f"Tool with ID {tool_id} not found")
+        return tool_data
+
+    def compile(self, tool_data: Dict[str, Any]) -> types.ModuleType:
+        name = module_name(tool_data['tool_id'], str(tool_data.get('version')))
+        module = types.ModuleType(name)
+        code = compile(tool_data['code'], f"<tool {tool_data.get('tool_name', tool_data['tool_id'])}>", 'exec')
+        exec(code, module.__dict__)
+        sys.modules[name] = module
+        with self._lock:
+            self._stats['compiled'] += 1
+        self.logger.debug(f"Compiled tool {tool_data['tool_id']} version {tool_data.get('version')} as {name}.")
+        return module
+
+    def invalidate(self, tool_id: str) -> None:
+        """
+        Drops every compiled version of a tool.
+        """
+        with self._lock:
+            for key in [key for key in self._modules if key[0] == tool_id]:
+                sys.modules.pop(self._modules.pop(key).__name__, None)
+                self._stats['invalidated'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for module in self._modules.values():
+                sys.modules.pop(module.__name__, None)
+            self._modules.clear()
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, size=len(self._modules), max_entries=self.max_entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+_runtime: Optional[ToolRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_tool_runtime() -> ToolRuntime:
+    """
+    Returns the process-wide tool runtime.
+    """
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = ToolRuntime()
+    return _runtime
+
+
+def invalidate_tool(tool_id: str) -> None:
+    """
+    Drops a tool's compiled modules, if the runtime has been created.
+    """
+    if _runtime is not None:
+        _runtime.invalidate(tool_id)
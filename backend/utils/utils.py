@@ -4,6 +4,7 @@ import json
 import logging
 import uuid
 from utils.constants import *
+from messaging.serialization import MessageDecodeError, decode_message
 
 def generate_unique_id():
     """
@@ -96,13 +97,13 @@ def validate_agent_data(agent_data):
 
 def parse_message(message):
     """
-    Parses a JSON message and returns the corresponding data.
+    Parses an enveloped or JSON message and returns the corresponding data.
     """
     try:
-        data = json.loads(message)
+        data = decode_message(message)
         return data
-    except json.JSONDecodeError as e:
-        logging.error(f"Error decoding JSON message: {e}")
+    except MessageDecodeError as e:
+        logging.error(f"Error decoding message: {e}")
         return None
 
 def format_notification(subject, message, recipients):